@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: raw-XML FileAnalyzer vs openpyxl object model analysis
+大きなワークブックでシート分析（get_sheet_info）の速度を比較
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import Config
+from core.converter import ExcelConverter
+from bench_conversion_engines import create_sample_workbook
+
+
+def run_analysis(excel_path: str, analysis_mode: str) -> tuple:
+    """Analyze once and return (elapsed seconds, sheet infos)"""
+    config = Config()
+    config.processing.analysis_mode = analysis_mode
+    converter = ExcelConverter(config, engine='inprocess')
+
+    start = time.perf_counter()
+    sheets = converter.get_sheet_info(excel_path)
+    return time.perf_counter() - start, sheets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sheet analysis modes')
+    parser.add_argument('--sheets', type=int, default=4, help='Number of sheets (default: 4)')
+    parser.add_argument('--rows', type=int, default=20000, help='Rows per sheet (default: 20000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_path = os.path.join(temp_dir, 'bench.xlsx')
+        create_sample_workbook(excel_path, sheets=args.sheets, rows=args.rows)
+
+        print(f"📊 ベンチマーク: {args.sheets}シート × {args.rows}行の分析")
+        results = {}
+        for mode in ('full', 'streaming'):
+            elapsed, sheets = run_analysis(excel_path, mode)
+            results[mode] = (elapsed, sheets)
+            print(f"   {mode:10}: {elapsed:.2f}s")
+
+        full_sheets, streaming_sheets = results['full'][1], results['streaming'][1]
+        same = all(
+            (f.rows, f.cols, f.non_empty_cells, f.issues) == (s.rows, s.cols, s.non_empty_cells, s.issues)
+            for f, s in zip(full_sheets, streaming_sheets)
+        )
+        print(f"   結果一致: {'はい' if same else 'いいえ'}")
+        print(f"   高速化: {results['full'][0] / max(results['streaming'][0], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
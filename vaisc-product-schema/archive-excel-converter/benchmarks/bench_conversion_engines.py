@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-process MarkItDown engine vs subprocess fallback
+50シートのワークブックで変換エンジンの速度を比較
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import openpyxl
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import Config
+from core.engine import create_engine
+
+
+def create_sample_workbook(path: str, sheets: int = 50, rows: int = 40, cols: int = 12) -> None:
+    """Create benchmark workbook with numbered sheets"""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for s in range(sheets):
+        ws = wb.create_sheet(title=f"Sheet{s + 1:02d}")
+        ws.append([f"列{c + 1}" for c in range(cols)])
+        for r in range(rows):
+            ws.append([f"値{r}-{c}" if c % 3 else r * c for c in range(cols)])
+    wb.save(path)
+
+
+def run_engine(engine_name: str, excel_path: str, repeat: int) -> float:
+    """Run conversions and return total elapsed seconds (including engine startup)"""
+    config = Config()
+    start = time.perf_counter()
+    engine = create_engine(config, engine_name)
+    for _ in range(repeat):
+        engine.convert(excel_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare MarkItDown conversion engines')
+    parser.add_argument('--sheets', type=int, default=50, help='Number of sheets (default: 50)')
+    parser.add_argument('--repeat', type=int, default=5, help='Conversions per engine (default: 5)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_path = os.path.join(temp_dir, 'bench.xlsx')
+        create_sample_workbook(excel_path, sheets=args.sheets)
+
+        print(f"📊 ベンチマーク: {args.sheets}シート × {args.repeat}回変換")
+        results = {}
+        for engine_name in ('subprocess', 'inprocess'):
+            elapsed = run_engine(engine_name, excel_path, args.repeat)
+            results[engine_name] = elapsed
+            print(f"   {engine_name:10}: {elapsed:.2f}s ({elapsed / args.repeat:.2f}s/回)")
+
+        speedup = results['subprocess'] / max(results['inprocess'], 1e-9)
+        print(f"   高速化: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
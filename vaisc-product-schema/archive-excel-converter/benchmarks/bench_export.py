@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming VAISC export vs DataFrame-based export
+商品マスタからVAISC商品JSONLを出力する時間とピークメモリを比較
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import Config
+from core.converter import ExcelConverter
+from core.exporter import VaiscExporter, ExportMapping, ProductMapper, default_mapping_path
+
+
+def create_product_master(excel_path: str, rows: int) -> None:
+    """Write a product master with one column per mapped header"""
+    mapping = ExportMapping.load(default_mapping_path())
+    columns = []
+    for spec in mapping.specs:
+        for source in spec.parts or [spec]:
+            if source.columns and source.columns[0] not in columns:
+                columns.append(source.columns[0])
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('商品マスタ')
+    ws.append(columns)
+    for row in range(rows):
+        values = []
+        for column in columns:
+            if column.startswith(('i_', 'f_')):
+                values.append(row % 7 + 1)
+            elif column.startswith('sm_'):
+                values.append(f"{column}_{row % 13},{column}_{row % 17}")
+            elif column.endswith('_date'):
+                values.append(f"2025{row % 12 + 1:02d}{row % 28 + 1:02d}")
+            else:
+                values.append(f"{column}_{row}")
+        ws.append(values)
+    wb.save(excel_path)
+
+
+def export_streaming(excel_path: str, output_dir: str) -> None:
+    """VaiscExporter over the raw sheet XML"""
+    config = Config()
+    with ExcelConverter(config).open_session(excel_path) as session:
+        VaiscExporter(config).export(session, output_dir)
+
+
+def export_dataframe(excel_path: str, output_dir: str) -> None:
+    """Same mapping applied to a fully loaded DataFrame"""
+    df = pd.read_excel(excel_path, dtype=object)
+    mapper = ProductMapper(ExportMapping.load(default_mapping_path()), [str(column) for column in df.columns])
+    invalid = {}
+    with gzip.open(os.path.join(output_dir, 'dataframe.jsonl.gz'), 'wt', encoding='utf-8') as f:
+        for row in df.itertuples(index=False):
+            values = mapper.map_row(tuple(None if pd.isna(value) else value for value in row), invalid)
+            f.write(json.dumps(mapper.to_record(values), ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+def measure(function, excel_path: str, output_dir: str) -> tuple:
+    """Run once and return (elapsed seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(excel_path, output_dir)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare VAISC export approaches')
+    parser.add_argument('--rows', type=int, default=50000, help='Products in the master (default: 50000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_path = os.path.join(temp_dir, 'product_master.xlsx')
+        create_product_master(excel_path, args.rows)
+
+        print(f"📊 ベンチマーク: 商品マスタ {args.rows}行のVAISC出力")
+        for label, function in (('dataframe', export_dataframe), ('streaming', export_streaming)):
+            elapsed, peak_mb = measure(function, excel_path, temp_dir)
+            print(f"   {label:10}: {elapsed:.2f}s, ピークメモリ {peak_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel per-sheet conversion vs serial conversion
+複数シートのワークブックで並列変換の高速化率を計測
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.config import Config
+from core.converter import ExcelConverter
+from bench_conversion_engines import create_sample_workbook
+
+
+def run_conversion(excel_path: str, parallel: bool, max_workers: int) -> tuple:
+    """Convert once and return (elapsed seconds, markdown)"""
+    config = Config()
+    config.processing.parallel_processing = parallel
+    config.processing.max_workers = max_workers
+    converter = ExcelConverter(config, engine='inprocess')
+
+    start = time.perf_counter()
+    result = converter.convert_excel_to_markdown(excel_path)
+    elapsed = time.perf_counter() - start
+
+    if not result.success:
+        raise RuntimeError(result.error_message)
+    return elapsed, result.markdown_content
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare serial and parallel per-sheet conversion')
+    parser.add_argument('--sheets', type=int, default=8, help='Number of sheets (default: 8)')
+    parser.add_argument('--rows', type=int, default=1000, help='Rows per sheet (default: 1000)')
+    parser.add_argument('--workers', type=int, default=4, help='max_workers (default: 4)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_path = os.path.join(temp_dir, 'bench.xlsx')
+        create_sample_workbook(excel_path, sheets=args.sheets, rows=args.rows)
+
+        print(f"📊 ベンチマーク: {args.sheets}シート × {args.rows}行, ワーカー{args.workers}")
+        serial_time, serial_md = run_conversion(excel_path, parallel=False, max_workers=args.workers)
+        print(f"   直列: {serial_time:.2f}s")
+        parallel_time, parallel_md = run_conversion(excel_path, parallel=True, max_workers=args.workers)
+        print(f"   並列: {parallel_time:.2f}s")
+
+        print(f"   高速化: {serial_time / max(parallel_time, 1e-9):.1f}x")
+        print(f"   出力一致: {'はい' if serial_md == parallel_md else 'いいえ'}")
+
+
+if __name__ == "__main__":
+    main()
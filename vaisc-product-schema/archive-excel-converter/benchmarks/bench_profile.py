@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming column profiler vs pandas DataFrame profiling
+大きなシートで列プロファイル作成の時間とピークメモリを比較
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.session import WorkbookSession
+from core.analyzer import FileAnalyzer
+from bench_conversion_engines import create_sample_workbook
+
+
+def profile_streaming(excel_path: str) -> None:
+    """FileAnalyzer.profile over the raw sheet XML"""
+    with WorkbookSession(excel_path) as session:
+        FileAnalyzer().profile(session)
+
+
+def profile_dataframe(excel_path: str) -> None:
+    """Equivalent statistics from fully loaded DataFrames"""
+    for df in pd.read_excel(excel_path, sheet_name=None).values():
+        df.isna().mean()
+        df.nunique()
+        for column in df.columns:
+            df[column].value_counts().head(10)
+
+
+def measure(function, excel_path: str) -> tuple:
+    """Run once and return (elapsed seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(excel_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare column profiling approaches')
+    parser.add_argument('--rows', type=int, default=50000, help='Rows in the sheet (default: 50000)')
+    parser.add_argument('--cols', type=int, default=12, help='Columns in the sheet (default: 12)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_path = os.path.join(temp_dir, 'bench.xlsx')
+        create_sample_workbook(excel_path, sheets=1, rows=args.rows, cols=args.cols)
+
+        print(f"📊 ベンチマーク: {args.rows}行 × {args.cols}列の列プロファイル")
+        for label, function in (('dataframe', profile_dataframe), ('streaming', profile_streaming)):
+            elapsed, peak_mb = measure(function, excel_path)
+            print(f"   {label:10}: {elapsed:.2f}s, ピークメモリ {peak_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
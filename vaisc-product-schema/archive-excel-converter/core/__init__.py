@@ -11,11 +11,15 @@ from .cleaner import MarkdownCleaner
 from .analyzer import FileAnalyzer
 from .merger import SheetMerger
 from .config import Config
+from .session import WorkbookSession
+from .exporter import VaiscExporter
 
 __all__ = [
     'ExcelConverter',
     'MarkdownCleaner', 
     'FileAnalyzer',
     'SheetMerger',
-    'Config'
+    'Config',
+    'WorkbookSession',
+    'VaiscExporter'
 ]
\ No newline at end of file
@@ -1,8 +1,622 @@
 """
-File analyzer for Excel markdown conversion results
-TODO: Implementation in progress
+Raw-XML analyzer for .xlsx workbooks
+openpyxlのセルオブジェクトを作らず、シートXMLを逐次パースして構造を分析する
 """
 
+import datetime
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, FrozenSet, Iterator, Any
+from xml.parsers import expat
+
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import range_boundaries, get_column_letter, column_index_from_string
+from openpyxl.utils.datetime import from_excel
+
+from .config import ProfilingConfig
+from .session import WorkbookSession, MAIN_NS
+from .profiler import SheetProfile, SheetProfileBuilder, load_profiles, save_profiles
+
+
+# expat reports namespaced names as "<uri> <local name>"
+_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main '
+_C = _MAIN + 'c'
+_V = _MAIN + 'v'
+_F = _MAIN + 'f'
+_IS = _MAIN + 'is'
+_T = _MAIN + 't'
+_RPH = _MAIN + 'rPh'
+_SI = _MAIN + 'si'
+_ROW = _MAIN + 'row'
+_MERGE_CELL = _MAIN + 'mergeCell'
+_DIMENSION = _MAIN + 'dimension'
+
+# Integral floats beyond this are no longer exact integers
+_MAX_EXACT_INTEGER = 2 ** 53
+
+_READ_SIZE = 1024 * 1024
+
+
+def split_cell_ref(ref: str) -> Tuple[int, int]:
+    """Split cell reference like "AB12" into (row, column) numbers"""
+    letters = ref.rstrip('0123456789')
+    return int(ref[len(letters):]), column_index_from_string(letters)
+
+
+@dataclass
+class SheetScan:
+    """Structure of one sheet read from its XML part"""
+    name: str
+    index: int
+    state: str = "visible"  # visible, hidden, veryHidden
+    is_worksheet: bool = True
+    declared_dimension: str = ""  # <dimension ref> as written by the producer
+    max_row: int = 0  # extent of all cell elements and merged ranges (like openpyxl)
+    max_col: int = 0
+    used_min_row: int = 0  # bounding box of non-empty cells (0 = no data)
+    used_min_col: int = 0
+    used_max_row: int = 0
+    used_max_col: int = 0
+    cell_count: int = 0
+    non_empty_cells: int = 0
+    formula_cells: int = 0
+    merged_ranges: List[str] = field(default_factory=list)
+
+    @property
+    def used_range(self) -> str:
+        """Used range in A1 notation (empty when the sheet has no data)"""
+        if not self.used_max_row:
+            return ""
+        return (f"{get_column_letter(self.used_min_col)}{self.used_min_row}:"
+                f"{get_column_letter(self.used_max_col)}{self.used_max_row}")
+
+
+class _SheetHandler:
+    """expat callbacks for one worksheet part"""
+
+    def __init__(self, scan: SheetScan, blank_strings: bytearray):
+        self.scan = scan
+        self.blank_strings = blank_strings
+        self.row_idx = 0
+        self.col_idx = 0
+        self.cell_type = 'n'
+        self.has_formula = False
+        self.text: Optional[List[str]] = None
+        self.value: Optional[str] = None
+        self.in_phonetic = False
+
+    def start(self, tag, attrs):
+        if tag == _C:
+            ref = attrs.get('r')
+            if ref:
+                self.row_idx, self.col_idx = split_cell_ref(ref)
+            else:
+                self.col_idx += 1
+            self.cell_type = attrs.get('t', 'n')
+            self.has_formula = False
+            self.value = None
+        elif tag == _V:
+            self.text = []
+        elif tag == _T:
+            if not self.in_phonetic and self.cell_type == 'inlineStr':
+                if self.value is None:
+                    self.value = ''
+                self.text = []
+        elif tag == _F:
+            self.has_formula = True
+        elif tag == _RPH:
+            self.in_phonetic = True
+        elif tag == _ROW:
+            r = attrs.get('r')
+            self.row_idx = int(r) if r else self.row_idx + 1
+            self.col_idx = 0
+        elif tag == _MERGE_CELL:
+            ref = attrs.get('ref')
+            if ref:
+                self.scan.merged_ranges.append(ref)
+                min_c, min_r, max_c, max_r = range_boundaries(ref)
+                self._extend(max_r, max_c)
+        elif tag == _DIMENSION:
+            self.scan.declared_dimension = attrs.get('ref', '')
+
+    def data(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        if tag == _V:
+            self.value = ''.join(self.text)
+            self.text = None
+        elif tag == _C:
+            self._finish_cell()
+        elif tag == _T:
+            if self.text is not None:
+                self.value += ''.join(self.text)
+                self.text = None
+        elif tag == _RPH:
+            self.in_phonetic = False
+
+    def _finish_cell(self):
+        scan = self.scan
+        scan.cell_count += 1
+        if self.has_formula:
+            scan.formula_cells += 1
+        row, col = self.row_idx, self.col_idx
+        if row > scan.max_row:
+            scan.max_row = row
+        if col > scan.max_col:
+            scan.max_col = col
+
+        value = self.value
+        if value is None:
+            return
+        if self.cell_type == 's':
+            string_idx = int(value)
+            if string_idx >= len(self.blank_strings) or self.blank_strings[string_idx]:
+                return
+        elif not value.strip():
+            return
+
+        scan.non_empty_cells += 1
+        if not scan.used_max_row:
+            scan.used_min_row = scan.used_max_row = row
+            scan.used_min_col = scan.used_max_col = col
+            return
+        if row < scan.used_min_row:
+            scan.used_min_row = row
+        if row > scan.used_max_row:
+            scan.used_max_row = row
+        if col < scan.used_min_col:
+            scan.used_min_col = col
+        if col > scan.used_max_col:
+            scan.used_max_col = col
+
+    def _extend(self, row: int, col: int):
+        if row > self.scan.max_row:
+            self.scan.max_row = row
+        if col > self.scan.max_col:
+            self.scan.max_col = col
+
+
+class _CellHandler:
+    """
+    expat callbacks decoding the typed cell values of one worksheet part
+
+    Values are decoded like openpyxl returns them: shared and inline
+    strings as text, booleans as bool, integral numbers as int, numbers
+    with a date style as datetime. Subclasses receive them through
+    add_cell() and end_row().
+    """
+
+    def __init__(self, shared_strings: List[str], date_styles: FrozenSet[int]):
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.row_idx = 0
+        self.col_idx = 0
+        self.cell_type = 'n'
+        self.style = 0
+        self.text: Optional[List[str]] = None
+        self.value: Optional[str] = None
+        self.in_phonetic = False
+
+    def start(self, tag, attrs):
+        if tag == _C:
+            ref = attrs.get('r')
+            if ref:
+                self.row_idx, self.col_idx = split_cell_ref(ref)
+            else:
+                self.col_idx += 1
+            self.cell_type = attrs.get('t', 'n')
+            self.style = int(attrs.get('s', 0))
+            self.value = None
+        elif tag == _V:
+            self.text = []
+        elif tag == _T:
+            if not self.in_phonetic and self.cell_type == 'inlineStr':
+                if self.value is None:
+                    self.value = ''
+                self.text = []
+        elif tag == _RPH:
+            self.in_phonetic = True
+        elif tag == _ROW:
+            r = attrs.get('r')
+            self.row_idx = int(r) if r else self.row_idx + 1
+            self.col_idx = 0
+
+    def data(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        if tag == _V:
+            self.value = ''.join(self.text)
+            self.text = None
+        elif tag == _C:
+            if self.value is not None:
+                value = self._typed_value()
+                if value is not None:
+                    self.add_cell(self.row_idx, self.col_idx, value)
+        elif tag == _T:
+            if self.text is not None:
+                self.value += ''.join(self.text)
+                self.text = None
+        elif tag == _RPH:
+            self.in_phonetic = False
+        elif tag == _ROW:
+            self.end_row()
+
+    def add_cell(self, row: int, col: int, value: Any) -> None:
+        """Receive one decoded cell value"""
+
+    def end_row(self) -> None:
+        """Called after the last cell of each row"""
+
+    def _typed_value(self):
+        """Cell value like openpyxl returns it (None if it cannot be decoded)"""
+        value = self.value
+        cell_type = self.cell_type
+        if cell_type == 's':
+            string_idx = int(value)
+            return self.shared_strings[string_idx] if string_idx < len(self.shared_strings) else None
+        if cell_type in ('inlineStr', 'str', 'e', 'd'):
+            return value
+        if cell_type == 'b':
+            return value == '1'
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        if self.style in self.date_styles:
+            try:
+                return from_excel(number)
+            except (ValueError, OverflowError):
+                pass
+        if number.is_integer() and abs(number) < _MAX_EXACT_INTEGER:
+            return int(number)
+        return number
+
+
+class _ProfileHandler(_CellHandler):
+    """Feeds the typed cell values of one worksheet part to a SheetProfileBuilder"""
+
+    # Cell types whose text is kept as is instead of being profiled as a string
+    _TEXT_KINDS = {'e': 'error', 'd': 'date'}
+
+    def __init__(self, builder: SheetProfileBuilder, shared_strings: List[str], date_styles: FrozenSet[int]):
+        super().__init__(shared_strings, date_styles)
+        self.builder = builder
+
+    def add_cell(self, row: int, col: int, value: Any) -> None:
+        kind = self._TEXT_KINDS.get(self.cell_type)
+        if kind:
+            self.builder.add(row, col, kind, value)
+        elif isinstance(value, datetime.time):
+            self.builder.add(row, col, 'date', value.isoformat())
+        else:
+            _add_python_value(self.builder, row, col, value)
+
+
+def _add_number(builder: SheetProfileBuilder, row: int, col: int, number: float) -> None:
+    """Add a numeric cell; integral values count as integers like in the converted markdown"""
+    if number.is_integer() and abs(number) < _MAX_EXACT_INTEGER:
+        integer = int(number)
+        builder.add(row, col, 'integer', str(integer), integer)
+    else:
+        builder.add(row, col, 'float', repr(number), number)
+
+
+def _add_python_value(builder: SheetProfileBuilder, row: int, col: int, value) -> None:
+    """Add one DataFrame value (used for .xls, which has no XML parts)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return
+    if isinstance(value, bool):
+        builder.add(row, col, 'boolean', 'TRUE' if value else 'FALSE')
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        builder.add(row, col, 'date', value.isoformat())
+    elif isinstance(value, (int, float)):
+        _add_number(builder, row, col, float(value))
+    else:
+        text = str(value).strip()
+        if text:
+            builder.add(row, col, 'string', text)
+
+
+class _RowHandler(_CellHandler):
+    """Collects the typed cell values of each non-empty row"""
+
+    def __init__(self, shared_strings: List[str], date_styles: FrozenSet[int]):
+        super().__init__(shared_strings, date_styles)
+        self.rows: List[Tuple[int, List[Any]]] = []  # finished rows not yet consumed
+        self.cells: Dict[int, Any] = {}
+
+    def add_cell(self, row: int, col: int, value: Any) -> None:
+        if value != '':
+            self.cells[col] = value
+
+    def end_row(self) -> None:
+        if self.cells:
+            values = [None] * max(self.cells)
+            for col, value in self.cells.items():
+                values[col - 1] = value
+            self.rows.append((self.row_idx, values))
+            self.cells = {}
+
+
+class _SharedStringHandler:
+    """expat callbacks collecting one blank flag (or the text) per shared string"""
+
+    def __init__(self, keep_text: bool = False):
+        self.blank_flags = bytearray()
+        self.texts: Optional[List[str]] = [] if keep_text else None
+        self.parts: Optional[List[str]] = None
+        self.in_text = False
+        self.in_phonetic = False
+
+    def start(self, tag, attrs):
+        if tag == _SI:
+            self.parts = []
+        elif tag == _T and not self.in_phonetic:
+            self.in_text = True
+        elif tag == _RPH:
+            self.in_phonetic = True
+
+    def data(self, text):
+        if self.in_text:
+            self.parts.append(text)
+
+    def end(self, tag):
+        if tag == _T:
+            self.in_text = False
+        elif tag == _RPH:
+            self.in_phonetic = False
+        elif tag == _SI:
+            text = ''.join(self.parts)
+            if self.texts is not None:
+                self.texts.append(text)
+            else:
+                self.blank_flags.append(0 if text.strip() else 1)
+            self.parts = None
+
+
+def _iter_parse(stream, handler) -> Iterator[None]:
+    """Feed a binary stream to expat in fixed-size blocks, yielding after each block"""
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.data
+    while True:
+        block = stream.read(_READ_SIZE)
+        parser.Parse(block, not block)
+        yield
+        if not block:
+            break
+
+
+def _parse(stream, handler) -> None:
+    """Feed a whole binary stream to expat"""
+    for _ in _iter_parse(stream, handler):
+        pass
+
+
 class FileAnalyzer:
-    def __init__(self):
-        pass
\ No newline at end of file
+    """
+    Lean .xlsx analyzer working directly on the sheet XML parts
+
+    Each part is decompressed and parsed incrementally with expat; no
+    element tree and no openpyxl Cell objects are built, so memory stays
+    flat and large workbooks are analyzed much faster than with the
+    openpyxl object model.
+
+    profile() uses the same pass to build bounded-memory column profiles
+    (type, null rate, approximate distinct count, min/max, top values).
+    """
+
+    def __init__(self, profiling: Optional[ProfilingConfig] = None):
+        self.profiling = profiling or ProfilingConfig()
+
+    def analyze(self, session: WorkbookSession) -> List[SheetScan]:
+        """
+        Scan every sheet of an .xlsx workbook
+
+        Args:
+            session: Opened WorkbookSession of an .xlsx file
+
+        Returns:
+            One SheetScan per sheet in workbook order
+        """
+        blank_strings = self.read_blank_shared_strings(session)
+        package = set(session.zip_file.namelist())
+        scans = []
+
+        for idx, sheet_part in enumerate(session.sheet_parts()):
+            scan = SheetScan(
+                name=sheet_part.name,
+                index=idx,
+                state=sheet_part.state,
+                is_worksheet=sheet_part.is_worksheet
+            )
+            if sheet_part.is_worksheet and sheet_part.part in package:
+                with session.open_part(sheet_part.part) as stream:
+                    _parse(stream, _SheetHandler(scan, blank_strings))
+            scans.append(scan)
+
+        return scans
+
+    def read_blank_shared_strings(self, session: WorkbookSession) -> bytearray:
+        """Read shared strings table as flags (1 = blank string) instead of keeping texts"""
+        part = session.shared_strings_part
+        if not part or part not in session.zip_file.namelist():
+            return bytearray()
+
+        handler = _SharedStringHandler()
+        with session.open_part(part) as stream:
+            _parse(stream, handler)
+        return handler.blank_flags
+
+    def read_shared_strings(self, session: WorkbookSession) -> List[str]:
+        """Read shared strings table as plain texts (phonetic runs excluded)"""
+        part = session.shared_strings_part
+        if not part or part not in session.zip_file.namelist():
+            return []
+
+        handler = _SharedStringHandler(keep_text=True)
+        with session.open_part(part) as stream:
+            _parse(stream, handler)
+        return handler.texts
+
+    def read_date_styles(self, session: WorkbookSession) -> FrozenSet[int]:
+        """Indices of cell styles (cellXfs) whose number format displays a date"""
+        if 'xl/styles.xml' not in session.zip_file.namelist():
+            return frozenset()
+
+        root = ET.fromstring(session.zip_file.read('xl/styles.xml'))
+        formats = dict(BUILTIN_FORMATS)
+        for num_fmt in root.iter(f'{MAIN_NS}numFmt'):
+            formats[int(num_fmt.get('numFmtId', 0))] = num_fmt.get('formatCode', '')
+
+        date_styles = set()
+        cell_xfs = root.find(f'{MAIN_NS}cellXfs')
+        if cell_xfs is not None:
+            for style_idx, xf in enumerate(cell_xfs.iter(f'{MAIN_NS}xf')):
+                num_fmt_id = int(xf.get('numFmtId', 0))
+                if num_fmt_id in formats and is_date_format(formats[num_fmt_id]):
+                    date_styles.add(style_idx)
+        return frozenset(date_styles)
+
+    def iter_rows(self, session: WorkbookSession, sheet_name: str,
+                  shared_strings: Optional[List[str]] = None,
+                  date_styles: Optional[FrozenSet[int]] = None) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Stream the non-empty rows of one .xlsx sheet
+
+        The sheet part is parsed block by block and rows are handed out as
+        soon as their block is parsed, so memory holds the shared strings
+        table and at most one block of rows. Closing the iterator early
+        stops reading the part.
+
+        Args:
+            session: Opened WorkbookSession of an .xlsx file
+            sheet_name: Sheet to read
+            shared_strings: Shared strings table when reading several sheets
+                (default: read from the workbook)
+            date_styles: Date style indices (default: read from the workbook)
+
+        Yields:
+            Tuples of (1-based row number, cell values up to the last non-empty
+            cell, None for empty cells)
+
+        Raises:
+            ValueError: If the sheet does not exist
+        """
+        parts = {sheet_part.name: sheet_part for sheet_part in session.sheet_parts()}
+        sheet_part = parts.get(sheet_name)
+        if sheet_part is None:
+            raise ValueError(f"Sheet not found: {sheet_name}. Available: {', '.join(parts)}")
+        if not sheet_part.is_worksheet or sheet_part.part not in session.zip_file.namelist():
+            return
+        if shared_strings is None:
+            shared_strings = self.read_shared_strings(session)
+        if date_styles is None:
+            date_styles = self.read_date_styles(session)
+
+        handler = _RowHandler(shared_strings, date_styles)
+        with session.open_part(sheet_part.part) as stream:
+            for _ in _iter_parse(stream, handler):
+                yield from handler.rows
+                handler.rows = []
+
+    def profile(self, session: WorkbookSession,
+                sheet_names: Optional[List[str]] = None) -> List[SheetProfile]:
+        """
+        Profile the columns of each sheet in one pass
+
+        .xlsx sheets are streamed from their XML parts, so no DataFrame and
+        no Cell objects are built; only the shared strings table is kept.
+        .xls files have no XML parts and are profiled from their DataFrames.
+        The first non-empty row of a sheet is taken as its header.
+
+        Args:
+            session: Opened WorkbookSession
+            sheet_names: Sheets to profile (default: all sheets)
+
+        Returns:
+            One SheetProfile per sheet, in the requested order
+
+        Raises:
+            ValueError: If a sheet does not exist
+        """
+        available = session.sheet_names
+        names = list(sheet_names) if sheet_names else available
+        invalid_sheets = [name for name in names if name not in available]
+        if invalid_sheets:
+            raise ValueError(
+                f"Sheet(s) not found: {', '.join(invalid_sheets)}. Available: {', '.join(available)}"
+            )
+
+        if not session.is_xlsx:
+            profiles = []
+            for name, df in session.read_sheets(names).items():
+                builder = SheetProfileBuilder(self.profiling)
+                builder.header_row = 1 if len(df.columns) else 0
+                for col_idx, column in enumerate(df.columns, 1):
+                    header = str(column)
+                    if not header.startswith('Unnamed:'):
+                        builder.headers[col_idx] = header
+                    for row_idx, value in enumerate(df[column].tolist(), 2):
+                        _add_python_value(builder, row_idx, col_idx, value)
+                profiles.append(builder.build(name, available.index(name), data_rows=len(df)))
+            return profiles
+
+        shared_strings = self.read_shared_strings(session)
+        date_styles = self.read_date_styles(session)
+        package = set(session.zip_file.namelist())
+        parts: Dict[str, Tuple[int, object]] = {
+            sheet_part.name: (idx, sheet_part) for idx, sheet_part in enumerate(session.sheet_parts())
+        }
+
+        profiles = []
+        for name in names:
+            idx, sheet_part = parts[name]
+            builder = SheetProfileBuilder(self.profiling)
+            if sheet_part.is_worksheet and sheet_part.part in package:
+                with session.open_part(sheet_part.part) as stream:
+                    _parse(stream, _ProfileHandler(builder, shared_strings, date_styles))
+            profiles.append(builder.build(name, idx))
+        return profiles
+
+    def profile_to_file(self, session: WorkbookSession, excel_path: str, profile_path: str,
+                        sheet_names: Optional[List[str]] = None) -> Tuple[List[SheetProfile], List[str]]:
+        """
+        Profile sheets and cache the result as JSON
+
+        Profiles already in profile_path are reused for sheets whose
+        fingerprint (see WorkbookSession.sheet_fingerprints) and profiling
+        settings are unchanged; only the other sheets are scanned again.
+
+        Args:
+            session: Opened WorkbookSession for excel_path
+            excel_path: Path to Excel file (recorded in the JSON)
+            profile_path: JSON file to read and write
+            sheet_names: Sheets to profile (default: all sheets)
+
+        Returns:
+            Tuple of (profiles in sheet order, names of the sheets that were scanned)
+        """
+        names = list(sheet_names) if sheet_names else session.sheet_names
+        fingerprints = session.sheet_fingerprints(names)
+        cached = load_profiles(profile_path, self.profiling)
+
+        stale = [name for name in names
+                 if name not in cached or cached[name].fingerprint != fingerprints.get(name)]
+        fresh = {profile.name: profile for profile in self.profile(session, stale)} if stale else {}
+        for name, profile in fresh.items():
+            profile.fingerprint = fingerprints[name]
+
+        profiles = [fresh.get(name) or cached[name] for name in names]
+        for profile in profiles:
+            profile.index = session.sheet_names.index(profile.name)
+        if stale or len(cached) != len(names):
+            save_profiles(profile_path, excel_path, self.profiling, profiles)
+        return profiles, stale
@@ -0,0 +1,222 @@
+"""
+Batch processing of many Excel files with a worker pool
+複数のExcelファイルをワーカープロセスで並列変換する
+"""
+
+import os
+import copy
+import glob
+import json
+import time
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Callable, Any
+
+from .config import Config
+from .pipeline import ReformatPipeline
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+# Pipeline kept warm in each worker process
+_worker_pipeline: Optional[ReformatPipeline] = None
+
+
+@dataclass
+class BatchFileResult:
+    """Result of one file in a batch run"""
+    excel_path: str
+    output_path: str
+    success: bool
+    error_message: str = ""
+    elapsed_seconds: float = 0.0
+    sheet_count: int = 0
+    output_chars: int = 0
+    cache_hit: bool = False
+    unchanged: bool = False
+    cleaning_stats: Optional[Dict[str, Any]] = None
+    profile_path: str = ""
+
+
+def collect_excel_files(inputs: List[str]) -> List[str]:
+    """
+    Expand files, directories and glob patterns into Excel file paths
+
+    Args:
+        inputs: File paths, directories (searched recursively) or glob patterns
+
+    Returns:
+        Sorted, de-duplicated list of .xlsx/.xls paths (Excel lock files skipped)
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, '**', '*'), recursive=True)
+        elif glob.has_magic(item):
+            candidates = glob.glob(item, recursive=True)
+        else:
+            candidates = [item]
+
+        for path in candidates:
+            name = os.path.basename(path)
+            if name.startswith('~$') or not name.lower().endswith(EXCEL_EXTENSIONS):
+                continue
+            if os.path.isfile(path) or not os.path.exists(path):
+                found.append(path)
+
+    seen = set()
+    files = []
+    for path in sorted(found):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+    return files
+
+
+def _init_worker(config: Config) -> None:
+    """Process pool initializer: build one pipeline per worker"""
+    global _worker_pipeline
+    _worker_pipeline = ReformatPipeline(config)
+
+
+def _process_file_worker(excel_path: str, output_path: str,
+                         target_sheets: Optional[List[str]], clean: bool) -> BatchFileResult:
+    """
+    Process pool task: run the pipeline for one file, never raising
+
+    elapsed_seconds covers the whole task (open, validation and pipeline),
+    for failed files as well.
+    """
+    start = time.perf_counter()
+    try:
+        converter = _worker_pipeline.converter
+        session = converter.open_session(excel_path)
+        is_valid, error_msg = converter.validate_excel_file(excel_path, session=session)
+        if not is_valid:
+            session.close()
+            return BatchFileResult(excel_path=excel_path, output_path="",
+                                   success=False, error_message=error_msg,
+                                   elapsed_seconds=round(time.perf_counter() - start, 3))
+
+        result = _worker_pipeline.run(excel_path, output_path, target_sheets=target_sheets,
+                                      clean=clean, session=session)
+        return BatchFileResult(
+            excel_path=excel_path,
+            output_path=result.output_path,
+            success=result.success,
+            error_message=result.error_message,
+            elapsed_seconds=round(time.perf_counter() - start, 3),
+            sheet_count=len(result.sheets),
+            output_chars=result.output_chars,
+            cache_hit=result.cache_hit,
+            unchanged=result.unchanged,
+            cleaning_stats=asdict(result.cleaning_stats) if result.cleaning_stats else None,
+            profile_path=result.profile_path
+        )
+    except Exception as e:
+        return BatchFileResult(excel_path=excel_path, output_path="",
+                               success=False, error_message=f"Unexpected error: {str(e)}",
+                               elapsed_seconds=round(time.perf_counter() - start, 3))
+
+
+class BatchProcessor:
+    """Run the reformat pipeline over many files in a process pool"""
+
+    def __init__(self, config: Optional[Config] = None, max_workers: Optional[int] = None):
+        self.config = config or Config()
+        self.max_workers = max_workers or self.config.processing.max_workers
+
+    def plan_outputs(self, excel_files: List[str], output_dir: str) -> Dict[str, str]:
+        """Map each input file to an output path, disambiguating equal file names"""
+        outputs = {}
+        used = set()
+        for excel_path in excel_files:
+            stem = Path(excel_path).stem
+            name = f"{stem}_reformed.md"
+            counter = 2
+            while name in used:
+                name = f"{stem}_{counter}_reformed.md"
+                counter += 1
+            used.add(name)
+            outputs[excel_path] = os.path.join(output_dir, name)
+        return outputs
+
+    def run(self, excel_files: List[str], output_dir: str,
+            target_sheets: Optional[List[str]] = None,
+            clean: bool = True,
+            on_result: Optional[Callable[[BatchFileResult], None]] = None) -> List[BatchFileResult]:
+        """
+        Convert files in parallel; a failing file does not stop the batch
+
+        Args:
+            excel_files: Excel file paths
+            output_dir: Directory for markdown outputs
+            target_sheets: Optional sheet names to convert in every file
+            clean: Apply MarkdownCleaner
+            on_result: Optional callback invoked as each file finishes
+
+        Returns:
+            Results in input order
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = self.plan_outputs(excel_files, output_dir)
+
+        # Files are the unit of parallelism; do not nest per-sheet pools
+        worker_config = copy.deepcopy(self.config)
+        worker_config.processing.parallel_processing = False
+
+        results: Dict[str, BatchFileResult] = {}
+        workers = max(1, min(self.max_workers, len(excel_files)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(worker_config,)) as executor:
+            futures = {
+                executor.submit(_process_file_worker, path, outputs[path], target_sheets, clean): path
+                for path in excel_files
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = BatchFileResult(excel_path=path, output_path="",
+                                             success=False, error_message=f"Worker error: {str(e)}")
+                results[path] = result
+                if on_result:
+                    on_result(result)
+
+        return [results[path] for path in excel_files]
+
+    def build_summary(self, results: List[BatchFileResult], wall_seconds: float) -> Dict[str, Any]:
+        """Build batch summary with per-file timing and cleaning stats"""
+        totals = {}
+        rule_hits = {}
+        for result in results:
+            for key, value in (result.cleaning_stats or {}).items():
+                if key == 'rule_hits':
+                    for name, count in value.items():
+                        rule_hits[name] = rule_hits.get(name, 0) + count
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        if rule_hits:
+            totals['rule_hits'] = rule_hits
+
+        return {
+            'timestamp': datetime.now().strftime(self.config.output.timestamp_format),
+            'total_files': len(results),
+            'succeeded': sum(1 for r in results if r.success),
+            'failed': sum(1 for r in results if not r.success),
+            'cache_hits': sum(1 for r in results if r.cache_hit),
+            'unchanged': sum(1 for r in results if r.unchanged),
+            'wall_seconds': round(wall_seconds, 3),
+            'cpu_seconds': round(sum(r.elapsed_seconds for r in results), 3),
+            'cleaning_totals': totals,
+            'files': [asdict(r) for r in results],
+        }
+
+    def write_summary(self, summary: Dict[str, Any], summary_path: str) -> None:
+        """Write batch summary as JSON"""
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
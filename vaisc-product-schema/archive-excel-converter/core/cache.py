@@ -0,0 +1,201 @@
+"""
+Content-addressed conversion cache with size-based LRU eviction
+ワークブックの内容・シート選択・設定をキーに変換結果をディスクへキャッシュする
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Any
+
+from .config import Config
+from .converter import SheetInfo
+from .cleaner import CleaningStats
+
+
+RAW_FILE = 'raw.md'
+CLEANED_FILE = 'cleaned.md'
+META_FILE = 'meta.json'
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+# Processing settings that change the converted content; the rest are executor and tuning knobs
+OUTPUT_PROCESSING_KEYS = ('analysis_mode',)
+
+
+def hash_config(config: Config) -> str:
+    """
+    SHA-256 of the configuration that affects conversion output
+
+    Only the cleaning and output sections and the conversion settings in
+    OUTPUT_PROCESSING_KEYS are hashed, so batch workers (which turn off
+    per-sheet parallelism) and single-file runs share entries.
+    """
+    config_dict = config.get_dict()
+    key_source = {
+        'cleaning': config_dict['cleaning'],
+        'output': config_dict['output'],
+        'processing': {key: config_dict['processing'][key] for key in OUTPUT_PROCESSING_KEYS},
+    }
+    return hashlib.sha256(
+        json.dumps(key_source, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """Cached conversion result"""
+    raw_markdown: str
+    sheets: List[SheetInfo]
+    cleaned_markdown: Optional[str] = None
+    cleaning_stats: Optional[CleaningStats] = None
+
+
+class ConversionCache:
+    """On-disk cache of raw and cleaned markdown keyed by content hashes"""
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 512):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, workbook_hash: str, target_sheets: Optional[List[str]], config: Config) -> str:
+        """
+        Build cache key
+
+        Args:
+            workbook_hash: SHA-256 of the workbook bytes
+            target_sheets: Sheet selection (None = all sheets)
+            config: Configuration used for conversion and cleaning
+
+        Returns:
+            Hex key
+        """
+        key_source = json.dumps({
+            'workbook': workbook_hash,
+            'sheets': target_sheets,
+            'config': hash_config(config),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Load entry and mark it as recently used"""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, META_FILE)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(os.path.join(entry_dir, RAW_FILE), 'r', encoding='utf-8') as f:
+                raw_markdown = f.read()
+
+            cleaned_markdown = None
+            if meta.get('cleaning_stats') is not None:
+                with open(os.path.join(entry_dir, CLEANED_FILE), 'r', encoding='utf-8') as f:
+                    cleaned_markdown = f.read()
+
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+
+        return CacheEntry(
+            raw_markdown=raw_markdown,
+            sheets=[SheetInfo(**sheet) for sheet in meta.get('sheets', [])],
+            cleaned_markdown=cleaned_markdown,
+            cleaning_stats=CleaningStats(**meta['cleaning_stats']) if meta.get('cleaning_stats') else None
+        )
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """Store entry atomically, then evict least recently used entries over the size cap"""
+        entry_dir = self._entry_dir(key)
+        parent_dir = os.path.dirname(entry_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+
+        temp_dir = tempfile.mkdtemp(dir=parent_dir, prefix='.tmp-')
+        try:
+            with open(os.path.join(temp_dir, RAW_FILE), 'w', encoding='utf-8') as f:
+                f.write(entry.raw_markdown)
+            if entry.cleaned_markdown is not None and entry.cleaning_stats is not None:
+                with open(os.path.join(temp_dir, CLEANED_FILE), 'w', encoding='utf-8') as f:
+                    f.write(entry.cleaned_markdown)
+            meta = {
+                'sheets': [asdict(sheet) for sheet in entry.sheets],
+                'cleaning_stats': asdict(entry.cleaning_stats) if entry.cleaning_stats else None,
+            }
+            with open(os.path.join(temp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def _list_entries(self) -> List[Dict[str, Any]]:
+        """
+        List cache entries with size and last-use time
+
+        Plain files next to the entry directories (the per-workbook sheet
+        state of incremental runs) count as entries of their own.
+        """
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                if key.startswith('.tmp-'):
+                    continue
+                entry_path = os.path.join(prefix_dir, key)
+                try:
+                    if os.path.isdir(entry_path):
+                        size = sum(
+                            os.path.getsize(os.path.join(entry_path, name))
+                            for name in os.listdir(entry_path)
+                        )
+                        last_used = os.path.getmtime(os.path.join(entry_path, META_FILE))
+                    else:
+                        size = os.path.getsize(entry_path)
+                        last_used = os.path.getmtime(entry_path)
+                except OSError:
+                    continue
+                entries.append({'path': entry_path, 'size': size, 'last_used': last_used})
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits max_size_mb
+
+        Returns:
+            Number of removed entries
+        """
+        entries = self._list_entries()
+        total_size = sum(entry['size'] for entry in entries)
+        removed = 0
+
+        for entry in sorted(entries, key=lambda e: e['last_used']):
+            if total_size <= self.max_size_bytes:
+                break
+            if os.path.isdir(entry['path']):
+                shutil.rmtree(entry['path'], ignore_errors=True)
+            else:
+                try:
+                    os.remove(entry['path'])
+                except OSError:
+                    pass
+            total_size -= entry['size']
+            removed += 1
+
+        return removed
@@ -0,0 +1,146 @@
+"""
+Token-budgeted, table-aware chunking of Markdown for prompts
+Markdownを表の行境界で分割し、各チャンクに見出しと表ヘッダーを繰り返してトークン予算内に収める
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List, Iterable, Iterator
+
+from .document import (Document, DocumentLine, iter_blocks, iter_block_lines,
+                       HEADING, TABLE_SEPARATOR, TABLE_ROW, TABLE_HEADER)
+
+
+DEFAULT_CHUNK_TOKENS = 30000
+
+CONTINUED_SUFFIX = "（続き）"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting
+
+    ASCII text averages about 4 characters per token; kana, kanji and
+    other non-ASCII characters are counted as one token each, which is
+    on the safe side for Japanese.
+    """
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars))
+
+
+@dataclass
+class PromptChunk:
+    """One chunk of a Markdown document"""
+    index: int  # 1-based
+    content: str
+    tokens: int  # estimated tokens of content
+    heading: str = ""  # section heading in effect at the start of the chunk
+    start_line: int = 0  # 1-based line range of the source document
+    end_line: int = 0
+    repeated_header: bool = False  # starts with a repeated heading / table header
+
+
+class MarkdownChunker:
+    """
+    Split Markdown into chunks of at most max_tokens estimated tokens
+
+    Chunks end on line boundaries, so table rows are never cut. A chunk
+    that starts inside a section repeats the section heading (marked as
+    continued), and one that starts inside a table also repeats the table
+    header and separator rows, so each chunk can be read on its own.
+    A chunk only exceeds the budget when a single line is larger than it.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CHUNK_TOKENS):
+        self.max_tokens = max(max_tokens, 1)
+
+    def chunk(self, markdown: str) -> List[PromptChunk]:
+        """Split a document into chunks"""
+        return self.chunk_document(Document.parse(markdown))
+
+    def chunk_document(self, document: Document) -> List[PromptChunk]:
+        """Split a parsed document into chunks"""
+        return list(self._iter_chunks(document.iter_lines()))
+
+    def iter_chunks(self, lines: Iterable[str]) -> Iterator[PromptChunk]:
+        """
+        Split lines into chunks as they arrive
+
+        Args:
+            lines: Document lines without line terminators
+
+        Yields:
+            PromptChunk objects in document order
+        """
+        return self._iter_chunks(iter_block_lines(iter_blocks(lines)))
+
+    def _iter_chunks(self, document_lines: Iterable[DocumentLine]) -> Iterator[PromptChunk]:
+        """Chunk rendered document lines, using their kind instead of re-parsing the text"""
+        heading = ""
+        table_header: List[str] = []
+        previous = ""
+
+        chunk_lines: List[str] = []
+        chunk_tokens = 0
+        body_lines = 0
+        chunk_heading = ""
+        repeated = False
+        start_line = 1
+        index = 0
+
+        for line_no, (kind, line, _, _) in enumerate(document_lines, 1):
+            # Per-line estimates (plus the newline) add up to an upper bound of the chunk estimate
+            line_tokens = estimate_tokens(line) + 1
+            if (body_lines and chunk_tokens + line_tokens > self.max_tokens
+                    and self._can_split_before(kind, line)):
+                index += 1
+                content = '\n'.join(chunk_lines)
+                yield PromptChunk(index=index, content=content, tokens=estimate_tokens(content),
+                                  heading=chunk_heading, start_line=start_line, end_line=line_no - 1,
+                                  repeated_header=repeated)
+
+                context = self._context(kind, heading, table_header)
+                chunk_lines = context
+                chunk_tokens = sum(estimate_tokens(context_line) + 1 for context_line in context)
+                body_lines = 0
+                chunk_heading = heading
+                repeated = bool(context)
+                start_line = line_no
+
+            if kind == HEADING:
+                heading = line
+                table_header = []
+            elif kind == TABLE_SEPARATOR:
+                if not table_header:
+                    table_header = [previous, line]
+            elif kind not in (TABLE_HEADER, TABLE_ROW):
+                table_header = []
+
+            if not chunk_lines:
+                chunk_heading = heading
+            chunk_lines.append(line)
+            chunk_tokens += line_tokens
+            body_lines += 1
+            previous = line
+
+        if body_lines:
+            index += 1
+            content = '\n'.join(chunk_lines)
+            yield PromptChunk(index=index, content=content, tokens=estimate_tokens(content),
+                              heading=chunk_heading, start_line=start_line,
+                              end_line=start_line + body_lines - 1, repeated_header=repeated)
+
+    def _can_split_before(self, kind: str, line: str) -> bool:
+        """Never separate a table header from its separator row or a record from its continuation lines"""
+        return kind != TABLE_SEPARATOR and not line.startswith('  ')
+
+    def _context(self, kind: str, heading: str, table_header: List[str]) -> List[str]:
+        """Lines repeated at the top of a chunk that starts at a line of the given kind"""
+        if kind == HEADING:
+            return []
+        context = []
+        if heading:
+            context.extend([heading + CONTINUED_SUFFIX, ""])
+        if table_header and kind == TABLE_ROW:
+            context.extend(table_header)
+        return context
@@ -3,11 +3,20 @@ Markdown cleaner for Excel conversion results
 AI読みやすさ向上のためのクリーニング機能
 """
 
+import os
 import re
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
+from dataclasses import dataclass, field, fields
 
 from .config import Config
+from .rules import compile_rules
+from .document import Document, Table, Block, iter_blocks, block_line_count, split_table_row
+
+
+# Cleaner kept warm in each worker process
+_worker_cleaner: Optional['MarkdownCleaner'] = None
 
 
 @dataclass
@@ -20,6 +29,49 @@ class CleaningStats:
     formatted_numbers: int = 0
     removed_empty_rows: int = 0
     normalized_whitespace: int = 0
+    pipe_table_chars: int = 0  # size of cleaned tables as pipe tables (records format only)
+    record_chars: int = 0  # size of the same tables as records
+    rule_hits: Dict[str, int] = field(default_factory=dict)
+    
+    def merge(self, other: 'CleaningStats') -> None:
+        """Add the counts of another cleaning run (e.g. of another sheet)"""
+        for stat in fields(self):
+            if stat.name == 'rule_hits':
+                for name, count in other.rule_hits.items():
+                    self.rule_hits[name] = self.rule_hits.get(name, 0) + count
+            else:
+                setattr(self, stat.name, getattr(self, stat.name) + getattr(other, stat.name))
+
+
+def _init_clean_worker(config: Config) -> None:
+    """Process pool initializer: build one cleaner per worker"""
+    global _worker_cleaner
+    _worker_cleaner = MarkdownCleaner(config)
+
+
+def _clean_rows_worker(rows: List[List[str]], header_mapping: Dict[int, bool],
+                       record_headers: Optional[List[str]]) -> Tuple[List[str], CleaningStats]:
+    """Process pool task: clean one chunk of table data rows"""
+    _worker_cleaner.stats = CleaningStats()
+    cleaned_rows = _worker_cleaner._clean_table_rows(rows, header_mapping)
+    return _worker_cleaner._render_rows(cleaned_rows, record_headers), _worker_cleaner.stats
+
+
+def _pipe_row(cells: List[str]) -> str:
+    """Render cleaned cells as "| a | b |" """
+    return '| ' + ' | '.join(cells) + ' |'
+
+
+def _pipe_row_width(cells: List[str]) -> int:
+    """len(_pipe_row(cells)) without building the string"""
+    return sum(map(len, cells)) + 3 * len(cells) + 1 if cells else 4
+
+
+class _PendingRows:
+    """Placeholder for data rows being cleaned in worker processes"""
+    
+    def __init__(self, futures: List[Future]):
+        self.futures = futures
 
 
 class MarkdownCleaner:
@@ -28,6 +80,21 @@ class MarkdownCleaner:
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
         self.stats = CleaningStats()
+        self.rules = compile_rules(self.config.cleaning)
+        self._pool: Optional[ProcessPoolExecutor] = None  # started on the first parallel clean, then reused
+        self._executor: Optional[ProcessPoolExecutor] = None  # set while data rows are dispatched to the pool
+    
+    def __enter__(self) -> 'MarkdownCleaner':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Shut down the worker pool used for parallel cleaning"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
     
     def clean_markdown(self, content: str) -> Tuple[str, CleaningStats]:
         """
@@ -39,127 +106,252 @@ class MarkdownCleaner:
         Returns:
             Tuple of (cleaned_content, cleaning_statistics)
         """
-        self.stats = CleaningStats()
-        lines = content.split('\n')
-        self.stats.original_lines = len(lines)
+        return self.clean_document(Document.parse(content))
+    
+    def clean_document(self, document: Document) -> Tuple[str, CleaningStats]:
+        """
+        Clean an already parsed document
+        
+        Args:
+            document: Document parsed from MarkItDown output
+            
+        Returns:
+            Tuple of (cleaned_content, cleaning_statistics)
+        """
+        if self._should_clean_parallel(document.blocks):
+            cleaned_lines = self._clean_blocks_parallel(document.blocks)
+        else:
+            cleaned_lines = list(self.clean_blocks(document.blocks))
+        return '\n'.join(cleaned_lines), self.stats
+    
+    def _should_clean_parallel(self, blocks: List[Block]) -> bool:
+        """Use worker processes only when table rows span several chunk_size chunks"""
+        processing = self.config.processing
+        if not processing.parallel_processing or processing.max_workers < 2:
+            return False
+        if (os.cpu_count() or 1) < 2:
+            return False
+        
+        table_rows = sum(block.line_count - block.blank_lines if isinstance(block, Table) else '|' in block
+                         for block in blocks)
+        return table_rows > processing.chunk_size * 2
+    
+    def _clean_blocks_parallel(self, blocks: List[Block]) -> List[str]:
+        """
+        Clean blocks with table data rows spread over a process pool
+        
+        Headers, separators and non-table lines are cleaned here in order;
+        data rows are sent in chunk_size chunks and spliced back in place,
+        and the workers' CleaningStats are merged, so the result equals the
+        serial output. The pool is started once and reused by later calls
+        (one per sheet in streaming and incremental runs) until close().
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.config.processing.max_workers,
+                                             initializer=_init_clean_worker, initargs=(self.config,))
+        self._executor = self._pool
+        try:
+            items = list(self.clean_blocks(blocks))
+        finally:
+            self._executor = None
         
         cleaned_lines = []
-        i = 0
+        for item in items:
+            if not isinstance(item, _PendingRows):
+                cleaned_lines.append(item)
+                continue
+            for future in item.futures:
+                cleaned_rows, chunk_stats = future.result()
+                cleaned_lines.extend(cleaned_rows)
+                self.stats.merge(chunk_stats)
+        
+        self.stats.cleaned_lines = len(cleaned_lines)
+        return cleaned_lines
+    
+    def clean_stream(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Clean markdown lines in one forward pass
         
-        while i < len(lines):
-            line = lines[i].strip()
+        Args:
+            lines: Markdown lines without line terminators (a trailing "\n" is ignored)
             
-            # Skip empty lines
-            if not line:
-                cleaned_lines.append('')
-                i += 1
+        Yields:
+            Cleaned lines
+        """
+        return self.clean_blocks(iter_blocks(lines))
+    
+    def clean_blocks(self, blocks: Iterable[Block]) -> Iterator[str]:
+        """
+        Clean document blocks in one forward pass
+        
+        Both lookaheads of the cleaner (sheet statistics and table blocks)
+        end at the first non-blank line without '|'. The blocks are therefore
+        processed as groups of one such anchor line followed by its run of
+        blank lines, headings containing '|' and at most one table (the last
+        block of the run); only the current run is buffered.
+        self.stats is complete once the generator is exhausted.
+        
+        Args:
+            blocks: Document blocks (see core.document.iter_blocks)
+            
+        Yields:
+            Cleaned lines
+        """
+        self.stats = CleaningStats()
+        anchor = None
+        run: List[Block] = []
+        
+        for block in blocks:
+            self.stats.original_lines += block_line_count(block)
+            if isinstance(block, Table) or '|' in block or not block.strip():
+                run.append(block)
                 continue
             
-            # Handle sheet headers
+            for cleaned_line in self._clean_group(anchor, run):
+                self.stats.cleaned_lines += 1
+                yield cleaned_line
+            anchor = block
+            run = []
+        
+        for cleaned_line in self._clean_group(anchor, run):
+            self.stats.cleaned_lines += 1
+            yield cleaned_line
+    
+    def _clean_group(self, anchor: Optional[str], run: List[Block]) -> Iterator[str]:
+        """Clean one anchor line (None at document start) and the blocks after it"""
+        if anchor is not None:
+            line = anchor.strip()
             if line.startswith('## '):
-                cleaned_lines.append(line)
-                # Add metadata if enabled
-                if self.config.output.include_statistics:
-                    # Look ahead to find table and add statistics
-                    table_stats = self._analyze_upcoming_table(lines[i+1:])
-                    if table_stats:
-                        cleaned_lines.append('')
-                        cleaned_lines.append(f"**データ行数**: {table_stats['data_rows']}行")
-                        cleaned_lines.append(f"**データ列数**: {table_stats['data_cols']}列")
-                        if table_stats['quality_score']:
-                            cleaned_lines.append(f"**データ品質**: {table_stats['quality_score']:.1%}")
-                        cleaned_lines.append('')
-                i += 1
-                continue
+                yield from self._sheet_header_lines(line, run)
+            else:
+                # Handle regular content
+                cleaned_line = self._clean_regular_line(line)
+                if cleaned_line is not None:
+                    yield cleaned_line
+        
+        for position, block in enumerate(run):
+            # Handle table content: the table ends the group
+            if isinstance(block, Table):
+                yield from self._clean_table(block)
+                return
             
-            # Handle table content
-            if '|' in line:
-                table_lines = self._extract_table_block(lines[i:])
-                cleaned_table = self._clean_table_block(table_lines)
-                cleaned_lines.extend(cleaned_table)
-                i += len(table_lines)
-                continue
+            line = block.strip()
             
-            # Handle regular content
-            cleaned_line = self._clean_regular_line(line)
-            if cleaned_line is not None:
-                cleaned_lines.append(cleaned_line)
+            # Skip empty lines
+            if not line:
+                yield ''
+                continue
             
-            i += 1
-        
-        self.stats.cleaned_lines = len(cleaned_lines)
-        return '\n'.join(cleaned_lines), self.stats
+            # Sheet header containing '|'
+            yield from self._sheet_header_lines(line, run[position + 1:])
     
-    def _extract_table_block(self, lines: List[str]) -> List[str]:
-        """Extract complete table block starting from current position"""
-        table_lines = []
-        for line in lines:
-            if '|' in line or (line.strip() == '' and table_lines):
-                table_lines.append(line)
-            else:
-                break
-        return table_lines
+    def _sheet_header_lines(self, header: str, upcoming: List[Block]) -> Iterator[str]:
+        """Sheet header followed by the statistics block of its table"""
+        yield header
+        # Add metadata if enabled
+        if self.config.output.include_statistics:
+            table_stats = self._analyze_upcoming_table(upcoming)
+            if table_stats:
+                yield ''
+                yield f"**データ行数**: {table_stats['data_rows']}行"
+                yield f"**データ列数**: {table_stats['data_cols']}列"
+                if table_stats['quality_score']:
+                    yield f"**データ品質**: {table_stats['quality_score']:.1%}"
+                yield ''
     
-    def _clean_table_block(self, table_lines: List[str]) -> List[str]:
-        """Clean a complete table block"""
-        if not table_lines:
-            return []
-        
-        # Separate header, separator, and data rows
-        header_line = None
-        separator_line = None
-        data_lines = []
-        
-        for line in table_lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if '|' in line:
-                if header_line is None:
-                    header_line = line
-                elif separator_line is None and '---' in line:
-                    separator_line = line
-                else:
-                    data_lines.append(line)
-        
-        if not header_line:
-            return []
-        
+    def _clean_table(self, table: Table) -> List[str]:
+        """Clean a complete table"""
         # Clean header
-        cleaned_header, header_mapping = self._clean_table_header(header_line)
+        cleaned_header, header_mapping = self._clean_table_header(table.header)
         
         # Clean separator
-        cleaned_separator = self._clean_table_separator(separator_line, header_mapping)
+        cleaned_separator = self._clean_table_separator(table.separator, header_mapping)
         
-        # Clean data rows
-        cleaned_data = []
-        for data_line in data_lines:
-            cleaned_row = self._clean_table_row(data_line, header_mapping)
-            if cleaned_row and self._is_row_meaningful(cleaned_row):
-                cleaned_data.append(cleaned_row)
-            else:
-                self.stats.removed_empty_rows += 1
-        
-        # Assemble cleaned table
+        # Assemble cleaned table (records carry the column names themselves)
         result = []
-        if cleaned_header:
-            result.append(cleaned_header)
-        if cleaned_separator:
-            result.append(cleaned_separator)
-        result.extend(cleaned_data)
+        record_headers = None
+        if self.config.output.table_format == "records":
+            record_headers = cleaned_header
+            self.stats.pipe_table_chars += _pipe_row_width(cleaned_header) + _pipe_row_width(cleaned_separator) + 2
+        else:
+            result.append(_pipe_row(cleaned_header))
+            result.append(_pipe_row(cleaned_separator))
+        
+        # Clean data rows (in worker processes while a pool is active)
+        if self._executor is not None and table.rows:
+            chunk_size = max(1, self.config.processing.chunk_size)
+            result.append(_PendingRows([
+                self._executor.submit(_clean_rows_worker, table.rows[start:start + chunk_size],
+                                      header_mapping, record_headers)
+                for start in range(0, len(table.rows), chunk_size)
+            ]))
+        else:
+            cleaned_rows = self._clean_table_rows(table.rows, header_mapping)
+            result.extend(self._render_rows(cleaned_rows, record_headers))
         
         return result
     
-    def _clean_table_header(self, header_line: str) -> Tuple[str, Dict[int, bool]]:
+    def _render_rows(self, cleaned_rows: List[List[str]], record_headers: Optional[List[str]]) -> List[str]:
+        """Render cleaned data rows as pipe rows, or as records when record_headers is given"""
+        if record_headers is not None:
+            return self._rows_to_records(cleaned_rows, record_headers)
+        return [_pipe_row(cells) for cells in cleaned_rows]
+    
+    def _rows_to_records(self, cleaned_rows: List[List[str]], headers: List[str]) -> List[str]:
+        """
+        Render cleaned rows as "header: value" records
+        
+        Only non-empty cells are written, so columns that are empty in a
+        row (or in the whole table) take no space. Each record starts with
+        "- " and continues with indented lines; no '|' is emitted.
+        
+        Args:
+            cleaned_rows: Cleaned cells of each row
+            headers: Column names from the cleaned header row
+            
+        Returns:
+            Record lines
+        """
+        names = [header.strip() or f"列{i + 1}" for i, header in enumerate(headers)]
+        record_lines = []
+        
+        for cells in cleaned_rows:
+            self.stats.pipe_table_chars += _pipe_row_width(cells) + 1
+            fields = [
+                f"{names[i] if i < len(names) else f'列{i + 1}'}: {cell}"
+                for i, cell in enumerate(cells) if cell
+            ]
+            if not fields:
+                continue
+            
+            record = ["- " + fields[0]] + ["  " + item for item in fields[1:]]
+            self.stats.record_chars += sum(len(line) + 1 for line in record)
+            record_lines.extend(record)
+        
+        return record_lines
+    
+    def _clean_table_rows(self, rows: List[List[str]], header_mapping: Dict[int, bool]) -> List[List[str]]:
+        """Clean data rows with the configured table engine, dropping rows that are not meaningful"""
+        if self.config.cleaning.table_engine == "columnar":
+            return self._clean_table_rows_columnar(rows, header_mapping)
+        
+        cleaned_data = []
+        for cells in rows:
+            cleaned_cells = self._clean_table_row(cells, header_mapping)
+            if self._is_row_meaningful(cleaned_cells):
+                cleaned_data.append(cleaned_cells)
+            else:
+                self.stats.removed_empty_rows += 1
+        return cleaned_data
+    
+    def _clean_table_header(self, cells: List[str]) -> Tuple[List[str], Dict[int, bool]]:
         """
         Clean table header and create column mapping
         
         Returns:
-            Tuple of (cleaned_header, column_mapping)
+            Tuple of (cleaned_header_cells, column_mapping)
             column_mapping: {column_index: should_keep}
         """
-        cells = self._split_table_row(header_line)
         header_mapping = {}
         cleaned_cells = []
         
@@ -175,84 +367,89 @@ class MarkdownCleaner:
             header_mapping[i] = True
             cleaned_cells.append(cell)
         
-        return '| ' + ' | '.join(cleaned_cells) + ' |', header_mapping
+        return cleaned_cells, header_mapping
     
-    def _clean_table_separator(self, separator_line: str, header_mapping: Dict[int, bool]) -> str:
+    def _clean_table_separator(self, cells: Optional[List[str]], header_mapping: Dict[int, bool]) -> List[str]:
         """Clean table separator based on header mapping"""
-        if not separator_line:
-            return '| ' + ' | '.join(['---'] * len([k for k, v in header_mapping.items() if v])) + ' |'
-        
-        cells = self._split_table_row(separator_line)
-        cleaned_cells = []
-        
-        for i, cell in enumerate(cells):
-            if header_mapping.get(i, True):
-                cleaned_cells.append('---')
+        if cells is None:
+            return ['---'] * len([k for k, v in header_mapping.items() if v])
         
-        return '| ' + ' | '.join(cleaned_cells) + ' |'
+        return ['---' for i in range(len(cells)) if header_mapping.get(i, True)]
     
-    def _clean_table_row(self, row_line: str, header_mapping: Dict[int, bool]) -> str:
+    def _clean_table_row(self, cells: List[str], header_mapping: Dict[int, bool]) -> List[str]:
         """Clean individual table data row"""
-        cells = self._split_table_row(row_line)
         cleaned_cells = []
         
         for i, cell in enumerate(cells):
             if not header_mapping.get(i, True):
                 continue
             
-            cell = cell.strip()
-            
-            # Remove NaN values
-            if self.config.cleaning.remove_nan and cell.upper() in ['NAN', 'NULL', 'N/A']:
-                cell = ''
-                self.stats.removed_nan_count += 1
-            
-            # Format numbers
-            if self.config.cleaning.format_numbers:
-                cell = self._format_number_cell(cell)
-            
-            # Normalize whitespace
-            if self.config.cleaning.normalize_whitespace:
-                cell = re.sub(r'\s+', ' ', cell).strip()
-                self.stats.normalized_whitespace += 1
+            cell, hits = self.rules.apply(cell)
+            if hits:
+                self._count_rule_hits(hits, 1)
             
             cleaned_cells.append(cell)
         
-        return '| ' + ' | '.join(cleaned_cells) + ' |'
+        return cleaned_cells
     
-    def _split_table_row(self, row: str) -> List[str]:
-        """Split table row into cells, handling edge cases"""
-        # Remove leading/trailing pipes and split
-        row = row.strip()
-        if row.startswith('|'):
-            row = row[1:]
-        if row.endswith('|'):
-            row = row[:-1]
-        
-        return row.split('|')
+    def _clean_table_rows_columnar(self, rows: List[List[str]], header_mapping: Dict[int, bool]) -> List[List[str]]:
+        """
+        Clean all data rows of a table at once
+        
+        Cells are flattened, each distinct value goes through the compiled
+        rules a single time and the results are mapped back, so repeated
+        values (NaN, empty, codes) cost one dict lookup. Output and
+        statistics are identical to _clean_table_row followed by
+        _is_row_meaningful.
+        """
+        # Drop removed columns; cells beyond the header width are kept
+        keep = [header_mapping.get(i, True) for i in range(len(header_mapping))]
+        if not all(keep):
+            width = len(keep)
+            rows = [[cell for cell, kept in zip(row, keep) if kept] + row[width:] for row in rows]
+        
+        flat = [cell for row in rows for cell in row]
+        cleaned_values = {}
+        for value, count in Counter(flat).items():
+            cleaned_values[value], hits = self.rules.apply(value)
+            if hits:
+                self._count_rule_hits(hits, count)
+        
+        flat = list(map(cleaned_values.__getitem__, flat))
+        
+        threshold = 1 - self.config.cleaning.empty_cell_threshold
+        records = self.config.output.table_format == "records"
+        cleaned_data = []
+        position = 0
+        for row in rows:
+            cells = flat[position:position + len(row)]
+            position += len(row)
+            
+            non_empty = len(cells) - cells.count('')
+            if (non_empty > 0) if records else (non_empty / max(len(cells), 1) >= threshold):
+                cleaned_data.append(cells)
+            else:
+                self.stats.removed_empty_rows += 1
+        
+        return cleaned_data
     
-    def _format_number_cell(self, cell: str) -> str:
-        """Format number cells for better readability"""
-        # Remove .0 from whole numbers
-        if re.match(r'^\d+\.0$', cell):
-            self.stats.formatted_numbers += 1
-            return cell[:-2]
-        
-        # Format large numbers with commas (optional)
-        if re.match(r'^\d{4,}$', cell):
-            try:
-                num = int(cell)
-                return f"{num:,}"
-            except ValueError:
-                pass
-        
-        return cell
+    def _count_rule_hits(self, hits: Tuple[int, ...], count: int) -> None:
+        """Add rule hits (for count identical cells) to per-rule and legacy statistics"""
+        for index in hits:
+            name = self.rules.names[index]
+            self.stats.rule_hits[name] = self.stats.rule_hits.get(name, 0) + count
+            stat = self.rules.stats[index]
+            if stat:
+                setattr(self.stats, stat, getattr(self.stats, stat) + count)
     
-    def _is_row_meaningful(self, row: str) -> bool:
-        """Check if a table row contains meaningful data"""
-        cells = self._split_table_row(row)
+    def _is_row_meaningful(self, cells: List[str]) -> bool:
+        """Check if a cleaned table row contains meaningful data"""
         non_empty_cells = [cell.strip() for cell in cells if cell.strip()]
         
+        # Records keep sparse rows: they only cost their non-empty cells
+        if self.config.output.table_format == "records":
+            return bool(non_empty_cells)
+        
         # Row is meaningful if it has more than threshold percentage of non-empty cells
         threshold = 1 - self.config.cleaning.empty_cell_threshold
         meaningful_ratio = len(non_empty_cells) / max(len(cells), 1)
@@ -270,39 +467,32 @@ class MarkdownCleaner:
         
         return line
     
-    def _analyze_upcoming_table(self, upcoming_lines: List[str]) -> Optional[Dict]:
+    def _analyze_upcoming_table(self, upcoming: List[Block]) -> Optional[Dict]:
         """Analyze upcoming table to generate statistics"""
-        table_lines = []
-        for line in upcoming_lines:
-            if '|' in line:
-                table_lines.append(line)
-            elif line.strip() == '':
-                continue
-            else:
-                break
-        
-        if len(table_lines) < 2:  # Need at least header and one data row
+        table_rows = []
+        for block in upcoming:
+            if isinstance(block, Table):
+                table_rows.extend(block.iter_rows())
+            elif '|' in block:
+                table_rows.append(split_table_row(block))
+        
+        if len(table_rows) < 2:  # Need at least header and one data row
             return None
         
         # Count data rows (exclude header and separator)
         data_rows = 0
-        for line in table_lines[2:]:  # Skip header and separator
-            if '|' in line and '---' not in line:
+        for cells in table_rows[2:]:  # Skip header and separator
+            if not any('---' in cell for cell in cells):
                 data_rows += 1
         
         # Count data columns
-        if table_lines:
-            header_cells = self._split_table_row(table_lines[0])
-            data_cols = len([cell for cell in header_cells if cell.strip() and 'Unnamed:' not in cell])
-        else:
-            data_cols = 0
+        data_cols = len([cell for cell in table_rows[0] if cell.strip() and 'Unnamed:' not in cell])
         
         # Calculate quality score
         total_cells = data_rows * data_cols
         if total_cells > 0:
             non_empty_count = 0
-            for line in table_lines[2:]:
-                cells = self._split_table_row(line)
+            for cells in table_rows[2:]:
                 for cell in cells:
                     if cell.strip() and cell.strip().upper() not in ['NAN', 'NULL', 'N/A']:
                         non_empty_count += 1
@@ -5,10 +5,19 @@ Configuration management for Excel Markdown Reformatter
 import yaml
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field
 
 
+# Built-in cell rules in application order (see core/rules.py)
+DEFAULT_CLEANING_RULES = [
+    {'name': 'nan_tokens'},
+    {'name': 'thousands_separator'},
+    {'name': 'whole_number_decimal'},
+    {'name': 'whitespace'},
+]
+
+
 @dataclass
 class CleaningConfig:
     """Data cleaning configuration"""
@@ -18,6 +27,8 @@ class CleaningConfig:
     empty_cell_threshold: float = 0.8
     preserve_formulas: bool = False
     normalize_whitespace: bool = True
+    table_engine: str = "columnar"  # columnar, rowwise
+    rules: List[Dict[str, Any]] = field(default_factory=lambda: [dict(rule) for rule in DEFAULT_CLEANING_RULES])
 
 
 @dataclass
@@ -29,6 +40,10 @@ class OutputConfig:
     include_statistics: bool = True
     add_quality_score: bool = True
     timestamp_format: str = "%Y-%m-%d %H:%M:%S"
+    deterministic: bool = False  # stamp source hash instead of wall-clock time
+    streaming: bool = False  # write each sheet as soon as it is cleaned
+    table_format: str = "pipe"  # pipe, records (header: value per non-empty cell)
+    max_shard_bytes: int = 0  # merged output split into files of at most this size (0 = one file)
 
 
 @dataclass
@@ -49,6 +64,35 @@ class ProcessingConfig:
     chunk_size: int = 1000
     memory_limit_mb: int = 512
     timeout_seconds: int = 300
+    conversion_engine: str = "auto"  # auto, inprocess, subprocess
+    analysis_mode: str = "streaming"  # streaming, full
+
+
+@dataclass
+class CacheConfig:
+    """Conversion cache configuration"""
+    enabled: bool = False
+    directory: str = ".excel_md_cache"
+    max_size_mb: int = 512
+    incremental: bool = False  # reconvert only sheets changed since the last run
+
+
+@dataclass
+class ProfilingConfig:
+    """Column profiling configuration"""
+    enabled: bool = False  # write <output>.profile.json next to the markdown
+    top_k: int = 10
+    hll_precision: int = 12  # 2^precision HyperLogLog registers per high-cardinality column
+    max_value_length: int = 100  # longer values are truncated before counting
+
+
+@dataclass
+class ExportConfig:
+    """VAISC product export configuration"""
+    mapping_path: str = ""  # field mapping YAML (empty: config/vaisc_mapping.yaml)
+    format: str = "jsonl"  # jsonl, csv
+    max_shard_bytes: int = 1024 * 1024 * 1024  # compressed bytes per gzip shard (0 = one shard)
+    sheet: str = ""  # product master sheet (empty: mapping's sheet or first sheet with the header)
 
 
 class Config:
@@ -60,6 +104,9 @@ class Config:
         self.output = OutputConfig()
         self.ai = AIConfig()
         self.processing = ProcessingConfig()
+        self.cache = CacheConfig()
+        self.profiling = ProfilingConfig()
+        self.export = ExportConfig()
         
         if os.path.exists(self.config_path):
             self.load_from_file(self.config_path)
@@ -85,6 +132,15 @@ class Config:
                 
             if 'processing' in config_data:
                 self._update_dataclass(self.processing, config_data['processing'])
+            
+            if 'cache' in config_data:
+                self._update_dataclass(self.cache, config_data['cache'])
+            
+            if 'profiling' in config_data:
+                self._update_dataclass(self.profiling, config_data['profiling'])
+            
+            if 'export' in config_data:
+                self._update_dataclass(self.export, config_data['export'])
                 
         except Exception as e:
             print(f"Warning: Failed to load config from {config_path}: {e}")
@@ -105,6 +161,8 @@ class Config:
                 'empty_cell_threshold': self.cleaning.empty_cell_threshold,
                 'preserve_formulas': self.cleaning.preserve_formulas,
                 'normalize_whitespace': self.cleaning.normalize_whitespace,
+                'table_engine': self.cleaning.table_engine,
+                'rules': self.cleaning.rules,
             },
             'output': {
                 'add_metadata': self.output.add_metadata,
@@ -113,6 +171,10 @@ class Config:
                 'include_statistics': self.output.include_statistics,
                 'add_quality_score': self.output.add_quality_score,
                 'timestamp_format': self.output.timestamp_format,
+                'deterministic': self.output.deterministic,
+                'streaming': self.output.streaming,
+                'table_format': self.output.table_format,
+                'max_shard_bytes': self.output.max_shard_bytes,
             },
             'ai_enhancement': {
                 'enabled': self.ai.enabled,
@@ -127,6 +189,26 @@ class Config:
                 'chunk_size': self.processing.chunk_size,
                 'memory_limit_mb': self.processing.memory_limit_mb,
                 'timeout_seconds': self.processing.timeout_seconds,
+                'conversion_engine': self.processing.conversion_engine,
+                'analysis_mode': self.processing.analysis_mode,
+            },
+            'cache': {
+                'enabled': self.cache.enabled,
+                'directory': self.cache.directory,
+                'max_size_mb': self.cache.max_size_mb,
+                'incremental': self.cache.incremental,
+            },
+            'profiling': {
+                'enabled': self.profiling.enabled,
+                'top_k': self.profiling.top_k,
+                'hll_precision': self.profiling.hll_precision,
+                'max_value_length': self.profiling.max_value_length,
+            },
+            'export': {
+                'mapping_path': self.export.mapping_path,
+                'format': self.export.format,
+                'max_shard_bytes': self.export.max_shard_bytes,
+                'sheet': self.export.sheet,
             }
         }
         
@@ -141,4 +223,7 @@ class Config:
             'output': self.output.__dict__,
             'ai_enhancement': self.ai.__dict__,
             'processing': self.processing.__dict__,
+            'cache': self.cache.__dict__,
+            'profiling': self.profiling.__dict__,
+            'export': self.export.__dict__,
         }
\ No newline at end of file
@@ -4,14 +4,16 @@ Excel to Markdown converter using MarkItDown
 
 import os
 import subprocess
-import tempfile
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator
 from dataclasses import dataclass
 import pandas as pd
 import openpyxl
 
 from .config import Config
+from .engine import create_engine
+from .session import WorkbookSession
+from .analyzer import FileAnalyzer
 
 
 @dataclass
@@ -24,6 +26,8 @@ class SheetInfo:
     non_empty_cells: int
     data_quality_score: float = 0.0
     issues: List[str] = None
+    state: str = "visible"  # visible, hidden, veryHidden
+    used_range: str = ""  # bounding box of non-empty cells (streaming analysis)
     
     def __post_init__(self):
         if self.issues is None:
@@ -47,26 +51,25 @@ class ConversionResult:
 class ExcelConverter:
     """Excel to Markdown converter using MarkItDown"""
     
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, engine: Optional[str] = None):
         self.config = config or Config()
-        self._check_markitdown()
+        self.engine = create_engine(self.config, engine)
     
-    def _check_markitdown(self) -> None:
-        """Check if MarkItDown is available"""
-        try:
-            result = subprocess.run(
-                ['python', '-m', 'markitdown', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode != 0:
-                raise RuntimeError("MarkItDown is not properly installed")
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            raise RuntimeError(f"MarkItDown is not available: {e}")
+    def open_session(self, excel_path: str) -> WorkbookSession:
+        """
+        Open Excel file once for validate/analyze/list/convert
+        
+        Args:
+            excel_path: Path to Excel file
+            
+        Returns:
+            WorkbookSession to pass to the other converter methods
+        """
+        return WorkbookSession(excel_path)
     
     def convert_excel_to_markdown(self, excel_path: str, output_path: Optional[str] = None, 
-                                 target_sheets: Optional[List[str]] = None) -> ConversionResult:
+                                 target_sheets: Optional[List[str]] = None,
+                                 session: Optional[WorkbookSession] = None) -> ConversionResult:
         """
         Convert Excel file to Markdown using MarkItDown
         
@@ -74,10 +77,12 @@ class ExcelConverter:
             excel_path: Path to Excel file
             output_path: Optional output file path
             target_sheets: Optional list of sheet names to convert (None = all sheets)
+            session: Optional already opened WorkbookSession for excel_path
             
         Returns:
             ConversionResult with conversion status and content
         """
+        owns_session = False
         try:
             # Validate input file
             if not os.path.exists(excel_path):
@@ -86,8 +91,12 @@ class ExcelConverter:
                     error_message=f"Excel file not found: {excel_path}"
                 )
             
+            if session is None:
+                session = self.open_session(excel_path)
+                owns_session = True
+            
             # Get sheet information before conversion
-            sheets = self.get_sheet_info(excel_path)
+            sheets = self.get_sheet_info(excel_path, session=session)
             
             # Handle specific sheet selection
             if target_sheets:
@@ -101,42 +110,21 @@ class ExcelConverter:
                     )
                 
                 # Convert specific sheets only
-                return self._convert_specific_sheets(excel_path, target_sheets, sheets, output_path)
+                return self._convert_specific_sheets(excel_path, target_sheets, sheets, output_path,
+                                                     session=session)
             
             # Convert using MarkItDown (all sheets)
-            if output_path:
-                # Convert to file
-                result = subprocess.run(
-                    ['python', '-m', 'markitdown', excel_path, '-o', output_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=self.config.processing.timeout_seconds
-                )
-                
-                if result.returncode == 0:
-                    with open(output_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                else:
-                    return ConversionResult(
-                        success=False,
-                        error_message=f"MarkItDown conversion failed: {result.stderr}"
-                    )
-            else:
-                # Convert to stdout
-                result = subprocess.run(
-                    ['python', '-m', 'markitdown', excel_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=self.config.processing.timeout_seconds
+            try:
+                content = self._convert_sheets(excel_path, session.sheet_names, sheets, session)
+            except RuntimeError as e:
+                return ConversionResult(
+                    success=False,
+                    error_message=str(e)
                 )
-                
-                if result.returncode == 0:
-                    content = result.stdout
-                else:
-                    return ConversionResult(
-                        success=False,
-                        error_message=f"MarkItDown conversion failed: {result.stderr}"
-                    )
+            
+            if output_path:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
             
             return ConversionResult(
                 success=True,
@@ -155,23 +143,39 @@ class ExcelConverter:
                 success=False,
                 error_message=f"Conversion error: {str(e)}"
             )
+        finally:
+            if owns_session:
+                session.close()
     
-    def get_sheet_info(self, excel_path: str) -> List[SheetInfo]:
+    def get_sheet_info(self, excel_path: str, session: Optional[WorkbookSession] = None) -> List[SheetInfo]:
         """
         Analyze Excel file and get sheet information
         
         Args:
             excel_path: Path to Excel file
+            session: Optional already opened WorkbookSession for excel_path
             
         Returns:
             List of SheetInfo objects
         """
+        if session is not None and session.sheet_info is not None:
+            return session.sheet_info
+        
         sheets = []
+        owns_session = False
         
         try:
-            # Use openpyxl for .xlsx files
-            if excel_path.endswith('.xlsx'):
-                wb = openpyxl.load_workbook(excel_path, data_only=True)
+            if session is None:
+                session = self.open_session(excel_path)
+                owns_session = True
+            
+            # Stream sheet XML for .xlsx files (bounded memory, single pass)
+            if excel_path.endswith('.xlsx') and self.config.processing.analysis_mode == "streaming":
+                sheets = self._get_sheet_info_streaming(session)
+            
+            # Use openpyxl object model for .xlsx files
+            elif excel_path.endswith('.xlsx'):
+                wb = openpyxl.load_workbook(session.open_stream(), data_only=True)
                 for idx, sheet_name in enumerate(wb.sheetnames):
                     ws = wb[sheet_name]
                     
@@ -197,30 +201,27 @@ class ExcelConverter:
                         cols=ws.max_column,
                         non_empty_cells=non_empty,
                         data_quality_score=quality_score,
-                        issues=issues
+                        issues=issues,
+                        state=ws.sheet_state
                     )
                     sheets.append(sheet_info)
                 
                 wb.close()
             
-            # Use pandas for .xls files
+            # Use pandas for .xls files: decode all sheets once, frames stay in the session
             elif excel_path.endswith('.xls'):
-                xls = pd.ExcelFile(excel_path)
-                for idx, sheet_name in enumerate(xls.sheet_names):
-                    df = pd.read_excel(xls, sheet_name=sheet_name)
-                    
-                    non_empty = df.count().sum()
+                frames = session.read_sheets()
+                for idx, (sheet_name, df) in enumerate(frames.items()):
+                    non_empty, issues = self._analyze_dataframe(df)
                     total_cells = df.size
                     quality_score = non_empty / max(total_cells, 1)
                     
-                    issues = self._detect_dataframe_issues(df)
-                    
                     sheet_info = SheetInfo(
                         name=sheet_name,
                         index=idx,
                         rows=len(df),
                         cols=len(df.columns),
-                        non_empty_cells=int(non_empty),
+                        non_empty_cells=non_empty,
                         data_quality_score=quality_score,
                         issues=issues
                     )
@@ -236,6 +237,63 @@ class ExcelConverter:
                 non_empty_cells=0,
                 issues=[f"Analysis error: {str(e)}"]
             ))
+        finally:
+            if owns_session:
+                session.close()
+        
+        if session is not None and not owns_session:
+            session.sheet_info = sheets
+        return sheets
+    
+    def _get_sheet_info_streaming(self, session: WorkbookSession) -> List[SheetInfo]:
+        """
+        Analyze .xlsx sheets with FileAnalyzer (raw XML, no Cell objects)
+        
+        Cells, non-empty values, formulas, merged ranges, used range and
+        visibility come from one incremental pass over each sheet part.
+        """
+        sheets = []
+        
+        for scan in FileAnalyzer().analyze(session):
+            if not scan.is_worksheet:
+                sheets.append(SheetInfo(
+                    name=scan.name,
+                    index=scan.index,
+                    rows=0,
+                    cols=0,
+                    non_empty_cells=0,
+                    issues=["Not a worksheet (chart sheet)"],
+                    state=scan.state
+                ))
+                continue
+            
+            total_cells = scan.max_row * scan.max_col
+            quality_score = scan.non_empty_cells / max(total_cells, 1) if total_cells > 0 else 0
+            
+            rows = scan.max_row or 1
+            cols = scan.max_col or 1
+            
+            issues = []
+            if scan.merged_ranges:
+                issues.append(f"Contains {len(scan.merged_ranges)} merged cell ranges")
+            if scan.formula_cells:
+                issues.append(f"Contains {scan.formula_cells} formula cells")
+            if cols > 50:
+                issues.append(f"Very wide sheet ({cols} columns)")
+            if scan.state != "visible":
+                issues.append(f"Hidden sheet ({scan.state})")
+            
+            sheets.append(SheetInfo(
+                name=scan.name,
+                index=scan.index,
+                rows=rows,
+                cols=cols,
+                non_empty_cells=scan.non_empty_cells,
+                data_quality_score=quality_score,
+                issues=issues,
+                state=scan.state,
+                used_range=scan.used_range
+            ))
         
         return sheets
     
@@ -263,8 +321,16 @@ class ExcelConverter:
         
         return issues
     
-    def _detect_dataframe_issues(self, df: pd.DataFrame) -> List[str]:
-        """Detect common issues in pandas DataFrame"""
+    def _analyze_dataframe(self, df: pd.DataFrame) -> Tuple[int, List[str]]:
+        """
+        Count non-empty cells and detect common issues in one vectorized pass
+        
+        Args:
+            df: Sheet DataFrame
+            
+        Returns:
+            Tuple of (non_empty_cells, issues)
+        """
         issues = []
         
         # Check for unnamed columns
@@ -272,23 +338,26 @@ class ExcelConverter:
         if unnamed_cols:
             issues.append(f"Contains {len(unnamed_cols)} unnamed columns")
         
-        # Check for high NaN ratio
-        nan_ratio = df.isnull().sum().sum() / df.size
-        if nan_ratio > 0.5:
-            issues.append(f"High NaN ratio ({nan_ratio:.1%})")
-        
-        # Check for very sparse data
-        if df.count().sum() / df.size < 0.1:
-            issues.append("Very sparse data (>90% empty)")
+        # One notna mask serves the cell count, NaN ratio and sparsity checks
+        non_empty = int(df.notna().to_numpy().sum())
+        if df.size:
+            nan_ratio = 1 - non_empty / df.size
+            if nan_ratio > 0.5:
+                issues.append(f"High NaN ratio ({nan_ratio:.1%})")
+            
+            if non_empty / df.size < 0.1:
+                issues.append("Very sparse data (>90% empty)")
         
-        return issues
+        return non_empty, issues
     
-    def validate_excel_file(self, excel_path: str) -> Tuple[bool, str]:
+    def validate_excel_file(self, excel_path: str,
+                            session: Optional[WorkbookSession] = None) -> Tuple[bool, str]:
         """
         Validate Excel file before conversion
         
         Args:
             excel_path: Path to Excel file
+            session: Optional WorkbookSession; the parsed workbook is kept for later calls
             
         Returns:
             Tuple of (is_valid, error_message)
@@ -307,7 +376,9 @@ class ExcelConverter:
         
         # Try to open file
         try:
-            if excel_path.endswith('.xlsx'):
+            if session is not None:
+                session.load()
+            elif excel_path.endswith('.xlsx'):
                 wb = openpyxl.load_workbook(excel_path, read_only=True)
                 wb.close()
             else:
@@ -318,153 +389,177 @@ class ExcelConverter:
         return True, "File is valid"
     
     def _convert_specific_sheets(self, excel_path: str, target_sheets: List[str], 
-                               all_sheets: List[SheetInfo], output_path: Optional[str] = None) -> ConversionResult:
+                               all_sheets: List[SheetInfo], output_path: Optional[str] = None,
+                               session: Optional[WorkbookSession] = None) -> ConversionResult:
         """
         Convert specific sheets from Excel file to Markdown
         
+        Only the requested sheets are read and rendered, straight from the
+        source workbook (no filtered copy, no temporary file).
+        
         Args:
             excel_path: Path to Excel file
             target_sheets: List of sheet names to convert
             all_sheets: All sheet information
             output_path: Optional output file path
+            session: Optional already opened WorkbookSession for excel_path
             
         Returns:
             ConversionResult with conversion status and content
         """
+        owns_session = False
         try:
             # Filter sheets to target ones only
             target_sheet_info = [sheet for sheet in all_sheets if sheet.name in target_sheets]
             
-            # Create temporary Excel file with only target sheets
-            temp_excel_path = self._create_filtered_excel(excel_path, target_sheets)
+            if session is None:
+                session = self.open_session(excel_path)
+                owns_session = True
             
             try:
-                # Convert filtered Excel using MarkItDown
-                if output_path:
-                    result = subprocess.run(
-                        ['python', '-m', 'markitdown', temp_excel_path, '-o', output_path],
-                        capture_output=True,
-                        text=True,
-                        timeout=self.config.processing.timeout_seconds
-                    )
-                    
-                    if result.returncode == 0:
-                        with open(output_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    else:
-                        return ConversionResult(
-                            success=False,
-                            error_message=f"MarkItDown conversion failed: {result.stderr}"
-                        )
-                else:
-                    result = subprocess.run(
-                        ['python', '-m', 'markitdown', temp_excel_path],
-                        capture_output=True,
-                        text=True,
-                        timeout=self.config.processing.timeout_seconds
-                    )
-                    
-                    if result.returncode == 0:
-                        content = result.stdout
-                    else:
-                        return ConversionResult(
-                            success=False,
-                            error_message=f"MarkItDown conversion failed: {result.stderr}"
-                        )
-                
+                content = self._convert_sheets(excel_path, target_sheets, all_sheets, session)
+            except RuntimeError as e:
                 return ConversionResult(
-                    success=True,
-                    markdown_content=content,
-                    sheets=target_sheet_info,
-                    file_path=output_path or ""
+                    success=False,
+                    error_message=str(e)
                 )
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_excel_path):
-                    os.remove(temp_excel_path)
+            
+            if output_path:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            
+            return ConversionResult(
+                success=True,
+                markdown_content=content,
+                sheets=target_sheet_info,
+                file_path=output_path or ""
+            )
                     
         except Exception as e:
             return ConversionResult(
                 success=False,
                 error_message=f"Sheet filtering error: {str(e)}"
             )
+        finally:
+            if owns_session:
+                session.close()
+    
+    def _convert_sheets(self, excel_path: str, sheet_names: List[str],
+                        all_sheets: List[SheetInfo], session: WorkbookSession) -> str:
+        """
+        Convert the given sheets and join them with OutputConfig.sheet_separator
+        
+        Every engine goes through convert_sheet_sections, so the subprocess,
+        in-process and parallel paths produce the same document.
+        """
+        sections = self.convert_sheet_sections(excel_path, sheet_names, session, all_sheets)
+        return self.config.output.sheet_separator.join(sections).strip()
     
-    def _create_filtered_excel(self, excel_path: str, target_sheets: List[str]) -> str:
+    def convert_sheet_sections(self, excel_path: str, sheet_names: List[str],
+                               session: WorkbookSession,
+                               all_sheets: Optional[List[SheetInfo]] = None) -> List[str]:
         """
-        Create temporary Excel file containing only target sheets
+        Convert the given sheets to one "## sheet" markdown section each
         
         Args:
-            excel_path: Original Excel file path
-            target_sheets: List of sheet names to include
+            excel_path: Path to Excel file
+            sheet_names: Sheet names to convert, in output order
+            session: Opened WorkbookSession for excel_path
+            all_sheets: Optional sheet information used to decide on parallel conversion
             
         Returns:
-            Path to temporary Excel file
+            Markdown sections in the order of sheet_names
         """
-        import tempfile
-        import shutil
+        if not self.engine.supports_frames:
+            full_content = self.engine.convert(excel_path)
+            sections = self._split_sheet_sections(full_content, session.sheet_names)
+            missing = [name for name in sheet_names if name not in sections]
+            if missing:
+                raise RuntimeError(f"Sheet section(s) not found in MarkItDown output: {', '.join(missing)}")
+            return [sections[name] for name in sheet_names]
         
-        # Create temporary file
-        temp_dir = tempfile.mkdtemp()
-        temp_excel_path = os.path.join(temp_dir, f"filtered_{os.path.basename(excel_path)}")
+        if all_sheets and self._should_convert_parallel(sheet_names, all_sheets):
+            return self.engine.render_sheets_parallel(
+                excel_path, sheet_names, self.config.processing.max_workers
+            )
         
-        if excel_path.endswith('.xlsx'):
-            # Use openpyxl for .xlsx files
-            import openpyxl
-            
-            # Load original workbook
-            wb_orig = openpyxl.load_workbook(excel_path)
-            
-            # Create new workbook
-            wb_new = openpyxl.Workbook()
-            
-            # Remove default sheet
-            wb_new.remove(wb_new.active)
-            
-            # Copy target sheets
-            for sheet_name in target_sheets:
-                if sheet_name in wb_orig.sheetnames:
-                    # Copy sheet
-                    ws_orig = wb_orig[sheet_name]
-                    ws_new = wb_new.create_sheet(title=sheet_name)
-                    
-                    # Copy data
-                    for row in ws_orig.iter_rows():
-                        for cell in row:
-                            ws_new[cell.coordinate].value = cell.value
-            
-            # Save new workbook
-            wb_new.save(temp_excel_path)
-            wb_orig.close()
-            wb_new.close()
-            
-        else:
-            # Use pandas for .xls files
-            # Read all sheets
-            all_sheets = pd.read_excel(excel_path, sheet_name=None)
+        return self.engine.render_frames(session.read_sheets(sheet_names))
+    
+    def iter_sheet_sections(self, sheet_names: List[str],
+                            session: WorkbookSession) -> Iterator[Tuple[str, str]]:
+        """
+        Render sheets one at a time, dropping each DataFrame once rendered
+        
+        Only available for engines that render parsed frames; memory use stays
+        near the size of the largest sheet.
+        
+        Args:
+            sheet_names: Sheet names to convert, in output order
+            session: Opened WorkbookSession
             
-            # Filter to target sheets
-            filtered_sheets = {name: df for name, df in all_sheets.items() if name in target_sheets}
+        Yields:
+            Tuples of (sheet_name, markdown_section)
+        """
+        if not self.engine.supports_frames:
+            raise RuntimeError(f"Engine '{self.engine.name}' cannot render sheets one at a time")
+        
+        for sheet_name in sheet_names:
+            df = session.read_sheet(sheet_name, cache=False)
+            section = self.engine.render_frames({sheet_name: df})[0]
+            del df
+            yield sheet_name, section
+    
+    def _should_convert_parallel(self, sheet_names: List[str], all_sheets: List[SheetInfo]) -> bool:
+        """Use the process pool only for multi-sheet workbooks with more than chunk_size rows"""
+        processing = self.config.processing
+        if not processing.parallel_processing or processing.max_workers < 2 or len(sheet_names) < 2:
+            return False
+        
+        total_rows = sum(sheet.rows for sheet in all_sheets if sheet.name in sheet_names)
+        return total_rows > processing.chunk_size
+    
+    def _split_sheet_sections(self, content: str, sheet_names: List[str]) -> Dict[str, str]:
+        """
+        Split full MarkItDown output into "## sheet" sections
+        
+        Args:
+            content: Markdown of all sheets
+            sheet_names: All sheet names in workbook order
             
-            # Write to new file
-            with pd.ExcelWriter(temp_excel_path, engine='openpyxl') as writer:
-                for sheet_name, df in filtered_sheets.items():
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+        Returns:
+            Mapping of sheet name to its stripped section (empty if no header matched)
+        """
+        sections: Dict[str, List[str]] = {}
+        
+        # Sheet headers appear in workbook order; match them sequentially
+        pending = iter(sheet_names)
+        expected = next(pending, None)
+        current = None
+        for line in content.split('\n'):
+            if expected is not None and line == f"## {expected}":
+                current = expected
+                sections[current] = []
+                expected = next(pending, None)
+            if current is not None:
+                sections[current].append(line)
         
-        return temp_excel_path
+        return {name: '\n'.join(lines).strip() for name, lines in sections.items()}
     
-    def list_sheet_names(self, excel_path: str) -> List[str]:
+    def list_sheet_names(self, excel_path: str, session: Optional[WorkbookSession] = None) -> List[str]:
         """
         Get list of sheet names from Excel file
         
         Args:
             excel_path: Path to Excel file
+            session: Optional already opened WorkbookSession for excel_path
             
         Returns:
             List of sheet names
         """
         try:
-            if excel_path.endswith('.xlsx'):
+            if session is not None:
+                sheet_names = session.sheet_names
+            elif excel_path.endswith('.xlsx'):
                 wb = openpyxl.load_workbook(excel_path, read_only=True)
                 sheet_names = wb.sheetnames
                 wb.close()
@@ -0,0 +1,225 @@
+"""
+Parsed document model shared by the cleaner and the prompt processors
+変換結果のMarkdownを一度だけ解析し、シート・表・セルの構造として各処理段で共有する
+"""
+
+from typing import List, Iterable, Iterator, Optional, Tuple, Union
+
+
+# Line kinds yielded by Document.iter_lines
+TEXT = 'text'
+BLANK = 'blank'
+HEADING = 'heading'
+TABLE_HEADER = 'header'
+TABLE_SEPARATOR = 'separator'
+TABLE_ROW = 'row'
+
+
+def split_table_row(row: str) -> List[str]:
+    """Split a table row into its raw cells (outer pipes removed, cells not stripped)"""
+    row = row.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|'):
+        row = row[:-1]
+    return row.split('|')
+
+
+def render_table_row(cells: List[str]) -> str:
+    """Inverse of split_table_row for a row written as "|cell|cell|" """
+    return '|' + '|'.join(cells) + '|'
+
+
+class Table:
+    """
+    One Markdown table as lists of raw cells
+
+    The separator is the first "---" row after the header, normally the
+    second row. Blank lines between the table rows are only counted; they
+    are rendered after the table.
+    """
+
+    __slots__ = ('header', 'separator', 'separator_at', 'rows', 'blank_lines')
+
+    def __init__(self, header: List[str], separator: Optional[List[str]] = None,
+                 rows: Optional[List[List[str]]] = None, blank_lines: int = 0, separator_at: int = 0):
+        self.header = header
+        self.separator = separator  # None when the table has no "---" row
+        self.separator_at = separator_at  # data rows before the separator in the source
+        self.rows = rows if rows is not None else []
+        self.blank_lines = blank_lines
+
+    @property
+    def line_count(self) -> int:
+        return 1 + (self.separator is not None) + len(self.rows) + self.blank_lines
+
+    def iter_rows(self) -> Iterator[List[str]]:
+        """Header, separator and data rows in source order"""
+        yield self.header
+        if self.separator is None:
+            yield from self.rows
+            return
+        yield from self.rows[:self.separator_at]
+        yield self.separator
+        yield from self.rows[self.separator_at:]
+
+    def lines(self) -> Iterator[str]:
+        for cells in self.iter_rows():
+            yield render_table_row(cells)
+        for _ in range(self.blank_lines):
+            yield ''
+
+
+# A block is a line of text ('' for a blank line) or a table
+Block = Union[str, Table]
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """
+    Parse Markdown lines into blocks in one forward pass
+
+    A table starts at a line containing '|' and runs, over blank lines, up
+    to the next non-blank line without '|'. A "## " heading containing '|'
+    is kept as a text line when it comes before the table. Only the
+    current table is held in memory.
+
+    Args:
+        lines: Markdown lines (a trailing "\\n" is ignored)
+
+    Yields:
+        Text lines (blank lines as '') and Table objects
+    """
+    table: Optional[Table] = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if '|' in line:
+            stripped = line.strip()
+            if table is None:
+                if stripped.startswith('## '):
+                    yield line
+                    continue
+                table = Table(split_table_row(stripped))
+            elif table.separator is None and '---' in stripped:
+                table.separator = split_table_row(stripped)
+                table.separator_at = len(table.rows)
+            else:
+                table.rows.append(split_table_row(stripped))
+        elif not line.strip():
+            if table is not None:
+                table.blank_lines += 1
+            else:
+                yield ''
+        else:
+            if table is not None:
+                yield table
+                table = None
+            yield line
+    if table is not None:
+        yield table
+
+
+def block_line_count(block: Block) -> int:
+    """Source lines a block was parsed from"""
+    return 1 if isinstance(block, str) else block.line_count
+
+
+# (kind, text, table, cells); table and cells are set for table rows only
+DocumentLine = Tuple[str, str, Optional[Table], Optional[List[str]]]
+
+
+def iter_block_lines(blocks: Iterable[Block]) -> Iterator[DocumentLine]:
+    """
+    Render blocks line by line with the structure of each line
+
+    Yields:
+        Tuples of (kind, text, table, cells) where kind is TEXT, BLANK,
+        HEADING (a "## " sheet heading; other headings are TEXT),
+        TABLE_HEADER, TABLE_SEPARATOR or TABLE_ROW
+    """
+    for block in blocks:
+        if isinstance(block, str):
+            if not block.strip():
+                yield BLANK, block, None, None
+            elif block.startswith('## '):
+                yield HEADING, block, None, None
+            else:
+                yield TEXT, block, None, None
+            continue
+        for position, cells in enumerate(block.iter_rows()):
+            if not position:
+                kind = TABLE_HEADER
+            elif cells is block.separator:
+                kind = TABLE_SEPARATOR
+            else:
+                kind = TABLE_ROW
+            yield kind, render_table_row(cells), block, cells
+        for _ in range(block.blank_lines):
+            yield BLANK, '', None, None
+
+
+class Sheet:
+    """Blocks from one "## " sheet heading to the next"""
+
+    __slots__ = ('title', 'blocks')
+
+    def __init__(self, title: str, blocks: List[Block]):
+        self.title = title  # '' for the part before the first heading
+        self.blocks = blocks
+
+    @property
+    def tables(self) -> List[Table]:
+        return [block for block in self.blocks if isinstance(block, Table)]
+
+
+class Document:
+    """
+    Parsed Markdown document (MarkItDown output, raw or cleaned)
+
+    Built once from the converter output; the cleaner, the prompt sampler
+    and chunker and the API field extractor read its cells instead of
+    splitting the text again. Rendering gives back the source text, except
+    that table rows are normalized to "|cell|cell|" without outer
+    whitespace and blank lines inside a table move after it.
+    """
+
+    __slots__ = ('blocks',)
+
+    def __init__(self, blocks: List[Block]):
+        self.blocks = blocks
+
+    @classmethod
+    def parse(cls, markdown: str) -> 'Document':
+        """Parse a Markdown string"""
+        return cls(list(iter_blocks(markdown.split('\n'))))
+
+    @property
+    def line_count(self) -> int:
+        return sum(block_line_count(block) for block in self.blocks)
+
+    @property
+    def sheets(self) -> List[Sheet]:
+        """Sheets in document order; a leading part without heading is only included when not empty"""
+        sheets = [Sheet('', [])]
+        for block in self.blocks:
+            if isinstance(block, str) and block.startswith('## '):
+                sheets.append(Sheet(block[3:].strip(), []))
+            sheets[-1].blocks.append(block)
+        if not any(block for block in sheets[0].blocks):
+            sheets.pop(0)
+        return sheets
+
+    def tables(self) -> Iterator[Table]:
+        for block in self.blocks:
+            if isinstance(block, Table):
+                yield block
+
+    def iter_lines(self) -> Iterator[DocumentLine]:
+        """Rendered lines with their structure (see iter_block_lines)"""
+        return iter_block_lines(self.blocks)
+
+    def lines(self) -> Iterator[str]:
+        for _, text, _, _ in self.iter_lines():
+            yield text
+
+    def to_markdown(self) -> str:
+        return '\n'.join(self.lines())
@@ -0,0 +1,156 @@
+"""
+Conversion engines for Excel to Markdown conversion
+MarkItDownをプロセス内で保持するエンジンと、subprocessによるフォールバック
+"""
+
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .config import Config
+
+
+# HtmlConverter kept warm in each worker process
+_worker_html_converter = None
+
+
+def render_sheet_markdown(html_converter, sheet_name: str, df: pd.DataFrame) -> str:
+    """Render one sheet the same way as MarkItDown's xlsx converter"""
+    html_content = df.to_html(index=False)
+    return f"## {sheet_name}\n" + html_converter.convert_string(html_content).markdown.strip()
+
+
+def _render_sheet_worker(excel_path: str, sheet_name: str) -> str:
+    """Process pool task: read and render a single sheet"""
+    global _worker_html_converter
+    if _worker_html_converter is None:
+        from markitdown.converters import HtmlConverter
+        _worker_html_converter = HtmlConverter()
+    df = pd.read_excel(excel_path, sheet_name=sheet_name)
+    return render_sheet_markdown(_worker_html_converter, sheet_name, df)
+
+
+class InProcessEngine:
+    """Convert with a warm MarkItDown instance kept in the current process"""
+
+    name = "inprocess"
+    supports_frames = True
+
+    def __init__(self, config: Config):
+        self.config = config
+        # Import lazily so that the subprocess fallback works without the package
+        from markitdown import MarkItDown
+        from markitdown.converters import HtmlConverter
+        self._markitdown = MarkItDown()
+        self._html_converter = HtmlConverter()
+
+    def convert(self, excel_path: str) -> str:
+        """Convert Excel file and return markdown text"""
+        result = self._markitdown.convert(excel_path)
+        return result.markdown
+
+    def render_frames(self, frames: Dict[str, pd.DataFrame]) -> List[str]:
+        """
+        Render already parsed sheets to one markdown section per sheet
+
+        Produces the same sections as MarkItDown's xlsx converter
+        (one "## sheet" section with an HTML-derived table per sheet).
+        """
+        return [
+            render_sheet_markdown(self._html_converter, sheet_name, df)
+            for sheet_name, df in frames.items()
+        ]
+
+    def convert_frames(self, frames: Dict[str, pd.DataFrame], separator: str = "\n\n") -> str:
+        """Convert already parsed sheets to markdown joined with the given separator"""
+        return separator.join(self.render_frames(frames)).strip()
+
+    def render_sheets_parallel(self, excel_path: str, sheet_names: List[str],
+                               max_workers: int) -> List[str]:
+        """
+        Render sheets in a process pool, one task per sheet
+
+        Each worker reads only its own sheet from excel_path. Sections are
+        returned in the given sheet order.
+        """
+        workers = max(1, min(max_workers, len(sheet_names)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                _render_sheet_worker,
+                [excel_path] * len(sheet_names),
+                sheet_names
+            ))
+
+    def convert_sheets_parallel(self, excel_path: str, sheet_names: List[str],
+                                max_workers: int, separator: str = "\n\n") -> str:
+        """Convert sheets in a process pool and join them with the given separator"""
+        sections = self.render_sheets_parallel(excel_path, sheet_names, max_workers)
+        return separator.join(sections).strip()
+
+
+class SubprocessEngine:
+    """Convert by spawning `python -m markitdown` (fallback)"""
+
+    name = "subprocess"
+    supports_frames = False
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._check_markitdown()
+
+    def _check_markitdown(self) -> None:
+        """Check if MarkItDown CLI is available"""
+        try:
+            result = subprocess.run(
+                ['python', '-m', 'markitdown', '--version'],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            if result.returncode != 0:
+                raise RuntimeError("MarkItDown is not properly installed")
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            raise RuntimeError(f"MarkItDown is not available: {e}")
+
+    def convert(self, excel_path: str) -> str:
+        """Convert Excel file and return markdown text"""
+        result = subprocess.run(
+            ['python', '-m', 'markitdown', excel_path],
+            capture_output=True,
+            text=True,
+            timeout=self.config.processing.timeout_seconds
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"MarkItDown conversion failed: {result.stderr}")
+        return result.stdout
+
+
+def create_engine(config: Config, engine_name: Optional[str] = None):
+    """
+    Create conversion engine
+
+    Args:
+        config: Configuration
+        engine_name: "auto", "inprocess" or "subprocess" (default: config value)
+
+    Returns:
+        Engine instance with convert(excel_path) -> str
+    """
+    engine_name = engine_name or config.processing.conversion_engine
+
+    if engine_name == "subprocess":
+        return SubprocessEngine(config)
+
+    if engine_name == "inprocess":
+        return InProcessEngine(config)
+
+    if engine_name != "auto":
+        raise ValueError(f"Unknown conversion engine: {engine_name}")
+
+    # auto: prefer in-process, fall back to subprocess
+    try:
+        return InProcessEngine(config)
+    except ImportError:
+        return SubprocessEngine(config)
@@ -0,0 +1,626 @@
+"""
+Streaming exporter from a product master sheet to VAISC product files
+商品マスタを1行ずつ読み、項目マッピングに従ってVAISC商品データのJSONL/CSVをgzip分割ファイルに書き出す
+"""
+
+import io
+import os
+import csv
+import json
+import gzip
+import datetime
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any, Tuple, Iterator
+
+import yaml
+
+from .config import Config
+from .session import WorkbookSession
+from .analyzer import FileAnalyzer
+from .headers import cell_text, normalize_header, find_header
+
+
+FIELD_TYPES = ('string', 'integer', 'number', 'boolean', 'date')
+EXPORT_FORMATS = ('jsonl', 'csv')
+
+_SPEC_KEYS = ('column', 'value', 'type', 'repeated', 'separator', 'values', 'other',
+              'default', 'required', 'parts')
+_TRUE_TOKENS = ('1', 'true', 'yes', 'on')
+_FALSE_TOKENS = ('0', 'false', 'no', 'off')
+
+_COMPRESS_LEVEL = 6
+# Uncompressed bytes between sync flushes, which make the compressed size on disk exact
+_FLUSH_BYTES = 4 * 1024 * 1024
+# gzip header, trailer and the final flush marker
+_GZIP_RESERVE = 64
+# Rejected row numbers kept for the report
+_MAX_REJECTED_SAMPLES = 20
+
+
+def _to_integer(value: Any) -> int:
+    if isinstance(value, bool):
+        return int(value)
+    number = _to_number(value)
+    if isinstance(number, float):
+        raise ValueError(f"not an integer: {value!r}")
+    return number
+
+
+def _to_number(value: Any):
+    """int for integral values, float otherwise"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    number = value if isinstance(value, float) else float(str(value).replace(',', ''))
+    if number != number or number in (float('inf'), float('-inf')):
+        raise ValueError(f"not a finite number: {value!r}")
+    if number.is_integer() and abs(number) < 2 ** 53:
+        return int(number)
+    return number
+
+
+def _to_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = cell_text(value).casefold()
+    if text in _TRUE_TOKENS:
+        return True
+    if text in _FALSE_TOKENS:
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def _to_date(value: Any) -> str:
+    """ISO date from a date cell, "20250825", "2025-08-25" or "2025/08/25" (time part ignored)"""
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    text = cell_text(value).split(' ')[0].split('T')[0]
+    if len(text) == 8 and text.isdigit():
+        parts = (text[:4], text[4:6], text[6:])
+    else:
+        parts = text.replace('/', '-').split('-')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"not a date: {value!r}")
+    return datetime.date(int(parts[0]), int(parts[1]), int(parts[2])).isoformat()
+
+
+_CONVERTERS = {
+    'string': cell_text,
+    'integer': _to_integer,
+    'number': _to_number,
+    'boolean': _to_boolean,
+    'date': _to_date,
+}
+
+
+@dataclass
+class FieldSpec:
+    """One output field or custom attribute and where its value comes from"""
+    target: str  # output path ("priceInfo.price", "images[].uri") or attribute key
+    columns: Tuple[str, ...] = ()  # header alternatives, first match wins
+    value: Any = None  # constant instead of a column
+    type: str = "string"  # string, integer, number, boolean, date
+    repeated: bool = False  # split the cell into a list
+    separator: str = ","
+    values: Dict[str, Any] = field(default_factory=dict)  # code → output value
+    other: Any = None  # output for codes missing from values (None: keep the code)
+    default: Any = None  # used when the cell is empty
+    required: bool = False
+    parts: List['FieldSpec'] = field(default_factory=list)  # concatenated into one list
+
+    @classmethod
+    def from_dict(cls, target: str, data: Dict[str, Any], attribute: bool = False) -> 'FieldSpec':
+        """
+        Build a spec from its mapping YAML entry
+
+        Raises:
+            ValueError: On unknown keys, unknown types or an entry without a source
+        """
+        unknown = set(data) - set(_SPEC_KEYS)
+        if unknown:
+            raise ValueError(f"{target}: unknown mapping keys: {', '.join(sorted(unknown))}")
+        columns = data.get('column') or ()
+        if isinstance(columns, str):
+            columns = (columns,)
+        spec = cls(
+            target=target,
+            columns=tuple(str(column) for column in columns),
+            value=data.get('value'),
+            type=data.get('type', 'string'),
+            repeated=bool(data.get('repeated', False)) or attribute or 'parts' in data,
+            separator=str(data.get('separator', ',')),
+            values={cell_text(code): output for code, output in (data.get('values') or {}).items()},
+            other=data.get('other'),
+            default=data.get('default'),
+            required=bool(data.get('required', False)),
+            parts=[cls.from_dict(f"{target}[{idx}]", part) for idx, part in enumerate(data.get('parts') or [])]
+        )
+        if spec.type not in FIELD_TYPES:
+            raise ValueError(f"{target}: unknown type '{spec.type}' (expected one of {', '.join(FIELD_TYPES)})")
+        if not spec.columns and spec.value is None and not spec.parts:
+            raise ValueError(f"{target}: needs 'column', 'value' or 'parts'")
+        return spec
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.type in ('integer', 'number')
+
+
+@dataclass
+class ExportMapping:
+    """Declarative mapping from product master columns to VAISC product fields"""
+    fields: List[FieldSpec] = field(default_factory=list)
+    attributes: List[FieldSpec] = field(default_factory=list)
+    sheet: str = ""
+    header_row: int = 0  # 1-based (0 = detect)
+
+    @classmethod
+    def load(cls, mapping_path: str) -> 'ExportMapping':
+        """Read a mapping YAML file (see config/vaisc_mapping.yaml)"""
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        return cls(
+            fields=[FieldSpec.from_dict(target, spec or {})
+                    for target, spec in (data.get('fields') or {}).items()],
+            attributes=[FieldSpec.from_dict(str(key), spec or {}, attribute=True)
+                        for key, spec in (data.get('attributes') or {}).items()],
+            sheet=data.get('sheet') or "",
+            header_row=int(data.get('header_row') or 0)
+        )
+
+    @property
+    def specs(self) -> List[FieldSpec]:
+        """Fields followed by attributes, in output column order"""
+        return self.fields + self.attributes
+
+
+def default_mapping_path() -> str:
+    return os.path.join(os.path.dirname(__file__), '..', 'config', 'vaisc_mapping.yaml')
+
+
+def _parse_target(target: str) -> List[Tuple[str, bool]]:
+    """Split an output path into (key, is object array) segments"""
+    segments = []
+    for part in target.split('.'):
+        is_array = part.endswith('[]')
+        segments.append((part[:-2] if is_array else part, is_array))
+    if segments[-1][1]:
+        # A trailing "[]" is a plain list
+        segments[-1] = (segments[-1][0], False)
+    return segments
+
+
+def _assign(node: Dict[str, Any], segments: List[Tuple[str, bool]], value: Any) -> None:
+    """Set value at a nested path; an object array gets one element per list item"""
+    for position, (key, is_array) in enumerate(segments[:-1]):
+        if is_array:
+            items = node.setdefault(key, [])
+            for item_idx, item in enumerate(value if isinstance(value, list) else [value]):
+                if item_idx == len(items):
+                    items.append({})
+                _assign(items[item_idx], segments[position + 1:], item)
+            return
+        node = node.setdefault(key, {})
+    node[segments[-1][0]] = value
+
+
+def _has_column(index) -> bool:
+    """Whether a resolved index (or any part of a parts index) points at a column"""
+    if isinstance(index, list):
+        return any(map(_has_column, index))
+    return index is not None
+
+
+def csv_column(target: str) -> str:
+    """CSV/BigQuery column name of an output path ("priceInfo.price" → "priceInfo_price")"""
+    return target.replace('[]', '').replace('.', '_')
+
+
+class ProductMapper:
+    """
+    Mapping bound to the header row of one sheet
+
+    Column positions are resolved once; map_row then turns each data row
+    into the flat list of field values in ExportMapping.specs order.
+    """
+
+    def __init__(self, mapping: ExportMapping, header: List[str]):
+        self.mapping = mapping
+        self.specs = mapping.specs
+        positions: Dict[str, int] = {}
+        for index, text in enumerate(header):
+            label = normalize_header(text)
+            if label and label not in positions:
+                positions[label] = index
+        self._positions = positions
+        self._indexes = [self._resolve(spec) for spec in self.specs]
+        self._segments = [_parse_target(spec.target) for spec in mapping.fields]
+
+        self.unmapped_fields = [spec.target for spec, index in zip(self.specs, self._indexes)
+                                if not self._is_mapped(spec, index)]
+        self.missing_required = [spec.target for spec in self.specs
+                                 if spec.required and spec.target in self.unmapped_fields]
+
+    def _resolve(self, spec: FieldSpec):
+        """Column index of a spec (a list of part indexes for parts; None when not found)"""
+        if spec.parts:
+            return [self._resolve(part) for part in spec.parts]
+        for column in spec.columns:
+            index = self._positions.get(normalize_header(column))
+            if index is not None:
+                return index
+        return None
+
+    def _is_mapped(self, spec: FieldSpec, index) -> bool:
+        if spec.parts:
+            return any(self._is_mapped(part, part_index) for part, part_index in zip(spec.parts, index))
+        return index is not None or spec.value is not None or spec.default is not None
+
+    @property
+    def matches(self) -> bool:
+        """True when at least one column and every required field can be mapped"""
+        return any(map(_has_column, self._indexes)) and not self.missing_required
+
+    def map_row(self, row: Tuple[Any, ...], invalid: Dict[str, int]) -> List[Any]:
+        """
+        Field values of one data row
+
+        Args:
+            row: Cell values of the row
+            invalid: Per-field counts of values that failed conversion (updated)
+
+        Returns:
+            One value per spec: None when empty, a list for repeated fields
+        """
+        return [self._value(spec, index, row, invalid) for spec, index in zip(self.specs, self._indexes)]
+
+    def _value(self, spec: FieldSpec, index, row: Tuple[Any, ...], invalid: Dict[str, int]):
+        if spec.parts:
+            items = []
+            for part, part_index in zip(spec.parts, index):
+                value = self._value(part, part_index, row, invalid)
+                if isinstance(value, list):
+                    items.extend(value)
+                elif value is not None:
+                    items.append(value)
+            return items or None
+
+        raw = spec.value
+        if raw is None and index is not None and index < len(row):
+            raw = row[index]
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            raw = spec.default
+            if raw is None:
+                return None
+
+        if spec.repeated and isinstance(raw, str):
+            items = [item.strip() for item in raw.split(spec.separator) if item.strip()]
+        else:
+            items = [raw]
+
+        convert = _CONVERTERS[spec.type]
+        values = []
+        for item in items:
+            if spec.values:
+                item = spec.values.get(cell_text(item), item if spec.other is None else spec.other)
+            try:
+                values.append(convert(item))
+            except (ValueError, TypeError):
+                invalid[spec.target] = invalid.get(spec.target, 0) + 1
+        if spec.repeated:
+            return values or None
+        return values[0] if values else None
+
+    def to_record(self, values: List[Any]) -> Dict[str, Any]:
+        """Nested VAISC product object; empty fields are left out"""
+        record: Dict[str, Any] = {}
+        for segments, value in zip(self._segments, values):
+            if value is not None:
+                _assign(record, segments, value)
+
+        attributes = []
+        for spec, value in zip(self.mapping.attributes, values[len(self._segments):]):
+            if value is None:
+                continue
+            if spec.is_numeric:
+                attributes.append({'key': spec.target, 'value': {'numbers': value}})
+            else:
+                attributes.append({'key': spec.target, 'value': {'text': [cell_text(item) for item in value]}})
+        if attributes:
+            record['attributes'] = attributes
+        return record
+
+    def to_csv_row(self, values: List[Any]) -> List[str]:
+        """Flat CSV cells; lists are joined with the field separator"""
+        cells = []
+        for spec, value in zip(self.specs, values):
+            if value is None:
+                cells.append('')
+            elif isinstance(value, list):
+                cells.append(spec.separator.join(cell_text(item) for item in value))
+            else:
+                cells.append(cell_text(value))
+        return cells
+
+
+@dataclass
+class ShardInfo:
+    """One gzip output file"""
+    path: str
+    records: int = 0
+    bytes: int = 0  # compressed size on disk
+    uncompressed_bytes: int = 0
+
+
+class GzipShardWriter:
+    """
+    Write lines into numbered gzip files of at most max_bytes compressed bytes
+
+    Files are named "<stem>_00001<suffix>.gz", ... and each one starts with
+    the optional header line, so every shard can be loaded on its own. Only
+    the current shard is open. The compressor is sync-flushed every few MB,
+    after which the bytes on disk plus a worst-case bound for the
+    uncompressed remainder decide whether the next line still fits. A line
+    larger than max_bytes gets a shard of its own.
+    """
+
+    def __init__(self, output_dir: str, stem: str, suffix: str, max_bytes: int = 0, header: bytes = b''):
+        self.output_dir = output_dir
+        self.stem = stem
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.header = header
+        self.flush_bytes = min(_FLUSH_BYTES, max(max_bytes // 16, 1)) if max_bytes > 0 else 0
+        self.shards: List[ShardInfo] = []
+        self.oversized = 0
+
+        self._raw = None
+        self._gzip: Optional[gzip.GzipFile] = None
+        self._pending = 0  # bytes written since the last sync flush
+
+    def __enter__(self) -> 'GzipShardWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def shard_path(self, number: int) -> str:
+        return os.path.join(self.output_dir, f"{self.stem}_{number:05d}{self.suffix}.gz")
+
+    def write(self, line: bytes) -> None:
+        """Append one line (including its line terminator)"""
+        if self._gzip is None:
+            self._open()
+        elif self.max_bytes > 0 and self.shards[-1].records:
+            if self._raw.tell() + self._bound(self._pending + len(line)) > self.max_bytes:
+                self._finish()
+                self._open()
+
+        if self.max_bytes > 0 and self._bound(len(self.header) + len(line)) > self.max_bytes:
+            self.oversized += 1
+        self._write(line)
+        self.shards[-1].records += 1
+
+    def close(self) -> List[ShardInfo]:
+        """Finish the last shard and remove shards left over from a longer previous run"""
+        if self._gzip is not None:
+            self._finish()
+        number = len(self.shards) + 1
+        while os.path.exists(self.shard_path(number)):
+            os.remove(self.shard_path(number))
+            number += 1
+        return self.shards
+
+    def _bound(self, size: int) -> int:
+        """Upper bound of the compressed size of size uncompressed bytes"""
+        return size + (size >> 10) + _GZIP_RESERVE
+
+    def _open(self) -> None:
+        shard = ShardInfo(path=self.shard_path(len(self.shards) + 1))
+        self.shards.append(shard)
+        self._raw = open(shard.path + '.tmp', 'wb')
+        # mtime=0 and no file name keep the output reproducible
+        self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw,
+                                   compresslevel=_COMPRESS_LEVEL, mtime=0)
+        self._pending = 0
+        if self.header:
+            self._write(self.header)
+
+    def _write(self, data: bytes) -> None:
+        self._gzip.write(data)
+        self.shards[-1].uncompressed_bytes += len(data)
+        self._pending += len(data)
+        if self.flush_bytes and self._pending >= self.flush_bytes:
+            self._gzip.flush()
+            self._pending = 0
+
+    def _finish(self) -> None:
+        shard = self.shards[-1]
+        self._gzip.close()
+        shard.bytes = self._raw.tell()
+        self._raw.close()
+        os.replace(shard.path + '.tmp', shard.path)
+        self._gzip = None
+        self._raw = None
+
+    def _discard(self) -> None:
+        """Drop the unfinished shard after an error"""
+        if self._gzip is not None:
+            self._gzip.close()
+            self._raw.close()
+            os.remove(self.shards[-1].path + '.tmp')
+            self._gzip = None
+            self._raw = None
+
+
+@dataclass
+class ExportResult:
+    """Result of exporting one product master"""
+    excel_path: str
+    sheet: str = ""
+    header_row: int = 0
+    format: str = "jsonl"
+    output_paths: List[str] = field(default_factory=list)
+    manifest_path: str = ""
+    rows_read: int = 0  # non-empty rows below the header
+    records_written: int = 0
+    rejected_rows: int = 0  # rows with an empty required field
+    rejected_row_numbers: List[int] = field(default_factory=list)  # first few, 1-based
+    missing_required: Dict[str, int] = field(default_factory=dict)  # field → rejected rows
+    invalid_values: Dict[str, int] = field(default_factory=dict)  # field → values dropped by conversion
+    unmapped_fields: List[str] = field(default_factory=list)  # fields whose columns are not in the header
+    oversized_records: int = 0
+    total_bytes: int = 0  # compressed
+    uncompressed_bytes: int = 0
+
+
+class VaiscExporter:
+    """
+    Stream a product master sheet into VAISC product JSONL or CSV shards
+
+    The sheet XML of a WorkbookSession (as opened by
+    ExcelConverter.open_session) is streamed with FileAnalyzer.iter_rows;
+    each row is mapped with ExportMapping and written straight to the
+    current gzip shard. Memory use is the workbook's shared strings table
+    plus one parse block of rows, independent of the number of products.
+    """
+
+    def __init__(self, config: Optional[Config] = None, mapping: Optional[ExportMapping] = None):
+        self.config = config or Config()
+        settings = self.config.export
+        if settings.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{settings.format}' (expected one of {', '.join(EXPORT_FORMATS)})")
+        self.mapping = mapping or ExportMapping.load(settings.mapping_path or default_mapping_path())
+
+    def locate(self, session: WorkbookSession,
+               sheet_name: Optional[str] = None) -> Tuple[str, int, ProductMapper, Iterator[Tuple[int, List[Any]]]]:
+        """
+        Find the product master sheet and its header row
+
+        Args:
+            session: Opened WorkbookSession of an .xlsx file
+            sheet_name: Sheet to read (default: export.sheet, then the
+                mapping's sheet, then the first sheet with a matching header)
+
+        Returns:
+            Tuple of (sheet name, 1-based header row, bound mapper,
+            iterator over the (row number, values) pairs below the header)
+
+        Raises:
+            ValueError: If the sheet does not exist or no header row matches the mapping
+        """
+        sheet_name = sheet_name or self.config.export.sheet or self.mapping.sheet
+        # Sheet names from the package index; loading the openpyxl workbook would parse every sheet
+        available = [sheet_part.name for sheet_part in session.sheet_parts()]
+        if sheet_name and sheet_name not in available:
+            raise ValueError(f"Sheet not found: {sheet_name}. Available: {', '.join(available)}")
+
+        analyzer = FileAnalyzer()
+        shared_strings = analyzer.read_shared_strings(session)
+        date_styles = analyzer.read_date_styles(session)
+        best: Optional[ProductMapper] = None
+
+        def match(header: List[str], groups: List[str]) -> Optional[ProductMapper]:
+            nonlocal best
+            mapper = ProductMapper(self.mapping, header)
+            if mapper.matches:
+                return mapper
+            if best is None or len(mapper.unmapped_fields) < len(best.unmapped_fields):
+                best = mapper
+            return None
+
+        for name in [sheet_name] if sheet_name else available:
+            rows = analyzer.iter_rows(session, name, shared_strings, date_styles)
+            found = find_header(rows, match, self.mapping.header_row)
+            if found:
+                header_row, mapper = found
+                return name, header_row, mapper, rows
+            rows.close()
+
+        missing = ', '.join(best.missing_required) if best and best.missing_required else 'all mapped columns'
+        raise ValueError(f"No header row with the mapped columns found (missing: {missing})")
+
+    def export(self, session: WorkbookSession, output_dir: str, stem: Optional[str] = None,
+               sheet_name: Optional[str] = None) -> ExportResult:
+        """
+        Export the product master of a workbook
+
+        Args:
+            session: Opened WorkbookSession of an .xlsx file
+            output_dir: Directory for the shards and the manifest
+            stem: Shard file name prefix (default: "<excel name>_vaisc")
+            sheet_name: Sheet to read (see locate)
+
+        Returns:
+            ExportResult with the shard paths and row counts
+        """
+        settings = self.config.export
+        result = ExportResult(excel_path=session.excel_path, format=settings.format)
+        stem = stem or f"{os.path.splitext(os.path.basename(session.excel_path))[0]}_vaisc"
+        result.sheet, result.header_row, mapper, rows = self.locate(session, sheet_name)
+        result.unmapped_fields = mapper.unmapped_fields
+
+        os.makedirs(output_dir, exist_ok=True)
+        header = b''
+        buffer = writer = None
+        if settings.format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            writer.writerow([csv_column(spec.target) for spec in mapper.specs])
+            header = buffer.getvalue().encode('utf-8')
+        suffix = '.jsonl' if settings.format == 'jsonl' else '.csv'
+        required = [(position, spec.target) for position, spec in enumerate(mapper.specs) if spec.required]
+
+        with GzipShardWriter(output_dir, stem, suffix, settings.max_shard_bytes, header) as shards:
+            for row_number, row in rows:
+                result.rows_read += 1
+
+                values = mapper.map_row(row, result.invalid_values)
+                missing = [target for position, target in required if values[position] is None]
+                if missing:
+                    result.rejected_rows += 1
+                    if len(result.rejected_row_numbers) < _MAX_REJECTED_SAMPLES:
+                        result.rejected_row_numbers.append(row_number)
+                    for target in missing:
+                        result.missing_required[target] = result.missing_required.get(target, 0) + 1
+                    continue
+
+                if writer is None:
+                    line = json.dumps(mapper.to_record(values), ensure_ascii=False, separators=(',', ':')) + '\n'
+                else:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerow(mapper.to_csv_row(values))
+                    line = buffer.getvalue()
+                shards.write(line.encode('utf-8'))
+                result.records_written += 1
+
+        shard_infos = shards.shards
+        result.oversized_records = shards.oversized
+        result.output_paths = [shard.path for shard in shard_infos]
+        result.total_bytes = sum(shard.bytes for shard in shard_infos)
+        result.uncompressed_bytes = sum(shard.uncompressed_bytes for shard in shard_infos)
+        result.manifest_path = os.path.join(output_dir, f"{stem}_manifest.json")
+        self._write_manifest(result, shard_infos)
+        return result
+
+    def _write_manifest(self, result: ExportResult, shards: List[ShardInfo]) -> None:
+        """Shard list with record counts, for the bulk import job"""
+        with open(result.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'excel_path': os.path.abspath(result.excel_path),
+                'sheet': result.sheet,
+                'header_row': result.header_row,
+                'format': result.format,
+                'records': result.records_written,
+                'rejected_rows': result.rejected_rows,
+                'shards': [{'path': os.path.basename(shard.path), 'records': shard.records,
+                            'bytes': shard.bytes, 'uncompressed_bytes': shard.uncompressed_bytes}
+                           for shard in shards],
+            }, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,89 @@
+"""
+Header row detection for sheets read with FileAnalyzer.iter_rows
+商品マスタ出力とAPI仕様書抽出で共通の、セル値のテキスト化と見出し行の検出
+"""
+
+import datetime
+from typing import List, Optional, Any, Tuple, Callable, Iterator
+
+
+# Rows searched for the header when no header row is given
+HEADER_SCAN_ROWS = 20
+
+
+def cell_text(value: Any, single_line: bool = False) -> str:
+    """
+    Canonical text of a cell value
+
+    Integral floats lose their ".0", booleans become "true"/"false" and
+    dates are written in ISO format (midnight datetimes as plain dates).
+
+    Args:
+        value: Cell value as returned by FileAnalyzer.iter_rows
+        single_line: Collapse line breaks and runs of whitespace to single spaces
+
+    Returns:
+        Stripped text ('' for empty cells)
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if single_line:
+        return ' '.join(str(value).split())
+    return str(value).strip()
+
+
+def normalize_header(text: str) -> str:
+    """Header text compared without whitespace and case"""
+    return ''.join(text.split()).casefold()
+
+
+def carry_groups(header: List[str]) -> List[str]:
+    """Group label of each column; a merged group header only has a value in its top-left cell, so labels carry rightward"""
+    groups = []
+    current = ''
+    for text in header:
+        current = text or current
+        groups.append(current)
+    return groups
+
+
+def find_header(rows: Iterator[Tuple[int, List[Any]]],
+                match: Callable[[List[str], List[str]], Any],
+                header_row: int = 0) -> Optional[Tuple[int, Any]]:
+    """
+    Find the header row among the first rows of a sheet
+
+    Args:
+        rows: (row number, cell values) pairs as yielded by FileAnalyzer.iter_rows;
+            consumed up to and including the header row
+        match: Called with the header texts and the group labels of the row
+            directly above; returns a truthy result for the header row
+        header_row: Only try this 1-based row (0: the first HEADER_SCAN_ROWS rows)
+
+    Returns:
+        Tuple of (header row number, result of match), or None if no row matched
+    """
+    last_row = header_row or HEADER_SCAN_ROWS
+    groups: List[str] = []
+    previous = 0
+    for row_number, row in rows:
+        if row_number > last_row:
+            break
+        header = [cell_text(value) for value in row]
+        if row_number != previous + 1:
+            groups = []
+        if not header_row or row_number == header_row:
+            result = match(header, groups)
+            if result:
+                return row_number, result
+        groups = carry_groups(header)
+        previous = row_number
+    return None
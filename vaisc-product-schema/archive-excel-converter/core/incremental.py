@@ -0,0 +1,209 @@
+"""
+Sheet-level incremental reconversion
+シートごとのフィンガープリントを比較し、変更されたシートだけを再変換・再クリーニングする
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Any
+
+from .config import Config
+from .converter import ExcelConverter, SheetInfo
+from .cleaner import MarkdownCleaner, CleaningStats
+from .session import WorkbookSession
+from .cache import ConversionCache, hash_config
+
+
+STATE_SUBDIR = 'sheets'
+
+
+def separator_ends_tables(separator: str) -> bool:
+    """True if the separator has a non-blank line without '|', which ends any table before it"""
+    return any(line.strip() and '|' not in line for line in separator.split('\n'))
+
+
+@dataclass
+class IncrementalResult:
+    """Spliced conversion result of an incremental run"""
+    raw_markdown: str
+    sheets: List[SheetInfo]
+    cleaned_markdown: Optional[str] = None
+    cleaning_stats: Optional[CleaningStats] = None
+    reconverted_sheets: List[str] = None
+
+    def __post_init__(self):
+        if self.reconverted_sheets is None:
+            self.reconverted_sheets = []
+
+
+class SheetStateStore:
+    """
+    Per-workbook JSON state with the last per-sheet results
+
+    One state file per (workbook path, configuration) holds, for every
+    sheet, its fingerprint, raw markdown section, sheet information and
+    cleaned markdown. When a ConversionCache owns the parent directory, the
+    state files share its max_size_mb budget and LRU eviction.
+    """
+
+    def __init__(self, state_dir: str, cache: Optional[ConversionCache] = None):
+        self.state_dir = state_dir
+        self.cache = cache
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _state_path(self, excel_path: str, config_hash: str) -> str:
+        key_source = f"{os.path.abspath(excel_path)}\n{config_hash}"
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+        return os.path.join(self.state_dir, f"{key}.json")
+
+    def load(self, excel_path: str, config_hash: str) -> Dict[str, Dict[str, Any]]:
+        """Load per-sheet state (empty if there is no usable previous run) and mark it as recently used"""
+        state_path = self._state_path(excel_path, config_hash)
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                sheets = json.load(f).get('sheets', {})
+            os.utime(state_path)
+        except (OSError, ValueError):
+            return {}
+        return sheets
+
+    def save(self, excel_path: str, config_hash: str, sheets: Dict[str, Dict[str, Any]]) -> None:
+        """Write per-sheet state atomically, then evict least recently used cache entries over the size cap"""
+        state_path = self._state_path(excel_path, config_hash)
+        fd, temp_path = tempfile.mkstemp(dir=self.state_dir, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'excel_path': os.path.abspath(excel_path), 'sheets': sheets},
+                          f, ensure_ascii=False)
+            os.replace(temp_path, state_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        if self.cache is not None:
+            self.cache.evict()
+
+
+class IncrementalConverter:
+    """Reconvert and re-clean only the sheets whose fingerprint changed"""
+
+    def __init__(self, config: Optional[Config] = None,
+                 converter: Optional[ExcelConverter] = None,
+                 cleaner: Optional[MarkdownCleaner] = None,
+                 store: Optional[SheetStateStore] = None):
+        self.config = config or Config()
+        self.converter = converter or ExcelConverter(self.config)
+        self.cleaner = cleaner or MarkdownCleaner(self.config)
+        if store is None:
+            cache = ConversionCache(self.config.cache.directory, self.config.cache.max_size_mb)
+            store = SheetStateStore(os.path.join(cache.cache_dir, STATE_SUBDIR), cache)
+        self.store = store
+        # Per-sheet cleaning equals whole-document cleaning only if no table spans two sheets
+        self.clean_per_sheet = separator_ends_tables(self.config.output.sheet_separator)
+        if not self.clean_per_sheet:
+            print("Warning: output.sheet_separator has no non-table line; "
+                  "incremental runs clean the whole document instead of reusing cleaned sheets")
+
+    def convert(self, excel_path: str, session: WorkbookSession,
+                target_sheets: Optional[List[str]] = None,
+                clean: bool = True) -> IncrementalResult:
+        """
+        Convert a workbook reusing unchanged sheets from the previous run
+
+        Sections are spliced back in sheet order with OutputConfig.sheet_separator.
+        Cleaning is applied per sheet to the section followed by the separator
+        (the last sheet without it), which equals cleaning the whole document
+        at once because the separator contains a non-table line such as
+        "---". For other separators the spliced document is cleaned as a whole.
+
+        Args:
+            excel_path: Path to Excel file
+            session: Opened WorkbookSession for excel_path
+            target_sheets: Optional list of sheet names to convert (None = all sheets)
+            clean: Apply MarkdownCleaner
+
+        Returns:
+            IncrementalResult with the spliced markdown and the reconverted sheet names
+
+        Raises:
+            ValueError: If a target sheet does not exist
+        """
+        available = session.sheet_names
+        if target_sheets:
+            invalid_sheets = [name for name in target_sheets if name not in available]
+            if invalid_sheets:
+                raise ValueError(
+                    f"Sheet(s) not found: {', '.join(invalid_sheets)}. Available: {', '.join(available)}"
+                )
+        names = list(target_sheets) if target_sheets else available
+        separator = self.config.output.sheet_separator
+
+        config_hash = hash_config(self.config)
+        fingerprints = session.sheet_fingerprints(names)
+        previous = self.store.load(excel_path, config_hash)
+
+        # Keep state of unselected sheets that still exist for later selections
+        state = {name: entry for name, entry in previous.items() if name in available}
+        changed = [name for name in names
+                   if state.get(name, {}).get('fingerprint') != fingerprints[name]]
+        dirty = bool(changed) or len(state) != len(previous)
+
+        if changed:
+            all_sheets = self.converter.get_sheet_info(excel_path, session=session)
+            sections = self.converter.convert_sheet_sections(excel_path, changed, session, all_sheets)
+            sheet_infos = {sheet.name: asdict(sheet) for sheet in all_sheets}
+            for name, section in zip(changed, sections):
+                state[name] = {
+                    'fingerprint': fingerprints[name],
+                    'raw': section,
+                    'cleaned': {},
+                }
+            for name in names:
+                state[name]['info'] = sheet_infos.get(name)
+
+        sheets = []
+        for name in names:
+            info = state[name].get('info')
+            if info:
+                sheet = SheetInfo(**info)
+                sheet.index = available.index(name)
+                sheets.append(sheet)
+
+        result = IncrementalResult(
+            raw_markdown=separator.join(state[name]['raw'] for name in names).strip(),
+            sheets=sheets,
+            reconverted_sheets=changed
+        )
+
+        if clean and not self.clean_per_sheet:
+            result.cleaned_markdown, result.cleaning_stats = self.cleaner.clean_markdown(result.raw_markdown)
+        elif clean:
+            cleaned_parts = []
+            stats = CleaningStats()
+            for position, name in enumerate(names):
+                is_last = position == len(names) - 1
+                variant = 'last' if is_last else 'middle'
+                cleaned = state[name]['cleaned'].get(variant)
+                if cleaned is None:
+                    chunk = state[name]['raw'] if is_last else state[name]['raw'] + separator
+                    markdown, sheet_stats = self.cleaner.clean_markdown(chunk)
+                    cleaned = {'markdown': markdown, 'stats': asdict(sheet_stats)}
+                    state[name]['cleaned'][variant] = cleaned
+                    dirty = True
+                cleaned_parts.append(cleaned['markdown'])
+                stats.merge(CleaningStats(**cleaned['stats']))
+
+            # Every chunk but the last ends with one extra empty line
+            stats.original_lines -= len(names) - 1
+            stats.cleaned_lines -= len(names) - 1
+            result.cleaned_markdown = ''.join(cleaned_parts)
+            result.cleaning_stats = stats
+
+        if dirty:
+            self.store.save(excel_path, config_hash, state)
+
+        return result
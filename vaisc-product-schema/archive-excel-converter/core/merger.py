@@ -1,8 +1,294 @@
 """
-Sheet merger for combining multiple markdown sheets
-TODO: Implementation in progress
+Sheet merger for combining converted workbooks into one document
+変換済みMarkdownを目次付きの1ファイル（またはサイズ上限付きの分割ファイル）に逐次統合する
 """
 
+import os
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from .config import Config
+
+
+_SHEET_HEADING = b'## '
+_COPY_SIZE = 1024 * 1024
+_OUTPUT_SUFFIX = '_reformed'
+_TOC_TITLE = "# 目次\n\n"
+
+
+@dataclass
+class MergeSection:
+    """Byte range of one part of a source markdown file"""
+    title: str  # sheet heading text ('' for the header before the first sheet)
+    start: int
+    end: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+@dataclass
+class MergeSource:
+    """Converted workbook markdown indexed by SheetMerger.scan"""
+    path: str
+    title: str
+    sections: List[MergeSection] = field(default_factory=list)
+    ends_with_newline: bool = True
+
+
+@dataclass
+class MergeResult:
+    """Result of merging converted workbooks"""
+    output_paths: List[str]
+    workbooks: int = 0
+    sheets: int = 0
+    total_bytes: int = 0
+    oversized_sections: List[str] = field(default_factory=list)  # sections larger than max_shard_bytes
+
+
+def _escape_link_text(text: str) -> str:
+    """Escape characters that would end a markdown link label"""
+    return text.replace('\\', '\\\\').replace('[', '\\[').replace(']', '\\]')
+
+
 class SheetMerger:
-    def __init__(self):
-        pass
\ No newline at end of file
+    """
+    Merge converted markdown files into one document or size-capped shards
+
+    The merge runs in two passes over the files on disk. The first pass
+    only records the byte range of every sheet section ("## " heading) and
+    its title; the second writes the table of contents and copies the
+    ranges block by block. Memory use depends on the number of sections,
+    not on the size of the documents.
+    """
+
+    def __init__(self, config: Optional[Config] = None):
+        self.config = config or Config()
+        self.max_shard_bytes = self.config.output.max_shard_bytes
+
+    def scan(self, markdown_path: str, title: Optional[str] = None) -> MergeSource:
+        """
+        Index the sheet sections of one markdown file
+
+        Args:
+            markdown_path: Converted markdown file
+            title: Workbook title (default: file name without "_reformed")
+
+        Returns:
+            MergeSource with one MergeSection per sheet, plus the leading
+            header part (metadata comments) when it is not blank
+        """
+        if title is None:
+            title = Path(markdown_path).stem
+            if title.endswith(_OUTPUT_SUFFIX):
+                title = title[:-len(_OUTPUT_SUFFIX)]
+        source = MergeSource(path=markdown_path, title=title)
+
+        offset = 0
+        start = 0
+        section_title = ''
+        has_header_text = False
+        last_line = b''
+        with open(markdown_path, 'rb') as f:
+            for line in f:
+                if line.startswith(_SHEET_HEADING):
+                    if section_title or has_header_text:
+                        source.sections.append(MergeSection(section_title, start, offset))
+                    start = offset
+                    section_title = line[len(_SHEET_HEADING):].decode('utf-8', errors='replace').strip()
+                elif not section_title and line.strip():
+                    has_header_text = True
+                offset += len(line)
+                last_line = line
+
+        if section_title or has_header_text:
+            source.sections.append(MergeSection(section_title, start, offset))
+        source.ends_with_newline = not last_line or last_line.endswith(b'\n')
+        return source
+
+    def plan(self, sources: List[MergeSource]) -> Tuple[List[List[Tuple[int, int]]], List[str]]:
+        """
+        Pack sections into shards of at most max_shard_bytes
+
+        Sections are never split; a section larger than the limit gets a
+        shard of its own and is reported as oversized. The limit covers the
+        whole shard file: header, table of contents, anchors and headings.
+
+        Args:
+            sources: Scanned sources in output order
+
+        Returns:
+            Tuple of (shards as lists of (source index, section index), oversized section names)
+        """
+        items = [(source_idx, section_idx)
+                 for source_idx, source in enumerate(sources)
+                 for section_idx in range(len(source.sections))]
+        if self.max_shard_bytes <= 0:
+            return [items], []
+
+        shards: List[List[Tuple[int, int]]] = []
+        oversized = []
+        current: List[Tuple[int, int]] = []
+        size = 0
+        for source_idx, section_idx in items:
+            source = sources[source_idx]
+            starts_workbook = not current or current[-1][0] != source_idx
+            cost = self._section_bytes(source, source_idx, section_idx, starts_workbook)
+            if current and size + cost > self.max_shard_bytes:
+                shards.append(current)
+                current = []
+                cost = self._section_bytes(source, source_idx, section_idx, True)
+            if not current:
+                size = self._shard_overhead(len(shards) + 1)
+                if size + cost > self.max_shard_bytes:
+                    section = source.sections[section_idx]
+                    oversized.append(f"{source.title}/{section.title}" if section.title else source.title)
+            current.append((source_idx, section_idx))
+            size += cost
+        if current:
+            shards.append(current)
+        return shards, oversized
+
+    def merge(self, markdown_paths: List[str], output_path: str,
+              titles: Optional[List[str]] = None) -> MergeResult:
+        """
+        Merge converted markdown files
+
+        Args:
+            markdown_paths: Converted markdown files in output order
+            output_path: Merged document path; with sharding the files are
+                named "<stem>_001.md", "<stem>_002.md", ...
+            titles: Optional workbook titles (one per markdown path)
+
+        Returns:
+            MergeResult with the written paths and counts
+        """
+        sources = [self.scan(path, titles[idx] if titles else None)
+                   for idx, path in enumerate(markdown_paths)]
+        shards, oversized = self.plan(sources)
+
+        output_paths = [output_path]
+        if len(shards) > 1:
+            root, ext = os.path.splitext(output_path)
+            output_paths = [f"{root}_{number:03d}{ext or '.md'}" for number in range(1, len(shards) + 1)]
+
+        total_bytes = 0
+        for number, (shard, shard_path) in enumerate(zip(shards, output_paths), 1):
+            total_bytes += self._write_shard(sources, shard, shard_path,
+                                             number if len(shards) > 1 else None)
+
+        return MergeResult(
+            output_paths=output_paths,
+            workbooks=len(sources),
+            sheets=sum(1 for source in sources for section in source.sections if section.title),
+            total_bytes=total_bytes,
+            oversized_sections=oversized
+        )
+
+    def _write_shard(self, sources: List[MergeSource], shard: List[Tuple[int, int]],
+                     shard_path: str, number: Optional[int]) -> int:
+        """Write table of contents and copy section ranges; returns bytes written"""
+        written = 0
+        with open(shard_path, 'wb') as output:
+            header = self._shard_header(number) + self._toc(sources, shard)
+            written += output.write(header.encode('utf-8'))
+
+            source_file = None
+            previous_idx = None
+            try:
+                for source_idx, section_idx in shard:
+                    source = sources[source_idx]
+                    section = source.sections[section_idx]
+                    if source_idx != previous_idx:
+                        if source_file is not None:
+                            source_file.close()
+                        source_file = open(source.path, 'rb')
+                        written += output.write(self._workbook_heading(source, source_idx).encode('utf-8'))
+                        previous_idx = source_idx
+                    if section.title:
+                        written += output.write(self._sheet_anchor(source, source_idx, section_idx).encode('utf-8'))
+
+                    source_file.seek(section.start)
+                    remaining = section.size
+                    while remaining > 0:
+                        block = source_file.read(min(_COPY_SIZE, remaining))
+                        if not block:
+                            break
+                        written += output.write(block)
+                        remaining -= len(block)
+                    if section_idx == len(source.sections) - 1 and not source.ends_with_newline:
+                        written += output.write(b'\n')
+            finally:
+                if source_file is not None:
+                    source_file.close()
+        return written
+
+    def _shard_header(self, number: Optional[int]) -> str:
+        """Metadata comments at the top of a merged file"""
+        if not self.config.output.add_metadata:
+            return ""
+        lines = ["<!-- Excel Markdown Reformatter で統合 -->"]
+        if number is not None:
+            lines.append(f"<!-- 分割ファイル: {number:03d} -->")
+        return "\n".join(lines) + "\n\n"
+
+    def _shard_overhead(self, number: int) -> int:
+        """Bytes of a shard before its first section (table of contents title included)"""
+        overhead = self._shard_header(number)
+        if self.config.output.create_toc:
+            # Title plus the blank line after the entries
+            overhead += _TOC_TITLE + "\n"
+        return len(overhead.encode('utf-8'))
+
+    def _toc(self, sources: List[MergeSource], shard: List[Tuple[int, int]]) -> str:
+        """Table of contents linking the workbooks and sheets of one shard"""
+        if not self.config.output.create_toc:
+            return ""
+        lines = []
+        previous_idx = None
+        for source_idx, section_idx in shard:
+            source = sources[source_idx]
+            if source_idx != previous_idx:
+                lines.append(self._toc_workbook_line(source, source_idx))
+                previous_idx = source_idx
+            if source.sections[section_idx].title:
+                lines.append(self._toc_sheet_line(source, source_idx, section_idx))
+        return _TOC_TITLE + "".join(line + "\n" for line in lines) + "\n"
+
+    def _toc_workbook_line(self, source: MergeSource, source_idx: int) -> str:
+        return f"- [{_escape_link_text(source.title)}](#wb{source_idx + 1})"
+
+    def _toc_sheet_line(self, source: MergeSource, source_idx: int, section_idx: int) -> str:
+        title = _escape_link_text(source.sections[section_idx].title)
+        return f"  - [{title}](#{self._sheet_id(source, source_idx, section_idx)})"
+
+    def _workbook_heading(self, source: MergeSource, source_idx: int) -> str:
+        return f'\n<a id="wb{source_idx + 1}"></a>\n\n# {source.title}\n\n'
+
+    def _sheet_anchor(self, source: MergeSource, source_idx: int, section_idx: int) -> str:
+        return f'\n<a id="{self._sheet_id(source, source_idx, section_idx)}"></a>\n\n'
+
+    def _sheet_id(self, source: MergeSource, source_idx: int, section_idx: int) -> str:
+        """Anchor id numbering the sheets of a workbook from 1 (header part not counted)"""
+        sheet_number = section_idx if not source.sections[0].title else section_idx + 1
+        return f"wb{source_idx + 1}-s{sheet_number}"
+
+    def _section_bytes(self, source: MergeSource, source_idx: int, section_idx: int,
+                       starts_workbook: bool) -> int:
+        """Bytes a section adds to a shard, including its anchor and table of contents entry"""
+        section = source.sections[section_idx]
+        size = section.size
+        if section_idx == len(source.sections) - 1 and not source.ends_with_newline:
+            size += 1
+        extra = ""
+        if section.title:
+            extra += self._sheet_anchor(source, source_idx, section_idx)
+            if self.config.output.create_toc:
+                extra += self._toc_sheet_line(source, source_idx, section_idx) + "\n"
+        if starts_workbook:
+            extra += self._workbook_heading(source, source_idx)
+            if self.config.output.create_toc:
+                extra += self._toc_workbook_line(source, source_idx) + "\n"
+        return size + len(extra.encode('utf-8'))
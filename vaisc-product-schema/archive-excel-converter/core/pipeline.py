@@ -0,0 +1,349 @@
+"""
+Reformat pipeline: convert → clean → metadata → write
+単一ファイル・バッチ処理で共通の変換パイプライン
+"""
+
+import os
+import time
+import shutil
+import tempfile
+from datetime import datetime
+from typing import List, Optional
+from dataclasses import dataclass
+
+from .config import Config
+from .converter import ExcelConverter, SheetInfo
+from .cleaner import MarkdownCleaner, CleaningStats
+from .session import WorkbookSession
+from .cache import ConversionCache, CacheEntry, hash_bytes
+from .incremental import IncrementalConverter
+from .analyzer import FileAnalyzer
+from .profiler import profile_path_for
+
+
+@dataclass
+class PipelineResult:
+    """Result of processing one Excel file"""
+    success: bool
+    excel_path: str
+    output_path: str = ""
+    error_message: str = ""
+    sheets: List[SheetInfo] = None
+    cleaning_stats: Optional[CleaningStats] = None
+    output_chars: int = 0
+    elapsed_seconds: float = 0.0
+    cache_hit: bool = False
+    unchanged: bool = False
+    reconverted_sheets: Optional[List[str]] = None  # set by incremental runs
+    profile_path: str = ""  # column profile JSON, when profiling is enabled
+    profiled_sheets: Optional[List[str]] = None  # sheets scanned (others reused from the profile JSON)
+
+    def __post_init__(self):
+        if self.sheets is None:
+            self.sheets = []
+
+
+def add_metadata_header(content, excel_path, stats=None, source_hash=None):
+    """
+    Add metadata header to content
+    
+    When source_hash is given it is stamped instead of the processing time,
+    so the same input always produces the same output bytes.
+    """
+    header_lines = [
+        "<!-- Excel Markdown Reformatter で生成 -->",
+        f"<!-- 元ファイル: {os.path.basename(excel_path)} -->",
+    ]
+    if source_hash:
+        header_lines.append(f"<!-- 元ファイルSHA256: {source_hash} -->")
+    else:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        header_lines.append(f"<!-- 処理日時: {timestamp} -->")
+
+    if stats:
+        header_lines.extend([
+            f"<!-- NaN除去: {stats.removed_nan_count}, Unnamed列除去: {stats.removed_unnamed_cols} -->",
+            f"<!-- 数値フォーマット: {stats.formatted_numbers}, 空行除去: {stats.removed_empty_rows} -->"
+        ])
+
+    header_lines.append("")
+    return "\n".join(header_lines) + "\n" + content
+
+
+class ReformatPipeline:
+    """Excel → cleaned Markdown pipeline built on ExcelConverter and MarkdownCleaner"""
+
+    def __init__(self, config: Optional[Config] = None,
+                 converter: Optional[ExcelConverter] = None,
+                 cleaner: Optional[MarkdownCleaner] = None,
+                 cache: Optional[ConversionCache] = None):
+        self.config = config or Config()
+        self.converter = converter or ExcelConverter(self.config)
+        self.cleaner = cleaner or MarkdownCleaner(self.config)
+        if cache is None and self.config.cache.enabled:
+            cache = ConversionCache(self.config.cache.directory, self.config.cache.max_size_mb)
+        self.cache = cache
+        self.incremental = None
+        if self.config.cache.incremental:
+            self.incremental = IncrementalConverter(self.config, self.converter, self.cleaner)
+        self.analyzer = FileAnalyzer(self.config.profiling)
+
+    def run(self, excel_path: str, output_path: str,
+            target_sheets: Optional[List[str]] = None,
+            clean: bool = True,
+            session: Optional[WorkbookSession] = None) -> PipelineResult:
+        """
+        Convert, clean and write one Excel file
+
+        Args:
+            excel_path: Path to Excel file
+            output_path: Markdown output path
+            target_sheets: Optional list of sheet names to convert (None = all sheets)
+            clean: Apply MarkdownCleaner
+            session: Optional already opened WorkbookSession for excel_path
+
+        Returns:
+            PipelineResult with statistics and timing
+        """
+        start = time.perf_counter()
+        if session is None:
+            session = self.converter.open_session(excel_path)
+
+        profile_path = ""
+        profiled_sheets = None
+        if self.config.profiling.enabled:
+            profile_path = profile_path_for(output_path)
+            try:
+                _, profiled_sheets = self.analyzer.profile_to_file(
+                    session, excel_path, profile_path, sheet_names=target_sheets
+                )
+            except Exception as e:
+                session.close()
+                return PipelineResult(
+                    success=False,
+                    excel_path=excel_path,
+                    error_message=f"Profiling error: {str(e)}",
+                    elapsed_seconds=time.perf_counter() - start
+                )
+
+        if self._use_streaming():
+            result = self._run_streaming(excel_path, output_path, target_sheets, clean, session, start)
+            if result.success:
+                result.profile_path = profile_path
+                result.profiled_sheets = profiled_sheets
+            return result
+
+        source_hash = None
+        cache_key = None
+        entry = None
+        if self.cache is not None or self.config.output.deterministic:
+            source_hash = hash_bytes(session.data)
+        if self.cache is not None:
+            cache_key = self.cache.make_key(source_hash, target_sheets, self.config)
+            entry = self.cache.get(cache_key)
+
+        cache_hit = entry is not None
+        reconverted_sheets = None
+        if entry is None and self.incremental is not None:
+            try:
+                incremental_result = self.incremental.convert(
+                    excel_path, session, target_sheets=target_sheets, clean=clean
+                )
+            except Exception as e:
+                return PipelineResult(
+                    success=False,
+                    excel_path=excel_path,
+                    error_message=f"Incremental conversion error: {str(e)}",
+                    elapsed_seconds=time.perf_counter() - start
+                )
+            finally:
+                session.close()
+
+            entry = CacheEntry(
+                raw_markdown=incremental_result.raw_markdown,
+                sheets=incremental_result.sheets,
+                cleaned_markdown=incremental_result.cleaned_markdown,
+                cleaning_stats=incremental_result.cleaning_stats
+            )
+            reconverted_sheets = incremental_result.reconverted_sheets
+        elif entry is None:
+            try:
+                result = self.converter.convert_excel_to_markdown(
+                    excel_path, target_sheets=target_sheets, session=session
+                )
+            finally:
+                # Parsed workbook is no longer needed once converted
+                session.close()
+
+            if not result.success:
+                return PipelineResult(
+                    success=False,
+                    excel_path=excel_path,
+                    error_message=result.error_message,
+                    elapsed_seconds=time.perf_counter() - start
+                )
+            entry = CacheEntry(raw_markdown=result.markdown_content, sheets=result.sheets)
+        else:
+            session.close()
+
+        # Clean markdown content
+        if clean:
+            if entry.cleaned_markdown is None:
+                entry.cleaned_markdown, entry.cleaning_stats = self.cleaner.clean_markdown(entry.raw_markdown)
+                cache_hit = False
+            content = entry.cleaned_markdown
+            cleaning_stats = entry.cleaning_stats
+        else:
+            content = entry.raw_markdown
+            cleaning_stats = None
+
+        if self.cache is not None and not cache_hit:
+            self.cache.put(cache_key, entry)
+
+        # Add metadata if requested
+        if self.config.output.add_metadata:
+            content = add_metadata_header(
+                content, excel_path, cleaning_stats,
+                source_hash=source_hash if self.config.output.deterministic else None
+            )
+
+        unchanged = self.config.output.deterministic and self._output_matches(output_path, content)
+        if not unchanged:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+        return PipelineResult(
+            success=True,
+            excel_path=excel_path,
+            output_path=output_path,
+            sheets=entry.sheets,
+            cleaning_stats=cleaning_stats,
+            output_chars=len(content),
+            elapsed_seconds=time.perf_counter() - start,
+            cache_hit=cache_hit,
+            unchanged=unchanged,
+            reconverted_sheets=reconverted_sheets,
+            profile_path=profile_path,
+            profiled_sheets=profiled_sheets
+        )
+
+    def _use_streaming(self) -> bool:
+        """Streaming needs per-sheet rendering and no whole-document cache or state"""
+        return (self.config.output.streaming
+                and self.cache is None
+                and self.incremental is None
+                and self.converter.engine.supports_frames)
+
+    def _run_streaming(self, excel_path: str, output_path: str,
+                       target_sheets: Optional[List[str]], clean: bool,
+                       session: WorkbookSession, start: float) -> PipelineResult:
+        """
+        Convert, clean and write one sheet at a time
+
+        Each cleaned sheet is appended to a temporary body file next to the
+        output as soon as it is ready. The metadata header needs the final
+        statistics, so it is written first when the body is copied into the
+        output file. Sheets are cleaned as "section + separator" chunks, which
+        gives the same bytes as cleaning the whole document at once.
+        """
+        source_hash = hash_bytes(session.data) if self.config.output.deterministic else None
+        separator = self.config.output.sheet_separator
+        body_path = None
+
+        try:
+            sheets = self.converter.get_sheet_info(excel_path, session=session)
+            available = session.sheet_names
+            if target_sheets:
+                invalid_sheets = [name for name in target_sheets if name not in available]
+                if invalid_sheets:
+                    return PipelineResult(
+                        success=False,
+                        excel_path=excel_path,
+                        error_message=f"Sheet(s) not found: {', '.join(invalid_sheets)}. Available: {', '.join(available)}",
+                        elapsed_seconds=time.perf_counter() - start
+                    )
+                sheets = [sheet for sheet in sheets if sheet.name in target_sheets]
+            names = list(target_sheets) if target_sheets else available
+
+            cleaning_stats = CleaningStats() if clean else None
+            body_chars = 0
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            body_fd, body_path = tempfile.mkstemp(dir=output_dir, prefix='.stream-', suffix='.md')
+            with os.fdopen(body_fd, 'w', encoding='utf-8') as body:
+                sections = self.converter.iter_sheet_sections(names, session)
+                for position, (sheet_name, section) in enumerate(sections):
+                    chunk = section if position == len(names) - 1 else section + separator
+                    if clean:
+                        chunk, sheet_stats = self.cleaner.clean_markdown(chunk)
+                        cleaning_stats.merge(sheet_stats)
+                    body.write(chunk)
+                    body_chars += len(chunk)
+
+            if clean:
+                # Every chunk but the last ends with one extra empty line
+                cleaning_stats.original_lines -= len(names) - 1
+                cleaning_stats.cleaned_lines -= len(names) - 1
+
+            header = ""
+            if self.config.output.add_metadata:
+                header = add_metadata_header("", excel_path, cleaning_stats, source_hash=source_hash)
+
+            unchanged = (self.config.output.deterministic
+                         and self._streamed_output_matches(output_path, header, body_path))
+            if not unchanged:
+                with open(output_path, 'wb') as output, open(body_path, 'rb') as body:
+                    output.write(header.encode('utf-8'))
+                    shutil.copyfileobj(body, output)
+        except Exception as e:
+            return PipelineResult(
+                success=False,
+                excel_path=excel_path,
+                error_message=f"Streaming conversion error: {str(e)}",
+                elapsed_seconds=time.perf_counter() - start
+            )
+        finally:
+            session.close()
+            if body_path and os.path.exists(body_path):
+                os.remove(body_path)
+
+        return PipelineResult(
+            success=True,
+            excel_path=excel_path,
+            output_path=output_path,
+            sheets=sheets,
+            cleaning_stats=cleaning_stats,
+            output_chars=len(header) + body_chars,
+            elapsed_seconds=time.perf_counter() - start,
+            unchanged=unchanged
+        )
+
+    def _streamed_output_matches(self, output_path: str, header: str, body_path: str) -> bool:
+        """Compare output file with header + body file without loading either fully"""
+        chunk_size = 1024 * 1024
+        try:
+            expected_size = len(header.encode('utf-8')) + os.path.getsize(body_path)
+            if os.path.getsize(output_path) != expected_size:
+                return False
+            with open(output_path, 'rb') as existing, open(body_path, 'rb') as body:
+                encoded_header = header.encode('utf-8')
+                if existing.read(len(encoded_header)) != encoded_header:
+                    return False
+                while True:
+                    expected = body.read(chunk_size)
+                    if not expected:
+                        return True
+                    if existing.read(len(expected)) != expected:
+                        return False
+        except OSError:
+            return False
+
+    def _output_matches(self, output_path: str, content: str) -> bool:
+        """Check whether output file already holds exactly this content"""
+        encoded = content.encode('utf-8')
+        try:
+            if os.path.getsize(output_path) != len(encoded):
+                return False
+            with open(output_path, 'rb') as f:
+                return f.read() == encoded
+        except OSError:
+            return False
@@ -0,0 +1,188 @@
+"""
+Cell cleaning rule registry and compiler
+YAMLで宣言された組み込み・ユーザー定義ルールを1つのセル処理関数にまとめる
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from .config import CleaningConfig
+
+
+# A rule takes a stripped cell and returns (new_cell, hit)
+RuleFunction = Callable[[str], Tuple[str, bool]]
+
+
+@dataclass
+class RuleDefinition:
+    """Registered rule type"""
+    name: str
+    factory: Callable[[Dict[str, Any]], RuleFunction]
+    flag: Optional[str] = None  # CleaningConfig flag that must be on for the rule to run
+    stat: Optional[str] = None  # CleaningStats field fed by the rule's hits
+
+
+_REGISTRY: Dict[str, RuleDefinition] = {}
+
+
+def register_rule(name: str, flag: Optional[str] = None, stat: Optional[str] = None):
+    """
+    Register a rule factory under a name usable in cleaning.rules
+
+    Args:
+        name: Rule name referenced from the YAML config
+        flag: Optional CleaningConfig boolean that enables the rule
+        stat: Optional CleaningStats field that receives the hit count
+
+    Returns:
+        Decorator taking factory(options) -> rule function
+    """
+    def decorator(factory):
+        _REGISTRY[name] = RuleDefinition(name=name, factory=factory, flag=flag, stat=stat)
+        return factory
+    return decorator
+
+
+@register_rule('nan_tokens', flag='remove_nan', stat='removed_nan_count')
+def _nan_tokens(options: Dict[str, Any]) -> RuleFunction:
+    """NaN/NULL/N/A (case-insensitive) → empty cell"""
+    tokens = frozenset(token.upper() for token in options.get('tokens', ['NAN', 'NULL', 'N/A']))
+
+    def rule(cell):
+        if cell.upper() in tokens:
+            return '', True
+        return cell, False
+    return rule
+
+
+@register_rule('thousands_separator', flag='format_numbers')
+def _thousands_separator(options: Dict[str, Any]) -> RuleFunction:
+    """Integers with at least min_digits digits → comma separated"""
+    min_digits = options.get('min_digits', 4)
+
+    def rule(cell):
+        # str.isdecimal() accepts exactly the characters matched by \d
+        if len(cell) >= min_digits and cell.isdecimal():
+            try:
+                return f"{int(cell):,}", True
+            except ValueError:
+                pass
+        return cell, False
+    return rule
+
+
+@register_rule('whole_number_decimal', flag='format_numbers', stat='formatted_numbers')
+def _whole_number_decimal(options: Dict[str, Any]) -> RuleFunction:
+    """"12.0" → "12\""""
+    def rule(cell):
+        if cell.endswith('.0') and cell[:-2].isdecimal():
+            return cell[:-2], True
+        return cell, False
+    return rule
+
+
+@register_rule('whitespace', flag='normalize_whitespace', stat='normalized_whitespace')
+def _whitespace(options: Dict[str, Any]) -> RuleFunction:
+    """Collapse whitespace runs; every processed cell counts as normalized"""
+    def rule(cell):
+        # str.split() and re's \s share the same notion of whitespace
+        return ' '.join(cell.split()), True
+    return rule
+
+
+def _pattern_rule(options: Dict[str, Any]) -> RuleFunction:
+    """User rule: regex substitution (hit when anything was replaced)"""
+    pattern = re.compile(options['pattern'])
+    replacement = options.get('replacement', '')
+
+    def rule(cell):
+        new_cell, replaced = pattern.subn(replacement, cell)
+        return new_cell, replaced > 0
+    return rule
+
+
+def _token_rule(options: Dict[str, Any]) -> RuleFunction:
+    """User rule: exact token match → replacement"""
+    tokens = frozenset(options['tokens'])
+    replacement = options.get('replacement', '')
+
+    def rule(cell):
+        if cell in tokens:
+            return replacement, True
+        return cell, False
+    return rule
+
+
+class CompiledRules:
+    """Enabled cleaning rules fused into one per-cell function"""
+
+    def __init__(self, names: List[str], functions: List[RuleFunction], stats: List[Optional[str]]):
+        self.names = names
+        self.stats = stats
+        self._steps = tuple(enumerate(functions))
+
+    def apply(self, cell: str) -> Tuple[str, Tuple[int, ...]]:
+        """
+        Strip and clean one cell
+
+        Returns:
+            Tuple of (cleaned_cell, indices of the rules that hit)
+        """
+        cell = cell.strip()
+        hits = ()
+        for index, rule in self._steps:
+            cell, hit = rule(cell)
+            if hit:
+                hits += (index,)
+        return cell, hits
+
+
+def compile_rules(cleaning: CleaningConfig) -> CompiledRules:
+    """
+    Compile cleaning.rules into a CompiledRules pipeline
+
+    Each entry is either a registered rule ({name: nan_tokens}) or a user
+    rule with a regex ({name, pattern, replacement}) or a token list
+    ({name, tokens, replacement}). Rules run in declaration order; rules
+    with enabled: false or whose CleaningConfig flag is off are left out
+    at compile time.
+
+    Args:
+        cleaning: Cleaning configuration
+
+    Returns:
+        CompiledRules
+
+    Raises:
+        ValueError: If a rule entry is neither registered nor a pattern/token rule
+    """
+    names, functions, stats = [], [], []
+
+    for entry in cleaning.rules:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        name = entry.get('name', '')
+        if not entry.get('enabled', True):
+            continue
+
+        definition = _REGISTRY.get(name)
+        if definition is not None:
+            if definition.flag and not getattr(cleaning, definition.flag):
+                continue
+            function = definition.factory(entry)
+            stat = definition.stat
+        elif 'pattern' in entry:
+            function = _pattern_rule(entry)
+            stat = None
+        elif 'tokens' in entry:
+            function = _token_rule(entry)
+            stat = None
+        else:
+            raise ValueError(f"Unknown cleaning rule: {name or entry}")
+
+        names.append(name)
+        functions.append(function)
+        stats.append(stat)
+
+    return CompiledRules(names, functions, stats)
@@ -0,0 +1,196 @@
+"""
+Coverage-maximizing structural sampler for Markdown documents
+行ごとの構造シグネチャ（空でない列・値の型パターン）を求め、シートと行パターンを最大限網羅するサンプルを選ぶ
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Set
+
+from .chunker import estimate_tokens
+from .document import Document, HEADING, BLANK, TEXT, TABLE_HEADER, TABLE_SEPARATOR
+
+
+DEFAULT_SAMPLE_TOKENS = 4000
+
+_NUMBER = re.compile(r'^[-+]?[\d,]*\.?\d+%?$')
+_DATE = re.compile(r'^\d{4}[-/]\d{1,2}[-/]\d{1,2}')
+_BOLD_KEY = re.compile(r'^\*\*(.+?)\*\*')
+_LIST_KEY = re.compile(r'^-\s+([^:]+):')
+
+
+def cell_type(cell: str) -> str:
+    """
+    One-letter value type of a table cell
+
+    "_" empty, "n" number, "d" date, "b" boolean, "j" JSON fragment, "t" text
+    """
+    cell = cell.strip()
+    if not cell:
+        return '_'
+    if _NUMBER.match(cell):
+        return 'n'
+    if _DATE.match(cell):
+        return 'd'
+    if cell in ('True', 'False', 'TRUE', 'FALSE'):
+        return 'b'
+    if cell[0] in '{["' or '":' in cell:
+        return 'j'
+    return 't'
+
+
+def cells_signature(cells: List[str]) -> str:
+    """Value-type pattern of a table row, which also encodes its non-empty column mask ("n t _ j")"""
+    return 'row:' + ' '.join(cell_type(cell) for cell in cells)
+
+
+def row_signature(line: str) -> str:
+    """
+    Structural signature of one Markdown line
+
+    Table rows map to their cells_signature; other lines map to their kind
+    and, for "**key**: value" and "- key: value" lines, the key.
+    """
+    if line.startswith('|'):
+        return cells_signature(line.strip().strip('|').split('|'))
+    stripped = line.strip()
+    match = _BOLD_KEY.match(stripped) or _LIST_KEY.match(stripped)
+    if match:
+        return 'key:' + match.group(1).strip()
+    return 'text'
+
+
+@dataclass
+class SampleResult:
+    """Sampled lines and what they cover"""
+    lines: List[str]  # in document order
+    tokens: int = 0
+    total_lines: int = 0
+    sheets_total: int = 0
+    sheets_covered: int = 0
+    signatures_total: int = 0
+    signatures_covered: int = 0
+    sheet_names: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Candidate:
+    """First occurrence of one (sheet, signature) pair"""
+    line_idx: int
+    context: Tuple[int, ...]  # heading and table header lines needed to read it
+    count: int = 1
+
+
+class StructuralSampler:
+    """
+    Pick a token-budgeted sample that covers as many sheets and row shapes as possible
+
+    One pass over the document records, per sheet, every distinct row
+    signature with its first occurrence and frequency. Selection then goes
+    round-robin over the sheets, taking each sheet's next most frequent
+    uncovered signature, so every sheet is represented before any sheet
+    gets a second shape. A picked row brings its sheet heading and table
+    header with it; those lines are charged to the budget only once.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_SAMPLE_TOKENS):
+        self.max_tokens = max_tokens
+
+    def sample(self, markdown: str) -> SampleResult:
+        """
+        Sample a Markdown document
+
+        Args:
+            markdown: Document (typically MarkItDown output with "## sheet" headings)
+
+        Returns:
+            SampleResult with the sampled lines and coverage counts
+        """
+        return self.sample_document(Document.parse(markdown))
+
+    def sample_document(self, document: Document) -> SampleResult:
+        """
+        Sample a parsed document
+
+        Args:
+            document: Parsed document; table rows are typed from its cells
+
+        Returns:
+            SampleResult with the sampled lines and coverage counts
+        """
+        lines: List[str] = []
+        sheet_headings: List[int] = []
+        candidates: List[Dict[str, _Candidate]] = [{}]  # index 0 = text before the first heading
+        heading_idx = -1
+        table_header: Tuple[int, ...] = ()
+
+        for idx, (kind, line, table, cells) in enumerate(document.iter_lines()):
+            lines.append(line)
+            if kind == HEADING:
+                heading_idx = idx
+                sheet_headings.append(idx)
+                candidates.append({})
+                table_header = ()
+                continue
+            if kind in (BLANK, TABLE_SEPARATOR):
+                continue
+            if kind == TABLE_HEADER and table.separator is not None and table.separator_at == 0:
+                table_header = (idx, idx + 1)
+                continue
+            if kind == TEXT:
+                table_header = ()
+
+            signature = row_signature(line) if cells is None else cells_signature(cells)
+            sheet_candidates = candidates[-1]
+            candidate = sheet_candidates.get(signature)
+            if candidate is None:
+                context = ((heading_idx,) if heading_idx >= 0 else ()) + table_header
+                sheet_candidates[signature] = _Candidate(idx, context)
+            else:
+                candidate.count += 1
+
+        selected = self._select(lines, candidates)
+        sampled = []
+        for idx in sorted(selected):
+            if lines[idx].startswith('## ') and sampled:
+                sampled.append('')
+            sampled.append(lines[idx])
+
+        covered_sheets = {position for position, sheet in enumerate(candidates)
+                          if any(candidate.line_idx in selected for candidate in sheet.values())}
+        return SampleResult(
+            lines=sampled,
+            tokens=estimate_tokens('\n'.join(sampled)),
+            total_lines=len(lines),
+            sheets_total=len(sheet_headings),
+            sheets_covered=sum(1 for position in covered_sheets if position > 0),
+            signatures_total=sum(len(sheet) for sheet in candidates),
+            signatures_covered=sum(1 for sheet in candidates for candidate in sheet.values()
+                                   if candidate.line_idx in selected),
+            sheet_names=[lines[idx][3:].strip() for idx in sheet_headings]
+        )
+
+    def _select(self, lines: List[str], candidates: List[Dict[str, _Candidate]]) -> Set[int]:
+        """Greedy round-robin selection of candidate lines within the token budget"""
+        queues = [sorted(sheet.values(), key=lambda candidate: (-candidate.count, candidate.line_idx))
+                  for sheet in candidates]
+        positions = [0] * len(queues)
+        selected: Set[int] = set()
+        remaining = self.max_tokens
+
+        progress = True
+        while progress:
+            progress = False
+            for sheet_idx, queue in enumerate(queues):
+                # Skip candidates that no longer fit; later (rarer) ones may be cheaper
+                while positions[sheet_idx] < len(queue):
+                    candidate = queue[positions[sheet_idx]]
+                    positions[sheet_idx] += 1
+                    needed = [idx for idx in candidate.context + (candidate.line_idx,) if idx not in selected]
+                    cost = sum(estimate_tokens(lines[idx]) + 1 for idx in needed)
+                    if cost <= remaining:
+                        selected.update(needed)
+                        remaining -= cost
+                        progress = True
+                        break
+        return selected
@@ -0,0 +1,277 @@
+"""
+Workbook session for sharing one parsed Excel file across operations
+検証・分析・シート一覧・変換で同じワークブックを一度だけ開いて共有する
+"""
+
+import io
+import re
+import hashlib
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Optional, NamedTuple
+
+import pandas as pd
+import openpyxl
+
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_T = f'{MAIN_NS}t'
+_R = f'{MAIN_NS}r'
+_SI = f'{MAIN_NS}si'
+
+# Shared-string cell (t="s") and its string index, matched on raw sheet XML bytes
+_SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)<')
+
+
+def rich_text(elem) -> str:
+    """Plain text of a shared/inline string element (phonetic runs excluded)"""
+    parts = []
+    for child in elem:
+        if child.tag == _T:
+            parts.append(child.text or '')
+        elif child.tag == _R:
+            for run_text in child.iter(_T):
+                parts.append(run_text.text or '')
+    return ''.join(parts)
+
+
+class SheetPart(NamedTuple):
+    """Location of one sheet inside the .xlsx package"""
+    name: str
+    part: str
+    state: str
+    is_worksheet: bool
+
+
+class WorkbookSession:
+    """
+    Excel file opened once and shared by validate, analyze, list and convert
+
+    The file bytes are read once on first use; the openpyxl workbook, the
+    pandas ExcelFile and per-sheet DataFrames are created lazily and cached
+    for the lifetime of the session.
+    """
+
+    def __init__(self, excel_path: str):
+        self.excel_path = excel_path
+        self.is_xlsx = excel_path.endswith('.xlsx')
+
+        self._data: Optional[bytes] = None
+        self._workbook = None
+        self._excel_file = None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._zip_file: Optional[zipfile.ZipFile] = None
+        self._sheet_parts: Optional[List[SheetPart]] = None
+        self._shared_strings_part: Optional[str] = None
+
+        # Sheet analysis result, filled by ExcelConverter.get_sheet_info
+        self.sheet_info: Optional[list] = None
+
+    def __enter__(self) -> 'WorkbookSession':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def data(self) -> bytes:
+        """Raw file bytes"""
+        if self._data is None:
+            with open(self.excel_path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+    def open_stream(self) -> io.BytesIO:
+        """Get a fresh in-memory stream of the file bytes"""
+        return io.BytesIO(self.data)
+
+    def load(self) -> None:
+        """Parse the workbook now (raises if the file cannot be opened)"""
+        if self.is_xlsx:
+            self.workbook
+        else:
+            self.excel_file
+
+    @property
+    def workbook(self):
+        """
+        Parsed openpyxl workbook (.xlsx only, cell values instead of formulas)
+
+        Opened in read-only mode so that worksheets are parsed lazily row by row.
+        """
+        if not self.is_xlsx:
+            raise ValueError("openpyxl workbook is only available for .xlsx files")
+        if self._workbook is None:
+            self._workbook = openpyxl.load_workbook(self.open_stream(), read_only=True, data_only=True)
+        return self._workbook
+
+    @property
+    def zip_file(self) -> zipfile.ZipFile:
+        """The .xlsx package as a zip archive"""
+        if not self.is_xlsx:
+            raise ValueError("zip package is only available for .xlsx files")
+        if self._zip_file is None:
+            self._zip_file = zipfile.ZipFile(self.open_stream())
+        return self._zip_file
+
+    def sheet_parts(self) -> List[SheetPart]:
+        """Sheet names, XML part paths and visibility in workbook order"""
+        if self._sheet_parts is None:
+            self._load_package_index()
+        return self._sheet_parts
+
+    @property
+    def shared_strings_part(self) -> Optional[str]:
+        """Path of the shared strings part, if the workbook has one"""
+        if self._sheet_parts is None:
+            self._load_package_index()
+        return self._shared_strings_part
+
+    def open_part(self, part: str):
+        """Open a package part as a binary stream (decompressed incrementally)"""
+        return self.zip_file.open(part)
+
+    def _load_package_index(self) -> None:
+        """Resolve sheet parts from workbook.xml and its relationships"""
+        rels_root = ET.fromstring(self.zip_file.read('xl/_rels/workbook.xml.rels'))
+        targets = {}
+        for rel in rels_root.iter(f'{PKG_REL_NS}Relationship'):
+            target = rel.get('Target', '')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join('xl', target))
+            targets[rel.get('Id')] = (target, rel.get('Type', ''))
+            if rel.get('Type', '').endswith('/sharedStrings'):
+                self._shared_strings_part = target
+
+        workbook_root = ET.fromstring(self.zip_file.read('xl/workbook.xml'))
+        parts = []
+        for sheet in workbook_root.iter(f'{MAIN_NS}sheet'):
+            target, rel_type = targets.get(sheet.get(f'{REL_NS}id'), ('', ''))
+            parts.append(SheetPart(
+                name=sheet.get('name'),
+                part=target,
+                state=sheet.get('state', 'visible'),
+                is_worksheet=rel_type.endswith('/worksheet')
+            ))
+        self._sheet_parts = parts
+
+    def sheet_fingerprints(self, sheet_names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Content fingerprint of each sheet
+
+        For .xlsx the fingerprint covers the sheet XML part, the texts of the
+        shared strings it references and the styles part, so editing one sheet
+        leaves the fingerprints of the other sheets unchanged.
+        An .xls file cannot be split into parts; every sheet gets the
+        fingerprint of the whole file.
+
+        Args:
+            sheet_names: Sheets to fingerprint (default: all sheets)
+
+        Returns:
+            Mapping of sheet name to SHA-256 hex digest
+        """
+        names = sheet_names if sheet_names is not None else self.sheet_names
+        if not self.is_xlsx:
+            digest = hashlib.sha256(self.data).hexdigest()
+            return {name: digest for name in names}
+
+        package = set(self.zip_file.namelist())
+        styles_digest = b''
+        if 'xl/styles.xml' in package:
+            styles_digest = hashlib.sha256(self.zip_file.read('xl/styles.xml')).digest()
+        string_digests = self._shared_string_digests()
+        parts = {sheet_part.name: sheet_part.part for sheet_part in self.sheet_parts()}
+
+        fingerprints = {}
+        for name in names:
+            digest = hashlib.sha256(styles_digest)
+            part = parts.get(name)
+            if part in package:
+                sheet_xml = self.zip_file.read(part)
+                # Hash string contents in place of table indices, which
+                # writers renumber whenever any sheet gains a new string
+                position = 0
+                for match in _SHARED_STRING_CELL.finditer(sheet_xml):
+                    digest.update(sheet_xml[position:match.start(1)])
+                    index = int(match.group(1))
+                    digest.update(string_digests[index] if index < len(string_digests) else match.group(1))
+                    position = match.end(1)
+                digest.update(sheet_xml[position:])
+            fingerprints[name] = digest.hexdigest()
+        return fingerprints
+
+    def _shared_string_digests(self) -> List[bytes]:
+        """Short digest of every shared string, in table order"""
+        digests = []
+        part = self.shared_strings_part
+        if not part or part not in self.zip_file.namelist():
+            return digests
+
+        with self.open_part(part) as stream:
+            root = None
+            for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                    continue
+                if event == 'end' and elem.tag == _SI:
+                    digests.append(hashlib.blake2b(rich_text(elem).encode('utf-8'), digest_size=8).digest())
+                    root.clear()
+        return digests
+
+    @property
+    def excel_file(self) -> pd.ExcelFile:
+        """pandas ExcelFile backed by the already parsed workbook"""
+        if self._excel_file is None:
+            if self.is_xlsx:
+                self._excel_file = pd.ExcelFile(self.workbook, engine='openpyxl')
+            else:
+                self._excel_file = pd.ExcelFile(self.open_stream())
+        return self._excel_file
+
+    @property
+    def sheet_names(self) -> List[str]:
+        """Sheet names in workbook order"""
+        if self.is_xlsx:
+            return list(self.workbook.sheetnames)
+        return list(self.excel_file.sheet_names)
+
+    def read_sheet(self, sheet_name: str, cache: bool = True) -> pd.DataFrame:
+        """Read one sheet as DataFrame (cached unless cache=False)"""
+        if sheet_name in self._frames:
+            return self._frames[sheet_name]
+        df = pd.read_excel(self.excel_file, sheet_name=sheet_name)
+        if cache:
+            self._frames[sheet_name] = df
+        return df
+
+    def read_sheets(self, sheet_names: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Read sheets as DataFrames in the given order (default: all sheets)"""
+        names = sheet_names if sheet_names is not None else self.sheet_names
+        missing = [name for name in names if name not in self._frames]
+        if len(missing) > 1:
+            # One read_excel call decodes all missing sheets in a single pass
+            self._frames.update(pd.read_excel(self.excel_file, sheet_name=missing))
+        return {name: self.read_sheet(name) for name in names}
+
+    def close(self) -> None:
+        """Release parsed state"""
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+        if self._zip_file is not None:
+            self._zip_file.close()
+            self._zip_file = None
+        self._sheet_parts = None
+        self._frames = {}
+        self._data = None
+        self.sheet_info = None
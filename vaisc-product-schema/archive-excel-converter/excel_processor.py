@@ -5,19 +5,38 @@ Claudeの文脈理解能力を活用した汎用的なExcel処理システム
 """
 
 import argparse
+import asyncio
 import json
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Callable
 import subprocess
 import re
 from datetime import datetime
 
+# Add core module to path
+sys.path.append(os.path.dirname(__file__))
+
+from core.chunker import MarkdownChunker, PromptChunk, estimate_tokens, DEFAULT_CHUNK_TOKENS
+from core.sampler import StructuralSampler, DEFAULT_SAMPLE_TOKENS
+from core.document import Document
+
+
+# MarkItDown変換1件あたりの制限時間（秒）
+DEFAULT_TIMEOUT_SECONDS = 300
+
 
 class UniversalProcessor:
     """汎用的なExcel処理エンジン"""
     
-    def __init__(self):
+    def __init__(self, max_prompt_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 sample_tokens: int = DEFAULT_SAMPLE_TOKENS,
+                 timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.timeout_seconds = timeout_seconds
+        self.sampler = StructuralSampler(sample_tokens)
         self.claude_system_prompt = """
 あなたはExcelデータをAI読みやすい形式に変換する専門家です。
 入力されたMarkdownテーブルを分析し、以下の手順で処理してください：
@@ -34,24 +53,16 @@ class UniversalProcessor:
 - 日本語の項目名も適切に処理する
 """
 
-    def analyze_with_claude_prompt(self, markdown_content: str) -> str:
+    def analyze_with_claude_prompt(self, document: Document) -> str:
         """Claudeに分析と変換を依頼するためのプロンプトを生成"""
         
-        # データのサンプリング（最初の50行と特徴的な部分）
-        lines = markdown_content.split('\n')
-        sample_lines = []
-        
-        # 最初の部分
-        sample_lines.extend(lines[:30])
-        
-        # JSONやネストが含まれる部分を探す
-        for i, line in enumerate(lines[30:200]):
-            if any(pattern in line for pattern in ['":', '↳', 'attributes', 'No.', '説明']):
-                sample_lines.append(line)
-                if len(sample_lines) > 50:
-                    break
-        
-        sample_content = '\n'.join(sample_lines)
+        # データのサンプリング（全シート・全行パターンをトークン予算内で網羅）
+        sample = self.sampler.sample_document(document)
+        sample_content = '\n'.join(sample.lines)
+        is_partial = len(sample.lines) < sample.total_lines
+        coverage_note = (f"（全体で{sample.total_lines}行中{len(sample.lines)}行を抽出。"
+                         f"シート {sample.sheets_covered}/{sample.sheets_total}、"
+                         f"行パターン {sample.signatures_covered}/{sample.signatures_total} を網羅）")
         
         prompt = f"""
 以下のExcelデータ（Markdown形式）を分析し、AI読みやすい構造化ドキュメントに変換してください。
@@ -60,7 +71,7 @@ class UniversalProcessor:
 ```markdown
 {sample_content}
 ```
-{f"（全体で{len(lines)}行、サンプルのみ表示）" if len(lines) > 50 else ""}
+{coverage_note if is_partial else ""}
 
 ## 処理指示
 
@@ -115,61 +126,109 @@ class UniversalProcessor:
         
         return prompt
 
-    def create_full_processing_prompt(self, markdown_content: str) -> str:
-        """完全なデータに対する処理プロンプト"""
+    def create_full_processing_prompt(self, markdown_content: str,
+                                      part: Optional[int] = None, total_parts: Optional[int] = None) -> str:
+        """完全なデータに対する処理プロンプト（part指定時は分割されたチャンク用）"""
         
-        # ファイルサイズが大きい場合の処理
-        max_chars = 50000  # Claude APIの制限を考慮
-        if len(markdown_content) > max_chars:
-            # 重要な部分を抽出
-            lines = markdown_content.split('\n')
-            
-            # ヘッダーと最初の部分
-            important_content = '\n'.join(lines[:100])
-            
-            # 中間のサンプル
-            middle = len(lines) // 2
-            important_content += '\n\n... [中間部省略] ...\n\n'
-            important_content += '\n'.join(lines[middle-20:middle+20])
-            
-            # 最後の部分
-            important_content += '\n\n... [後半部省略] ...\n\n'
-            important_content += '\n'.join(lines[-50:])
-            
-            content_to_process = important_content
-            truncated = True
-        else:
-            content_to_process = markdown_content
-            truncated = False
+        part_note = ""
+        if part is not None:
+            part_note = (f"注意: データが大きいため{total_parts}個に分割しています。これは {part}/{total_parts} 番目です。\n"
+                         f"見出しに「（続き）」とある場合は前のチャンクからの続きで、表ヘッダーは再掲しています。\n")
         
         prompt = f"""
 {self.claude_system_prompt}
 
 ## 処理対象データ
 ```markdown
-{content_to_process}
+{markdown_content}
 ```
-{f"注意: データが大きいため一部を抜粋しています（元データ: {len(markdown_content)}文字）" if truncated else ""}
-
+{part_note}
 このデータを分析し、実用的なドキュメントとして再構成してください。
 出力は開発者が実装時に参照できる、完全で正確な仕様書形式にしてください。
 """
         
         return prompt
+    
+    def create_chunked_prompts(self, document: Document) -> List[Tuple[str, PromptChunk]]:
+        """
+        トークン予算内に収まるよう表の行境界で分割したプロンプトを生成
+        
+        Returns:
+            (プロンプト, PromptChunk) のリスト（予算内なら1件）
+        """
+        # 分割番号の桁数が最大の場合で固定部分のトークン数を見積もる
+        overhead = estimate_tokens(self.create_full_processing_prompt("", 9999, 9999))
+        chunker = MarkdownChunker(max(self.max_prompt_tokens - overhead, 1))
+        chunks = chunker.chunk_document(document)
+        
+        if len(chunks) == 1:
+            return [(self.create_full_processing_prompt(chunks[0].content), chunks[0])]
+        return [(self.create_full_processing_prompt(chunk.content, chunk.index, len(chunks)), chunk)
+                for chunk in chunks]
+    
+    def write_prompt_shards(self, prompts: List[Tuple[str, PromptChunk]], output_base: Path, base_name: str,
+                            source: str) -> Path:
+        """
+        分割プロンプトを連番ファイルに書き出し、見積りトークン数を含むマニフェストを作成
+        
+        Returns:
+            マニフェストJSONのパス
+        """
+        shards = []
+        for prompt, chunk in prompts:
+            shard_path = output_base / f"{base_name}_full_prompt_{chunk.index:03d}.md"
+            with open(shard_path, 'w', encoding='utf-8') as f:
+                f.write(prompt)
+            shards.append({
+                "index": chunk.index,
+                "path": str(shard_path),
+                "estimated_tokens": estimate_tokens(prompt),
+                "content_tokens": chunk.tokens,
+                "chars": len(prompt),
+                "heading": chunk.heading,
+                "source_lines": [chunk.start_line, chunk.end_line],
+                "repeated_header": chunk.repeated_header,
+                "over_budget": estimate_tokens(prompt) > self.max_prompt_tokens
+            })
+        
+        manifest_path = output_base / f"{base_name}_prompt_manifest.json"
+        manifest = {
+            "source": source,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "shard_count": len(shards),
+            "estimated_total_tokens": sum(shard["estimated_tokens"] for shard in shards),
+            "shards": shards
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest_path
+
+    def remove_stale_prompts(self, output_base: Path, base_name: str, shard_count: int) -> None:
+        """
+        前回の実行で書き出した不要なプロンプトを削除
+        
+        分割数が減った場合は余分な分割ファイルを、分割なし（shard_count=0）に戻った場合は
+        分割ファイルとマニフェストを、分割ありに変わった場合は単一のプロンプトを削除します。
+        """
+        shard_name = re.compile(re.escape(base_name) + r'_full_prompt_(\d+)\.md')
+        stale = []
+        for path in output_base.iterdir():
+            match = shard_name.fullmatch(path.name)
+            if match and int(match.group(1)) > shard_count:
+                stale.append(path)
+        if shard_count:
+            stale.append(output_base / f"{base_name}_full_prompt.md")
+        else:
+            stale.append(output_base / f"{base_name}_prompt_manifest.json")
+        for path in stale:
+            if path.exists():
+                path.unlink()
 
     def process(self, input_file: str, output_dir: str = None) -> Dict[str, Any]:
         """汎用的な処理メイン"""
         
-        input_path = Path(input_file)
-        if not input_path.exists():
-            raise FileNotFoundError(f"入力ファイルが見つかりません: {input_path}")
-        
-        # 出力ディレクトリの設定
-        if output_dir:
-            output_base = Path(output_dir)
-        else:
-            output_base = Path("output")
-        output_base.mkdir(exist_ok=True)
+        start = time.perf_counter()
+        input_path, output_base = self._prepare_paths(input_file, output_dir)
         
         # MarkItDown変換
         print(f"📄 Excelファイルを読み込み中: {input_path}")
@@ -178,12 +237,106 @@ class UniversalProcessor:
                 ['python3', '-m', 'markitdown', str(input_path)],
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                timeout=self.timeout_seconds
             )
             markdown_content = result.stdout
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             print(f"❌ MarkItDown変換エラー: {e}")
-            return {"status": "error", "message": str(e)}
+            return {"status": "error", "input_file": str(input_path), "message": str(e),
+                    "elapsed_seconds": round(time.perf_counter() - start, 3)}
+        
+        return self._write_artifacts(input_path, output_base, markdown_content, start)
+    
+    async def process_async(self, input_file: str, output_dir: str = None,
+                            semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """
+        非同期版の処理メイン（MarkItDown変換を asyncio サブプロセスで実行）
+        
+        semaphore を指定すると同時に実行する変換数を制限します。
+        timeout_seconds を超えた変換は終了させ、エラー結果を返します。
+        elapsed_seconds は変換開始から成果物の書き出しまで、
+        wait_seconds は同時実行数の空きを待った時間です。
+        """
+        queued = time.perf_counter()
+        input_path, output_base = self._prepare_paths(input_file, output_dir)
+        
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(1)
+        async with semaphore:
+            start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                'python3', '-m', 'markitdown', str(input_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                # 止まった変換が同時実行枠を占有し続けないよう終了させる
+                process.kill()
+                await process.wait()
+                return {"status": "error", "input_file": str(input_path),
+                        "message": f"MarkItDown変換が{self.timeout_seconds}秒でタイムアウトしました",
+                        "elapsed_seconds": round(time.perf_counter() - start, 3),
+                        "wait_seconds": round(start - queued, 3)}
+        
+        wait_seconds = round(start - queued, 3)
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', errors='replace').strip() or f"exit status {process.returncode}"
+            return {"status": "error", "input_file": str(input_path), "message": message,
+                    "elapsed_seconds": round(time.perf_counter() - start, 3), "wait_seconds": wait_seconds}
+        
+        # ファイル書き出しはイベントループを止めないようスレッドで実行
+        result = await asyncio.to_thread(self._write_artifacts, input_path, output_base,
+                                         stdout.decode('utf-8'), start, progress=False)
+        result["wait_seconds"] = wait_seconds
+        return result
+    
+    async def process_batch_async(self, input_files: List[str], output_dir: str = None,
+                                  concurrency: int = 4,
+                                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        複数ファイルを同時実行数の上限付きで並行処理
+        
+        各ファイルの成果物は変換が終わり次第書き出され、on_result が呼ばれます。
+        失敗したファイルはエラー結果として返し、他のファイルの処理は継続します。
+        
+        Returns:
+            入力順の処理結果リスト
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        
+        async def run_one(input_file: str) -> Dict[str, Any]:
+            start = time.perf_counter()
+            try:
+                result = await self.process_async(input_file, output_dir, semaphore)
+            except Exception as e:
+                result = {"status": "error", "input_file": str(input_file), "message": str(e),
+                          "elapsed_seconds": round(time.perf_counter() - start, 3)}
+            if on_result:
+                on_result(result)
+            return result
+        
+        return list(await asyncio.gather(*(run_one(input_file) for input_file in input_files)))
+    
+    def _prepare_paths(self, input_file: str, output_dir: str = None) -> Tuple[Path, Path]:
+        """入力ファイルの存在確認と出力ディレクトリの作成"""
+        input_path = Path(input_file)
+        if not input_path.exists():
+            raise FileNotFoundError(f"入力ファイルが見つかりません: {input_path}")
+        
+        # 出力ディレクトリの設定
+        if output_dir:
+            output_base = Path(output_dir)
+        else:
+            output_base = Path("output")
+        output_base.mkdir(exist_ok=True)
+        return input_path, output_base
+    
+    def _write_artifacts(self, input_path: Path, output_base: Path, markdown_content: str,
+                         start: float, progress: bool = True) -> Dict[str, Any]:
+        """生Markdown・分析プロンプト・処理プロンプトを書き出して結果を返す"""
         
         # 基本情報の取得
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -200,37 +353,55 @@ class UniversalProcessor:
             f.write(f"<!-- 元ファイル: {input_path} -->\n\n")
             f.write(markdown_content)
         
+        # 変換結果を一度だけ解析し、サンプリングと分割で共有
+        document = Document.parse(markdown_content)
+        
         # 分析用プロンプトの生成
-        print("🔍 データ構造を分析中...")
-        analysis_prompt = self.analyze_with_claude_prompt(markdown_content)
+        if progress:
+            print("🔍 データ構造を分析中...")
+        analysis_prompt = self.analyze_with_claude_prompt(document)
         with open(analysis_prompt_path, 'w', encoding='utf-8') as f:
             f.write(analysis_prompt)
         
-        # フル処理用プロンプトの生成
-        print("📝 Claude用処理プロンプトを生成中...")
-        full_prompt = self.create_full_processing_prompt(markdown_content)
-        with open(full_prompt_path, 'w', encoding='utf-8') as f:
-            f.write(full_prompt)
+        # フル処理用プロンプトの生成（予算を超える場合は表の行境界で分割）
+        if progress:
+            print("📝 Claude用処理プロンプトを生成中...")
+        prompts = self.create_chunked_prompts(document)
+        outputs = {
+            "raw_markdown": str(raw_markdown_path),
+            "analysis_prompt": str(analysis_prompt_path)
+        }
+        shard_count = len(prompts) if len(prompts) > 1 else 0
+        self.remove_stale_prompts(output_base, base_name, shard_count)
+        if not shard_count:
+            with open(full_prompt_path, 'w', encoding='utf-8') as f:
+                f.write(prompts[0][0])
+            outputs["full_prompt"] = str(full_prompt_path)
+            full_prompt_step = f"2. データ種別を確認後、フル処理プロンプトを送信: {full_prompt_path}"
+        else:
+            manifest_path = self.write_prompt_shards(prompts, output_base, base_name, str(input_path))
+            outputs["prompt_manifest"] = str(manifest_path)
+            full_prompt_step = (f"2. データ種別を確認後、分割プロンプト{len(prompts)}件を順に送信"
+                                f"（一覧: {manifest_path}）")
         
         # 結果サマリ
         result = {
             "status": "success",
             "input_file": str(input_path),
             "timestamp": timestamp,
-            "outputs": {
-                "raw_markdown": str(raw_markdown_path),
-                "analysis_prompt": str(analysis_prompt_path),
-                "full_prompt": str(full_prompt_path)
-            },
+            "outputs": outputs,
             "stats": {
-                "total_lines": len(markdown_content.split('\n')),
-                "total_chars": len(markdown_content)
+                "total_lines": document.line_count,
+                "total_chars": len(markdown_content),
+                "prompt_shards": len(prompts),
+                "estimated_prompt_tokens": sum(estimate_tokens(prompt) for prompt, _ in prompts)
             },
             "next_steps": [
                 f"1. 分析プロンプトをClaudeに送信: {analysis_prompt_path}",
-                f"2. データ種別を確認後、フル処理プロンプトを送信: {full_prompt_path}",
+                full_prompt_step,
                 "3. Claudeの出力を最終成果物として保存"
-            ]
+            ],
+            "elapsed_seconds": round(time.perf_counter() - start, 3)
         }
         
         return result
@@ -250,56 +421,114 @@ def main():
   
   # バッチ処理
   %(prog)s *.xlsx -o results
+  
+  # 1プロンプトあたりの見積りトークン数上限を指定（超える場合は分割）
+  %(prog)s input.xlsx --max-tokens 20000
+  
+  # 非同期モードで最大8ファイルを同時に変換
+  %(prog)s *.xlsx -o results --async --concurrency 8
 """
     )
     
     parser.add_argument('input_files', nargs='+', help='処理するExcelファイル（複数指定可）')
     parser.add_argument('-o', '--output', help='出力ディレクトリ（デフォルト: output）')
     parser.add_argument('-v', '--verbose', action='store_true', help='詳細情報を表示')
+    parser.add_argument('--sample-tokens', type=int, default=DEFAULT_SAMPLE_TOKENS,
+                        help=f'分析プロンプトに含めるサンプルの見積りトークン数（デフォルト: {DEFAULT_SAMPLE_TOKENS}）')
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help=f'1プロンプトあたりの見積りトークン数上限（デフォルト: {DEFAULT_CHUNK_TOKENS}）')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='非同期モード: MarkItDown変換を並行実行し、終わったファイルから成果物を書き出す')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='非同期モードで同時に実行する変換数（デフォルト: 4）')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT_SECONDS,
+                        help=f'MarkItDown変換1件あたりの制限時間（秒、デフォルト: {DEFAULT_TIMEOUT_SECONDS}）')
     
     args = parser.parse_args()
     
-    processor = UniversalProcessor()
+    processor = UniversalProcessor(max_prompt_tokens=args.max_tokens, sample_tokens=args.sample_tokens,
+                                   timeout_seconds=args.timeout)
+    wall_start = time.perf_counter()
     
-    # 複数ファイルの処理
-    all_results = []
-    for input_file in args.input_files:
-        print(f"\n{'='*60}")
-        print(f"処理中: {input_file}")
-        print('='*60)
+    if args.use_async:
+        print(f"🚀 非同期処理開始: {len(args.input_files)}ファイル (同時実行 {args.concurrency})")
         
-        try:
-            result = processor.process(input_file, args.output)
-            all_results.append(result)
+        def report(result):
+            name = Path(result['input_file']).name
+            if result['status'] == 'success':
+                print(f"   ✅ {name} ({result['elapsed_seconds']:.2f}s, "
+                      f"プロンプト{result['stats']['prompt_shards']}件)")
+            else:
+                print(f"   ❌ {name}: {result['message']}")
+        
+        all_results = asyncio.run(processor.process_batch_async(
+            args.input_files, args.output, concurrency=args.concurrency, on_result=report
+        ))
+        if args.verbose:
+            for result in all_results:
+                if result['status'] == 'success':
+                    print_result(result)
+    else:
+        # 複数ファイルの処理
+        all_results = []
+        for input_file in args.input_files:
+            print(f"\n{'='*60}")
+            print(f"処理中: {input_file}")
+            print('='*60)
             
+            start = time.perf_counter()
+            try:
+                result = processor.process(input_file, args.output)
+            except Exception as e:
+                # 入力ファイルが無い場合も非同期モードと同じくエラー結果として集計
+                result = {"status": "error", "input_file": str(input_file), "message": str(e),
+                          "elapsed_seconds": round(time.perf_counter() - start, 3)}
+                if args.verbose and not isinstance(e, FileNotFoundError):
+                    import traceback
+                    traceback.print_exc()
+            
+            all_results.append(result)
             if result['status'] == 'success':
-                print(f"\n✅ 処理完了")
-                print(f"📊 統計情報:")
-                print(f"   - 総行数: {result['stats']['total_lines']:,}")
-                print(f"   - 総文字数: {result['stats']['total_chars']:,}")
-                print(f"\n📁 出力ファイル:")
-                for key, path in result['outputs'].items():
-                    print(f"   - {key}: {path}")
-                print(f"\n📝 次のステップ:")
-                for step in result['next_steps']:
-                    print(f"   {step}")
+                print_result(result)
             else:
                 print(f"\n❌ エラー: {result['message']}")
-                
-        except Exception as e:
-            print(f"\n❌ 予期しないエラー: {e}")
-            if args.verbose:
-                import traceback
-                traceback.print_exc()
     
     # サマリ表示
     if len(all_results) > 1:
-        print(f"\n{'='*60}")
-        print(f"処理サマリ: {len(all_results)}ファイル")
-        print('='*60)
-        success_count = sum(1 for r in all_results if r['status'] == 'success')
-        print(f"✅ 成功: {success_count}")
-        print(f"❌ 失敗: {len(all_results) - success_count}")
+        print_summary(all_results, time.perf_counter() - wall_start)
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """1ファイルの処理結果を表示"""
+    print(f"\n✅ 処理完了: {result['input_file']}")
+    print(f"📊 統計情報:")
+    print(f"   - 総行数: {result['stats']['total_lines']:,}")
+    print(f"   - 総文字数: {result['stats']['total_chars']:,}")
+    print(f"   - プロンプト: {result['stats']['prompt_shards']}件 "
+          f"(見積り {result['stats']['estimated_prompt_tokens']:,} トークン)")
+    print(f"   - 処理時間: {result['elapsed_seconds']:.2f}s")
+    print(f"\n📁 出力ファイル:")
+    for key, path in result['outputs'].items():
+        print(f"   - {key}: {path}")
+    print(f"\n📝 次のステップ:")
+    for step in result['next_steps']:
+        print(f"   {step}")
+
+
+def print_summary(all_results: List[Dict[str, Any]], wall_seconds: float) -> None:
+    """複数ファイルの処理サマリ（ファイルごとの処理時間を含む）を表示"""
+    print(f"\n{'='*60}")
+    print(f"処理サマリ: {len(all_results)}ファイル")
+    print('='*60)
+    success_count = sum(1 for r in all_results if r['status'] == 'success')
+    print(f"✅ 成功: {success_count}")
+    print(f"❌ 失敗: {len(all_results) - success_count}")
+    print(f"⏱️  処理時間: 全体 {wall_seconds:.2f}s / "
+          f"ファイル合計 {sum(r.get('elapsed_seconds', 0) for r in all_results):.2f}s")
+    for r in all_results:
+        mark = '✅' if r['status'] == 'success' else '❌'
+        wait = f" (待機 {r['wait_seconds']:.2f}s)" if r.get('wait_seconds') else ""
+        print(f"   {mark} {Path(r.get('input_file', '')).name}: {r.get('elapsed_seconds', 0):.2f}s{wait}")
 
 
 if __name__ == "__main__":
@@ -6,9 +6,10 @@ Excel to Markdown converter with AI readability enhancement
 
 import os
 import sys
+import time
+import json
 import argparse
 from pathlib import Path
-from datetime import datetime
 
 # Add core module to path
 sys.path.append(os.path.dirname(__file__))
@@ -16,6 +17,10 @@ sys.path.append(os.path.dirname(__file__))
 from core.converter import ExcelConverter
 from core.cleaner import MarkdownCleaner
 from core.config import Config
+from core.pipeline import ReformatPipeline
+from core.batch import BatchProcessor, collect_excel_files
+from core.merger import SheetMerger
+from core.exporter import VaiscExporter
 
 
 def create_argument_parser():
@@ -42,14 +47,23 @@ Examples:
   
   # List available sheets
   python excel_reformatter.py sample.xlsx --list-sheets
+  
+  # Batch conversion of directories / globs with 8 workers
+  python excel_reformatter.py input/ "drop/*.xlsx" --batch --output-dir output --workers 8
+  
+  # Batch conversion merged into one document with a table of contents (5 MB shards)
+  python excel_reformatter.py input/ --batch --output-dir output --merge output/all_specs.md --shard-mb 5
+  
+  # Product master to gzip-sharded VAISC product JSONL (1 GB shards by default)
+  python excel_reformatter.py input/product_master.xlsx --export-vaisc output/vaisc --export-shard-mb 512
         '''
     )
     
-    parser.add_argument('excel_file', 
-                       help='Path to Excel file (.xlsx or .xls)')
+    parser.add_argument('excel_files', nargs='+', metavar='excel_file',
+                       help='Path to Excel file (.xlsx or .xls); batch mode also accepts directories and globs')
     
     parser.add_argument('-o', '--output',
-                       help='Output markdown file path (default: auto-generated)')
+                       help='Output markdown file path (default: auto-generated; single file only, batch mode uses --output-dir)')
     
     parser.add_argument('--no-stats', action='store_true',
                        help='Disable statistics and metadata generation')
@@ -72,6 +86,60 @@ Examples:
     parser.add_argument('--list-sheets', action='store_true',
                        help='List available sheet names and exit')
     
+    parser.add_argument('--engine', choices=['auto', 'inprocess', 'subprocess'],
+                       help='Conversion engine (default: auto = in-process, subprocess fallback)')
+    
+    parser.add_argument('--cache', action='store_true',
+                       help='Reuse cached conversion results for unchanged workbooks')
+    
+    parser.add_argument('--cache-dir',
+                       help='Conversion cache directory (default: cache.directory)')
+    
+    parser.add_argument('--incremental', action='store_true',
+                       help='Reconvert only sheets changed since the last run (state kept in the cache directory)')
+    
+    parser.add_argument('--table-format', choices=['pipe', 'records'],
+                       help='Table output: pipe tables or compact "header: value" records of non-empty cells')
+    
+    parser.add_argument('--stream', action='store_true',
+                       help='Write each sheet as soon as it is cleaned (bounded memory; ignored with --cache/--incremental)')
+    
+    parser.add_argument('--profile', action='store_true',
+                       help='Write column profiles (type, null rate, distinct count, min/max, top values) to <output>.profile.json')
+    
+    parser.add_argument('--deterministic', action='store_true',
+                       help='Stamp source file hash instead of processing time; skip rewriting unchanged outputs')
+    
+    parser.add_argument('--batch', action='store_true',
+                       help='Batch mode: convert every matched file in parallel worker processes')
+    
+    parser.add_argument('--output-dir', default='.',
+                       help='Output directory for batch mode (default: current directory)')
+    
+    parser.add_argument('--workers', type=int,
+                       help='Number of worker processes for batch mode (default: processing.max_workers)')
+    
+    parser.add_argument('--merge', metavar='MERGED_MD',
+                       help='Batch mode: also merge all outputs into one document with a table of contents')
+    
+    parser.add_argument('--shard-mb', type=float,
+                       help='Split the merged document into files of at most this many MB (default: output.max_shard_bytes)')
+    
+    parser.add_argument('--summary',
+                       help='Batch summary JSON path (default: <output-dir>/batch_summary.json)')
+    
+    parser.add_argument('--export-vaisc', metavar='OUTPUT_DIR',
+                       help='Stream the product master sheet into gzip-sharded VAISC product files instead of Markdown')
+    
+    parser.add_argument('--export-format', choices=['jsonl', 'csv'],
+                       help='VAISC export format (default: export.format)')
+    
+    parser.add_argument('--mapping',
+                       help='Field mapping YAML for --export-vaisc (default: config/vaisc_mapping.yaml)')
+    
+    parser.add_argument('--export-shard-mb', type=float,
+                       help='Compressed size limit of each export shard in MB (default: export.max_shard_bytes)')
+    
     return parser
 
 
@@ -93,6 +161,42 @@ def setup_config(args):
     if args.preserve_numbers:
         config.cleaning.format_numbers = False
     
+    if args.engine:
+        config.processing.conversion_engine = args.engine
+    
+    if args.cache:
+        config.cache.enabled = True
+    
+    if args.cache_dir:
+        config.cache.directory = args.cache_dir
+    
+    if args.incremental:
+        config.cache.incremental = True
+    
+    if args.table_format:
+        config.output.table_format = args.table_format
+    
+    if args.stream:
+        config.output.streaming = True
+    
+    if args.deterministic:
+        config.output.deterministic = True
+    
+    if args.profile:
+        config.profiling.enabled = True
+    
+    if args.shard_mb:
+        config.output.max_shard_bytes = int(args.shard_mb * 1024 * 1024)
+    
+    if args.export_format:
+        config.export.format = args.export_format
+    
+    if args.mapping:
+        config.export.mapping_path = args.mapping
+    
+    if args.export_shard_mb is not None:
+        config.export.max_shard_bytes = int(args.export_shard_mb * 1024 * 1024)
+    
     return config
 
 
@@ -107,6 +211,8 @@ def print_file_info(excel_path, sheets, verbose=False):
             print(f"   {i}. {sheet.name}")
             print(f"      行数: {sheet.rows}, 列数: {sheet.cols}")
             print(f"      データ品質: {sheet.data_quality_score:.1%}")
+            if sheet.used_range:
+                print(f"      使用範囲: {sheet.used_range}")
             if sheet.issues:
                 print(f"      課題: {', '.join(sheet.issues)}")
     print()
@@ -124,9 +230,36 @@ def print_cleaning_stats(stats, verbose=False):
         print(f"   処理後行数: {stats.cleaned_lines}")
         print(f"   空行除去: {stats.removed_empty_rows}個")
         print(f"   空白正規化: {stats.normalized_whitespace}個")
+        if stats.rule_hits:
+            hits = ", ".join(f"{name}={count}" for name, count in stats.rule_hits.items())
+            print(f"   ルール適用: {hits}")
+    print()
+
+
+def print_profile(result, verbose=False):
+    """Print where the column profile was written and, in verbose mode, a column summary"""
+    scanned = len(result.profiled_sheets or [])
+    print(f"📈 列プロファイル: {result.profile_path} (再計算シート {scanned})")
+    
+    if verbose:
+        with open(result.profile_path, 'r', encoding='utf-8') as f:
+            sheets = json.load(f)['sheets']
+        for sheet in sheets:
+            print(f"   {sheet['name']}: データ行 {sheet['data_rows']}, 列 {len(sheet['columns'])}")
+            for column in sheet['columns']:
+                distinct = column['distinct_count'] if column['distinct_exact'] else f"≈{column['distinct_count']}"
+                print(f"      {column['letter']} {column['name'] or '(見出しなし)'} [{column['inferred_type']}] "
+                      f"欠損 {column['null_rate']:.1%}, ユニーク {distinct}")
     print()
 
 
+def print_record_reduction(stats):
+    """Print table size of records output against the equivalent pipe tables"""
+    reduction = 1 - stats.record_chars / max(stats.pipe_table_chars, 1)
+    change = f"{reduction:.1%}削減" if reduction >= 0 else f"{-reduction:.1%}増加"
+    print(f"📉 レコード形式: 表 {stats.pipe_table_chars} 文字 → {stats.record_chars} 文字 ({change})")
+
+
 def generate_output_path(excel_path, custom_output=None):
     """Generate output file path"""
     if custom_output:
@@ -137,23 +270,192 @@ def generate_output_path(excel_path, custom_output=None):
     return f"{base_name}_reformed.md"
 
 
-def add_metadata_header(content, excel_path, stats=None):
-    """Add metadata header to content"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    header_lines = [
-        "<!-- Excel Markdown Reformatter で生成 -->",
-        f"<!-- 元ファイル: {os.path.basename(excel_path)} -->",
-        f"<!-- 処理日時: {timestamp} -->",
-    ]
-    
-    if stats:
-        header_lines.extend([
-            f"<!-- NaN除去: {stats.removed_nan_count}, Unnamed列除去: {stats.removed_unnamed_cols} -->",
-            f"<!-- 数値フォーマット: {stats.formatted_numbers}, 空行除去: {stats.removed_empty_rows} -->"
-        ])
-    
-    header_lines.append("")
-    return "\n".join(header_lines) + "\n" + content
+def run_batch(args, config):
+    """Convert many files with a worker pool and write a summary"""
+    excel_files = collect_excel_files(args.excel_files)
+    if not excel_files:
+        print("❌ エラー: 対象のExcelファイルが見つかりません", file=sys.stderr)
+        sys.exit(1)
+    
+    target_sheets = None
+    if args.sheets:
+        target_sheets = [name.strip() for name in args.sheets.split(',')]
+    
+    processor = BatchProcessor(config, max_workers=args.workers)
+    print(f"🚀 バッチ変換開始: {len(excel_files)}ファイル (ワーカー{processor.max_workers})")
+    
+    def report(result):
+        if result.success:
+            print(f"   ✅ {os.path.basename(result.excel_path)} ({result.elapsed_seconds:.2f}s)")
+        else:
+            print(f"   ❌ {os.path.basename(result.excel_path)}: {result.error_message}")
+    
+    start = time.perf_counter()
+    results = processor.run(excel_files, args.output_dir, target_sheets=target_sheets,
+                            clean=not args.no_cleaning, on_result=report)
+    summary = processor.build_summary(results, time.perf_counter() - start)
+    
+    summary_path = args.summary or os.path.join(args.output_dir, 'batch_summary.json')
+    processor.write_summary(summary, summary_path)
+    
+    print()
+    print(f"📊 バッチ結果: 成功 {summary['succeeded']} / 失敗 {summary['failed']} "
+          f"({summary['wall_seconds']:.1f}s)")
+    if config.cache.enabled or config.output.deterministic:
+        print(f"   キャッシュ再利用: {summary['cache_hits']}, 変更なし: {summary['unchanged']}")
+    if args.verbose and summary['cleaning_totals']:
+        totals = summary['cleaning_totals']
+        print(f"   NaN除去: {totals.get('removed_nan_count', 0)}個, "
+              f"Unnamed列除去: {totals.get('removed_unnamed_cols', 0)}個, "
+              f"空行除去: {totals.get('removed_empty_rows', 0)}個")
+    print(f"   サマリ: {summary_path}")
+    
+    if args.merge:
+        merged_inputs = [result.output_path for result in results if result.success]
+        merge_result = SheetMerger(config).merge(merged_inputs, args.merge)
+        print(f"📚 統合: {merge_result.workbooks}ファイル, {merge_result.sheets}シート "
+              f"→ {len(merge_result.output_paths)}ファイル ({merge_result.total_bytes / 1024:.1f} KB)")
+        for merged_path in merge_result.output_paths:
+            print(f"   {merged_path}")
+        if merge_result.oversized_sections:
+            print(f"   ⚠️ 上限を超えるシート: {', '.join(merge_result.oversized_sections)}")
+    
+    if summary['failed']:
+        sys.exit(1)
+
+
+def print_export_result(result, verbose=False):
+    """Print written shards and the rows that could not be exported"""
+    print(f"📦 VAISC出力: {os.path.basename(result.excel_path)} [{result.sheet} / 見出し{result.header_row}行目] "
+          f"→ {result.records_written}件, {len(result.output_paths)}ファイル "
+          f"({result.total_bytes / 1024 / 1024:.1f} MB, 圧縮前 {result.uncompressed_bytes / 1024 / 1024:.1f} MB)")
+    if result.rejected_rows:
+        fields = ", ".join(f"{name}={count}" for name, count in result.missing_required.items())
+        rows = ", ".join(str(row) for row in result.rejected_row_numbers)
+        print(f"   ⚠️ 必須項目が空の行: {result.rejected_rows}件 ({fields}; 行 {rows}"
+              f"{' ...' if result.rejected_rows > len(result.rejected_row_numbers) else ''})")
+    if result.invalid_values:
+        values = ", ".join(f"{name}={count}" for name, count in result.invalid_values.items())
+        print(f"   ⚠️ 変換できず除外した値: {values}")
+    if result.oversized_records:
+        print(f"   ⚠️ 1件で上限を超えるレコード: {result.oversized_records}件")
+    
+    if verbose:
+        if result.unmapped_fields:
+            print(f"   見出しが無い項目: {', '.join(result.unmapped_fields)}")
+        for output_path in result.output_paths:
+            print(f"   {output_path}")
+    print(f"   マニフェスト: {result.manifest_path}")
+
+
+def run_export(args, config):
+    """Export the product master of each file as gzip-sharded VAISC product files"""
+    excel_files = collect_excel_files(args.excel_files)
+    if not excel_files:
+        print("❌ エラー: 対象のExcelファイルが見つかりません", file=sys.stderr)
+        sys.exit(1)
+    
+    sheet_name = args.sheets.split(',')[0].strip() if args.sheets else None
+    converter = ExcelConverter(config)
+    exporter = VaiscExporter(config)
+    
+    failed = 0
+    for excel_path in excel_files:
+        with converter.open_session(excel_path) as session:
+            try:
+                result = exporter.export(session, args.export_vaisc, sheet_name=sheet_name)
+            except ValueError as e:
+                print(f"❌ VAISC出力エラー: {os.path.basename(excel_path)}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+        print_export_result(result, verbose=args.verbose)
+    
+    if failed:
+        sys.exit(1)
+
+
+def convert_single(args, converter, pipeline, session):
+    """Convert one Excel file with an already opened session"""
+    # Handle --list-sheets option
+    if args.list_sheets:
+        sheet_names = converter.list_sheet_names(args.excel_file, session=session)
+        if sheet_names:
+            print("📋 利用可能なシート:")
+            for i, name in enumerate(sheet_names, 1):
+                print(f"   {i}. {name}")
+        else:
+            print("❌ シート情報を取得できませんでした")
+        return
+    
+    if args.verbose:
+        print("🚀 Excel Markdown Reformatter 開始")
+        print(f"   設定: クリーニング{'有効' if not args.no_cleaning else '無効'}, "
+              f"統計情報{'有効' if not args.no_stats else '無効'}")
+        print()
+    
+    # Validate Excel file
+    is_valid, error_msg = converter.validate_excel_file(args.excel_file, session=session)
+    if not is_valid:
+        print(f"❌ ファイル検証エラー: {error_msg}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Get file information
+    if args.verbose:
+        sheets = converter.get_sheet_info(args.excel_file, session=session)
+        print_file_info(args.excel_file, sheets, verbose=True)
+    
+    # Parse target sheets if specified
+    target_sheets = None
+    if args.sheets:
+        target_sheets = [name.strip() for name in args.sheets.split(',')]
+        if args.verbose:
+            print(f"   対象シート: {', '.join(target_sheets)}")
+    
+    # Convert Excel to Markdown
+    if args.verbose:
+        if target_sheets:
+            print("📝 指定シートを変換中...")
+        else:
+            print("📝 Excelファイルを変換中...")
+    
+    if args.verbose and not args.no_cleaning:
+        print("🧹 Markdownを整理中...")
+    
+    # Convert, clean and write
+    output_path = generate_output_path(args.excel_file, args.output)
+    result = pipeline.run(args.excel_file, output_path, target_sheets=target_sheets,
+                          clean=not args.no_cleaning, session=session)
+    if not result.success:
+        print(f"❌ 変換エラー: {result.error_message}", file=sys.stderr)
+        sys.exit(1)
+    
+    cleaning_stats = result.cleaning_stats
+    if args.verbose and result.cache_hit:
+        print("♻️  キャッシュを再利用しました")
+    if args.verbose and result.reconverted_sheets is not None:
+        print(f"🔁 再変換シート: {len(result.reconverted_sheets)}/{len(result.sheets)}"
+              + (f" ({', '.join(result.reconverted_sheets)})" if result.reconverted_sheets else ""))
+    if args.verbose and cleaning_stats:
+        print_cleaning_stats(cleaning_stats, verbose=True)
+    
+    # Success message
+    if result.unchanged:
+        print(f"✅ 変更なし: {output_path}")
+    else:
+        print(f"✅ 変換完了: {output_path}")
+    
+    if not args.verbose:
+        print(f"   元ファイル: {os.path.basename(args.excel_file)}")
+        print(f"   出力サイズ: {result.output_chars} 文字")
+        if cleaning_stats:
+            print(f"   改善点: NaN除去{cleaning_stats.removed_nan_count}個, "
+                  f"Unnamed列除去{cleaning_stats.removed_unnamed_cols}個")
+    
+    if cleaning_stats and cleaning_stats.pipe_table_chars:
+        print_record_reduction(cleaning_stats)
+    
+    if result.profile_path:
+        print_profile(result, verbose=args.verbose)
 
 
 def main():
@@ -162,102 +464,34 @@ def main():
     args = parser.parse_args()
     
     try:
-        # Validate input file
-        if not os.path.exists(args.excel_file):
-            print(f"❌ エラー: ファイルが見つかりません: {args.excel_file}", file=sys.stderr)
-            sys.exit(1)
-        
         # Setup configuration
         config = setup_config(args)
         
-        # Initialize components
-        converter = ExcelConverter(config)
-        cleaner = MarkdownCleaner(config)
-        
-        # Handle --list-sheets option
-        if args.list_sheets:
-            sheet_names = converter.list_sheet_names(args.excel_file)
-            if sheet_names:
-                print("📋 利用可能なシート:")
-                for i, name in enumerate(sheet_names, 1):
-                    print(f"   {i}. {name}")
-            else:
-                print("❌ シート情報を取得できませんでした")
+        if args.export_vaisc:
+            run_export(args, config)
             return
         
-        if args.verbose:
-            print("🚀 Excel Markdown Reformatter 開始")
-            print(f"   設定: クリーニング{'有効' if not args.no_cleaning else '無効'}, "
-                  f"統計情報{'有効' if not args.no_stats else '無効'}")
-            print()
-        
-        # Validate Excel file
-        is_valid, error_msg = converter.validate_excel_file(args.excel_file)
-        if not is_valid:
-            print(f"❌ ファイル検証エラー: {error_msg}", file=sys.stderr)
-            sys.exit(1)
-        
-        # Get file information
-        sheets = converter.get_sheet_info(args.excel_file)
-        if args.verbose:
-            print_file_info(args.excel_file, sheets, verbose=True)
-        
-        # Parse target sheets if specified
-        target_sheets = None
-        if args.sheets:
-            target_sheets = [name.strip() for name in args.sheets.split(',')]
-            if args.verbose:
-                print(f"   対象シート: {', '.join(target_sheets)}")
+        if args.batch or args.merge or len(args.excel_files) > 1 or os.path.isdir(args.excel_files[0]):
+            if args.output:
+                parser.error("-o/--output は単一ファイル用です。バッチモードでは --output-dir を指定してください")
+            run_batch(args, config)
+            return
         
-        # Convert Excel to Markdown
-        if args.verbose:
-            if target_sheets:
-                print("📝 指定シートを変換中...")
-            else:
-                print("📝 Excelファイルを変換中...")
+        args.excel_file = args.excel_files[0]
         
-        result = converter.convert_excel_to_markdown(args.excel_file, target_sheets=target_sheets)
-        if not result.success:
-            print(f"❌ 変換エラー: {result.error_message}", file=sys.stderr)
+        # Validate input file
+        if not os.path.exists(args.excel_file):
+            print(f"❌ エラー: ファイルが見つかりません: {args.excel_file}", file=sys.stderr)
             sys.exit(1)
         
-        # Clean markdown content
-        if not args.no_cleaning:
-            if args.verbose:
-                print("🧹 Markdownを整理中...")
-            
-            cleaned_content, cleaning_stats = cleaner.clean_markdown(result.markdown_content)
-            
-            if args.verbose:
-                print_cleaning_stats(cleaning_stats, verbose=True)
-        else:
-            cleaned_content = result.markdown_content
-            cleaning_stats = None
-        
-        # Add metadata if requested
-        if config.output.add_metadata:
-            cleaned_content = add_metadata_header(
-                cleaned_content, 
-                args.excel_file, 
-                cleaning_stats
-            )
-        
-        # Generate output path
-        output_path = generate_output_path(args.excel_file, args.output)
-        
-        # Write output file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(cleaned_content)
-        
-        # Success message
-        print(f"✅ 変換完了: {output_path}")
+        # Initialize components
+        converter = ExcelConverter(config)
+        cleaner = MarkdownCleaner(config)
+        pipeline = ReformatPipeline(config, converter=converter, cleaner=cleaner)
         
-        if not args.verbose:
-            print(f"   元ファイル: {os.path.basename(args.excel_file)}")
-            print(f"   出力サイズ: {len(cleaned_content)} 文字")
-            if cleaning_stats:
-                print(f"   改善点: NaN除去{cleaning_stats.removed_nan_count}個, "
-                      f"Unnamed列除去{cleaning_stats.removed_unnamed_cols}個")
+        # Open workbook once and share it across all steps; the cleaner's worker pool is reused per sheet
+        with cleaner, converter.open_session(args.excel_file) as session:
+            convert_single(args, converter, pipeline, session)
         
     except KeyboardInterrupt:
         print("\n⚠️  処理が中断されました", file=sys.stderr)
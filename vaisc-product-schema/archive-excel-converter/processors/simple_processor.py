@@ -4,54 +4,255 @@
 Excel → MarkDown → 人間が読みやすい形式
 """
 
+import os
 import re
 import sys
+import json
+from datetime import datetime
 
+# Add core module to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-def extract_api_info(raw_content):
-    """生データから実際のAPI情報を抽出"""
-    lines = raw_content.split('\n')
+from core.document import Document
+from core.session import WorkbookSession
+from core.analyzer import FileAnalyzer
+from core.headers import cell_text, normalize_header, find_header
+
+
+EXCEL_EXTENSIONS = ('.xlsx',)
+
+# フィールド → (完全一致する見出し, 部分一致する見出し)。見出しは空白除去・小文字化して比較し、上から順に列を割り当てる
+FIELD_HEADERS = {
+    'no': (('no.', 'no', '項番'), ()),
+    'json': (('json', 'json例'), ('json', 'レスポンス例')),
+    'physical_name': (('物理名',), ('物理名', '(物理)')),
+    'logical_name': (('論理名',), ('論理名', '(論理)')),
+    'master_name': (('マスタ', 'マスタ名'), ('マスタ',)),
+    'description': (('説明',), ('説明', '概要')),
+    'search_voi_usage': ((), ('search-voi',)),
+    'app_usage': ((), ('アプリ',)),
+    'vaics_after': ((), ('vaics導入後', 'vaisc導入後')),
+}
+
+_JSON_FIELD = re.compile(r'"([^"]+)":\s*(.+)')
+
+
+def _build_field_info(no, json_text, values):
+    """No.とJSON列からフィールド情報を組み立てる（データ行でなければNone）"""
+    # データ行を検出（No.とJSONの両方が存在）
+    if not (no and no.isdigit() and json_text and '"' in json_text):
+        return None
     
+    # JSONからフィールド名と値を抽出
+    json_match = _JSON_FIELD.search(json_text)
+    if not json_match:
+        return None
+    
+    field_info = {
+        'no': no,
+        'field_name': json_match.group(1),
+        'value_example': json_match.group(2).rstrip(',')
+    }
+    for name in ('description', 'master_name', 'logical_name', 'physical_name',
+                 'search_voi_usage', 'app_usage', 'vaics_after'):
+        field_info[name] = values.get(name, '')
+    return field_info
+
+
+def extract_api_info(document):
+    """解析済みドキュメントの表の行から実際のAPI情報を抽出"""
+    # MarkItDown出力の列位置（先頭の'|'の外側を0列目とする）
+    positions = {'description': 49, 'master_name': 74, 'logical_name': 81, 'physical_name': 88,
+                 'search_voi_usage': 101, 'app_usage': 107, 'vaics_after': 125}
     api_fields = []
     
-    for line in lines:
-        if '|' in line and line.count('|') > 10:
-            cells = [cell.strip() for cell in line.split('|')]
+    for table in document.tables():
+        for row in table.iter_rows():
+            if len(row) < 10:  # '|'が11個以上（10列以上）の行のみ対象
+                continue
+            # 先頭・末尾の'|'の外側を空セルとして補い、列番号を生の行の分割と揃える
+            cells = [''] + [cell.strip() for cell in row] + ['']
+            if len(cells) <= 50:
+                continue
             
-            # データ行を検出（No.とJSONの両方が存在）
-            if (len(cells) > 50 and 
-                cells[3] and cells[3].isdigit() and  # No.列
-                cells[4] and '"' in cells[4]):       # JSON列
-                
-                # JSONからフィールド名と値を抽出
-                json_text = cells[4]
-                json_match = re.search(r'"([^"]+)":\s*(.+)', json_text)
-                
-                if json_match:
-                    field_name = json_match.group(1)
-                    field_value = json_match.group(2).rstrip(',')
-                    
-                    field_info = {
-                        'no': cells[3],
-                        'field_name': field_name,
-                        'value_example': field_value,
-                        'description': cells[49] if len(cells) > 49 else '',
-                        'master_name': cells[74] if len(cells) > 74 else '',
-                        'logical_name': cells[81] if len(cells) > 81 else '',
-                        'physical_name': cells[88] if len(cells) > 88 else '',
-                        'search_voi_usage': cells[101] if len(cells) > 101 else '',
-                        'app_usage': cells[107] if len(cells) > 107 else '',
-                        'vaics_after': cells[125] if len(cells) > 125 else ''
-                    }
-                    
-                    api_fields.append(field_info)
+            values = {name: cells[index] if len(cells) > index else ''
+                      for name, index in positions.items()}
+            field_info = _build_field_info(cells[3], cells[4], values)
+            if field_info:
+                api_fields.append(field_info)
     
     return api_fields
 
 
-def generate_readable_output(api_fields):
-    """人間が読みやすい形式で出力生成"""
+def resolve_columns(header, groups=None, column_names=None):
+    """
+    見出し行からフィールドごとの列番号を求める
+    
+    Args:
+        header: 見出し行のセルテキスト
+        groups: 1行上のグループ見出し（結合セルは右方向に引き継いだもの）
+        column_names: フィールド名 → 見出しテキストの明示指定（FIELD_HEADERSより優先）
+    
+    Returns:
+        フィールド名 → 0始まりの列番号（見つからないフィールドは含まない）
+    """
+    labels = [normalize_header(text) for text in header]
+    if groups:
+        labels = [normalize_header(group) + label if group else label
+                  for group, label in zip(list(groups) + [''] * len(labels), labels)]
+    
+    columns = {}
+    used = set()
+    for name, (exact, partial) in FIELD_HEADERS.items():
+        if column_names and name in column_names:
+            exact, partial = (normalize_header(column_names[name]),), ()
+        candidates = [index for index, label in enumerate(labels) if label and index not in used]
+        found = next((index for index in candidates if normalize_header(header[index]) in exact
+                      or labels[index] in exact), None)
+        if found is None:
+            found = next((index for index in candidates
+                          if any(keyword in labels[index] for keyword in partial)), None)
+        if found is not None:
+            columns[name] = found
+            used.add(found)
+    
+    # JSON列の見出しが無い場合は旧形式と同じくNo.の右隣の列
+    if 'no' in columns and 'json' not in columns and columns['no'] + 1 not in used:
+        columns['json'] = columns['no'] + 1
+    return columns
+
+
+def iter_api_fields_from_excel(excel_path, sheet_names=None, column_names=None):
+    """
+    Excelの仕様書シートからAPI情報を1件ずつ抽出（Markdown変換を経由しない）
+    
+    シートXMLを1行ずつ読み、列位置は見出し行から一度だけ求めるため、
+    列が挿入されても抽出位置がずれない。
+    
+    Args:
+        excel_path: .xlsx ファイル
+        sheet_names: 対象シート名（省略時は見出し行が見つかった全シート）
+        column_names: フィールド名 → 見出しテキストの明示指定
+    
+    Yields:
+        extract_api_info と同じ形式のフィールド情報
+    """
+    def match(header, groups):
+        columns = resolve_columns(header, groups, column_names)
+        return columns if 'no' in columns else None
+    
+    analyzer = FileAnalyzer()
+    with WorkbookSession(excel_path) as session:
+        shared_strings = analyzer.read_shared_strings(session)
+        date_styles = analyzer.read_date_styles(session)
+        for sheet_part in session.sheet_parts():
+            if sheet_names and sheet_part.name not in sheet_names:
+                continue
+            
+            rows = analyzer.iter_rows(session, sheet_part.name, shared_strings, date_styles)
+            found = find_header(rows, match)
+            columns = found[1] if found else None
+            if columns is None or 'json' not in columns:
+                rows.close()
+                continue
+            
+            for _, row in rows:
+                values = {name: cell_text(row[index], single_line=True) if index < len(row) else ''
+                          for name, index in columns.items()}
+                field_info = _build_field_info(values['no'], values['json'], values)
+                if field_info:
+                    yield field_info
+
+
+# 変更サマリーに表示する項目名
+FIELD_LABELS = {
+    'no': 'No.',
+    'field_name': 'フィールド名',
+    'value_example': '値の例',
+    'description': '説明',
+    'master_name': 'マスタ',
+    'logical_name': '論理名',
+    'physical_name': '物理名',
+    'search_voi_usage': 'search-voi',
+    'app_usage': 'アプリ',
+    'vaics_after': 'VAICS導入後',
+}
+
+_DETAILS_HEADING = "## 🔍 詳細仕様"
+
+
+def _value_type(field):
+    """値の例から型を推測"""
+    value_type = "string"
+    if field['value_example'].isdigit():
+        value_type = "number"
+    elif field['value_example'].lower() in ['true', 'false']:
+        value_type = "boolean"
+    elif field['value_example'].startswith('['):
+        value_type = "array"
+    elif field['value_example'].startswith('{'):
+        value_type = "object"
+    return value_type
+
+
+def render_field_row(field):
+    """フィールド一覧の1行"""
+    return f"| {field['no']} | `{field['field_name']}` | {_value_type(field)} | {field['description']} |"
+
+
+def render_field_section(field):
+    """詳細仕様の1フィールド分の行（末尾は区切り線と空行）"""
+    output = []
+    output.append(f"### {field['field_name']}")
+    output.append("")
+    
+    # 基本情報
+    output.append("**基本情報**")
+    output.append(f"- **No.**: {field['no']}")
+    output.append(f"- **フィールド名**: `{field['field_name']}`")
+    output.append(f"- **値の例**: `{field['value_example']}`")
+    output.append(f"- **説明**: {field['description']}")
+    output.append("")
     
+    # データベース情報
+    if field['physical_name'] or field['logical_name']:
+        output.append("**データベース情報**")
+        if field['physical_name']:
+            output.append(f"- **物理名**: `{field['physical_name']}`")
+        if field['logical_name']:
+            output.append(f"- **論理名**: {field['logical_name']}")
+        if field['master_name']:
+            output.append(f"- **マスタ**: {field['master_name']}")
+        output.append("")
+    
+    # 利用状況
+    usage_info = []
+    if field['search_voi_usage']:
+        usage_info.append(f"**search-voi**: {field['search_voi_usage']}")
+    if field['app_usage']:
+        usage_info.append(f"**アプリ**: {field['app_usage']}")
+    if field['vaics_after']:
+        usage_info.append(f"**VAICS導入後**: {field['vaics_after']}")
+    
+    if usage_info:
+        output.append("**利用状況**")
+        for usage in usage_info:
+            output.append(f"- {usage}")
+        output.append("")
+    
+    # JSON例
+    output.append("**JSON例**")
+    output.append("```json")
+    output.append(f'"{field["field_name"]}": {field["value_example"]}')
+    output.append("```")
+    output.append("")
+    output.append("---")
+    output.append("")
+    return output
+
+
+def _assemble_output(field_count, rows, sections):
+    """レンダリング済みの一覧行・詳細セクションから文書全体を組み立てる"""
     output = []
     output.append("# VAISC サーチAPI レスポンス仕様書")
     output.append("")
@@ -60,7 +261,7 @@ def generate_readable_output(api_fields):
     
     # サマリー
     output.append("## 📊 サマリー")
-    output.append(f"- **総フィールド数**: {len(api_fields)}個")
+    output.append(f"- **総フィールド数**: {field_count}個")
     output.append(f"- **エンドポイント**: `/api/search`")
     output.append("")
     
@@ -69,98 +270,241 @@ def generate_readable_output(api_fields):
     output.append("")
     output.append("| No. | フィールド名 | 型 | 説明 |")
     output.append("|-----|-------------|-----|------|")
-    
-    for field in api_fields:
-        # 値の例から型を推測
-        value_type = "string"
-        if field['value_example'].isdigit():
-            value_type = "number"
-        elif field['value_example'].lower() in ['true', 'false']:
-            value_type = "boolean"
-        elif field['value_example'].startswith('['):
-            value_type = "array"
-        elif field['value_example'].startswith('{'):
-            value_type = "object"
-            
-        output.append(f"| {field['no']} | `{field['field_name']}` | {value_type} | {field['description']} |")
-    
+    output.extend(rows)
     output.append("")
     
     # 詳細仕様
-    output.append("## 🔍 詳細仕様")
+    output.append(_DETAILS_HEADING)
     output.append("")
+    for section in sections:
+        output.extend(section)
     
-    for field in api_fields:
-        output.append(f"### {field['field_name']}")
-        output.append("")
-        
-        # 基本情報
-        output.append("**基本情報**")
-        output.append(f"- **No.**: {field['no']}")
-        output.append(f"- **フィールド名**: `{field['field_name']}`")
-        output.append(f"- **値の例**: `{field['value_example']}`")
-        output.append(f"- **説明**: {field['description']}")
+    return '\n'.join(output)
+
+
+def generate_readable_output(api_fields):
+    """人間が読みやすい形式で出力生成"""
+    return _assemble_output(len(api_fields),
+                            [render_field_row(field) for field in api_fields],
+                            [render_field_section(field) for field in api_fields])
+
+
+def _split_readable_output(content, field_count):
+    """
+    生成済みの文書を一覧行と詳細セクションに分割（前回のフィールド順に対応）
+    
+    Returns:
+        (一覧行のリスト, セクションごとの行リスト)。手で編集されるなどして
+        フィールド数と合わない場合は None
+    """
+    lines = content.split('\n')
+    try:
+        table_start = lines.index("|-----|-------------|-----|------|") + 1
+        details_start = lines.index(_DETAILS_HEADING, table_start) + 2
+    except ValueError:
+        return None
+    
+    rows = lines[table_start:details_start - 3]
+    sections = []
+    for line in lines[details_start:]:
+        if line.startswith('### '):
+            sections.append([])
+        elif not sections:
+            return None
+        sections[-1].append(line)
+    
+    if len(rows) != field_count or len(sections) != field_count:
+        return None
+    return rows, sections
+
+
+def diff_fields(previous_fields, api_fields):
+    """
+    前回と今回のフィールドを No./フィールド名 で対応付けて差分を求める
+    
+    No.とフィールド名が一致するものを先に対応付け、残りはフィールド名が同じものを
+    出現順に対応付ける（項目の挿入でNo.が振り直された場合）。
+    
+    Returns:
+        added: 追加されたフィールド
+        removed: 削除されたフィールド
+        changed: (前回, 今回, 変わった項目名のリスト)
+        reused: 今回の位置 → 変更のない前回の位置
+    """
+    previous_by_key = {}
+    for index, field in enumerate(previous_fields):
+        previous_by_key.setdefault((field['no'], field['field_name']), index)
+    
+    matched = {}
+    used = set()
+    for index, field in enumerate(api_fields):
+        previous_index = previous_by_key.get((field['no'], field['field_name']))
+        if previous_index is not None and previous_index not in used:
+            matched[index] = previous_index
+            used.add(previous_index)
+    
+    remaining_by_name = {}
+    for index, field in enumerate(previous_fields):
+        if index not in used:
+            remaining_by_name.setdefault(field['field_name'], []).append(index)
+    for index, field in enumerate(api_fields):
+        candidates = remaining_by_name.get(field['field_name'])
+        if index not in matched and candidates:
+            matched[index] = candidates.pop(0)
+            used.add(matched[index])
+    
+    changes = {'added': [], 'removed': [], 'changed': [], 'reused': {}}
+    for index, field in enumerate(api_fields):
+        if index not in matched:
+            changes['added'].append(field)
+            continue
+        previous = previous_fields[matched[index]]
+        changed_keys = [key for key in FIELD_LABELS if previous.get(key, '') != field.get(key, '')]
+        if changed_keys:
+            changes['changed'].append((previous, field, changed_keys))
+        else:
+            changes['reused'][index] = matched[index]
+    changes['removed'] = [field for index, field in enumerate(previous_fields) if index not in used]
+    return changes
+
+
+def update_readable_output(previous_content, previous_fields, api_fields, changes):
+    """
+    前回の文書のうち変更のあったフィールドだけを再レンダリングして差し替える
+    
+    変更のないフィールドの一覧行・詳細セクションは前回の文書からそのまま流用するため、
+    レンダリングの量は変更件数に比例する。前回の文書が分割できない場合は全体を再生成する。
+    """
+    parsed = _split_readable_output(previous_content, len(previous_fields))
+    if parsed is None:
+        return generate_readable_output(api_fields)
+    
+    previous_rows, previous_sections = parsed
+    reused = changes['reused']
+    rows = []
+    sections = []
+    for index, field in enumerate(api_fields):
+        if index in reused:
+            rows.append(previous_rows[reused[index]])
+            sections.append(previous_sections[reused[index]])
+        else:
+            rows.append(render_field_row(field))
+            sections.append(render_field_section(field))
+    return _assemble_output(len(api_fields), rows, sections)
+
+
+def generate_change_summary(changes, timestamp):
+    """変更サマリーのMarkdown"""
+    output = []
+    output.append("# VAISC サーチAPI 仕様書 変更サマリー")
+    output.append("")
+    output.append(f"- **更新日時**: {timestamp}")
+    output.append(f"- **追加**: {len(changes['added'])}個 / **変更**: {len(changes['changed'])}個 / "
+                  f"**削除**: {len(changes['removed'])}個 / **変更なし**: {len(changes['reused'])}個")
+    output.append("")
+    
+    if changes['added']:
+        output.append("## ➕ 追加")
+        for field in changes['added']:
+            output.append(f"- No.{field['no']} `{field['field_name']}`")
         output.append("")
-        
-        # データベース情報
-        if field['physical_name'] or field['logical_name']:
-            output.append("**データベース情報**")
-            if field['physical_name']:
-                output.append(f"- **物理名**: `{field['physical_name']}`")
-            if field['logical_name']:
-                output.append(f"- **論理名**: {field['logical_name']}")
-            if field['master_name']:
-                output.append(f"- **マスタ**: {field['master_name']}")
-            output.append("")
-        
-        # 利用状況
-        usage_info = []
-        if field['search_voi_usage']:
-            usage_info.append(f"**search-voi**: {field['search_voi_usage']}")
-        if field['app_usage']:
-            usage_info.append(f"**アプリ**: {field['app_usage']}")
-        if field['vaics_after']:
-            usage_info.append(f"**VAICS導入後**: {field['vaics_after']}")
-        
-        if usage_info:
-            output.append("**利用状況**")
-            for usage in usage_info:
-                output.append(f"- {usage}")
-            output.append("")
-        
-        # JSON例
-        output.append("**JSON例**")
-        output.append("```json")
-        output.append(f'"{field["field_name"]}": {field["value_example"]}')
-        output.append("```")
+    
+    if changes['changed']:
+        output.append("## ✏️ 変更")
+        for previous, field, changed_keys in changes['changed']:
+            output.append(f"- No.{field['no']} `{field['field_name']}`")
+            for key in changed_keys:
+                output.append(f"  - {FIELD_LABELS[key]}: {previous.get(key, '') or '（なし）'} → "
+                              f"{field.get(key, '') or '（なし）'}")
         output.append("")
-        output.append("---")
+    
+    if changes['removed']:
+        output.append("## ➖ 削除")
+        for field in changes['removed']:
+            output.append(f"- No.{field['no']} `{field['field_name']}`")
         output.append("")
     
     return '\n'.join(output)
 
 
+def state_path_for(output_file):
+    """前回の抽出結果の保存先（"spec.md" → "spec.fields.json"）"""
+    root, _ = os.path.splitext(output_file)
+    return f"{root}.fields.json"
+
+
+def changes_path_for(output_file):
+    """変更サマリーの出力先（"spec.md" → "spec_changes.md"）"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_changes{ext or '.md'}"
+
+
+def load_previous_run(output_file):
+    """前回のフィールドと文書を読み込む（どちらかが無ければ None）"""
+    try:
+        with open(state_path_for(output_file), 'r', encoding='utf-8') as f:
+            previous_fields = json.load(f)['fields']
+        with open(output_file, 'r', encoding='utf-8') as f:
+            previous_content = f.read()
+    except (OSError, ValueError, KeyError):
+        return None
+    return previous_fields, previous_content
+
+
+def save_run_state(output_file, input_file, api_fields):
+    """今回抽出したフィールドを次回の差分用に保存"""
+    with open(state_path_for(output_file), 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(input_file), 'fields': api_fields}, f, ensure_ascii=False, indent=2)
+
+
 def main():
-    if len(sys.argv) != 3:
-        print("使用方法: python simple_processor.py input.md output.md")
+    incremental = '--incremental' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--incremental']
+    if len(args) not in (2, 3):
+        print("使用方法: python simple_processor.py input.(md|xlsx) output.md [シート名] [--incremental]")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file = args[0]
+    output_file = args[1]
+    sheet_names = args[2:] or None
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            raw_content = f.read()
-        
-        print("🔍 APIフィールド情報を解析中...")
-        api_fields = extract_api_info(raw_content)
+        if input_file.lower().endswith(EXCEL_EXTENSIONS):
+            print("📊 ExcelからAPIフィールド情報を直接抽出中...")
+            api_fields = list(iter_api_fields_from_excel(input_file, sheet_names))
+        else:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                raw_content = f.read()
+            
+            print("🔍 APIフィールド情報を解析中...")
+            api_fields = extract_api_info(Document.parse(raw_content))
         print(f"   ✅ {len(api_fields)}個のフィールドを検出")
         
-        print("📝 読みやすい形式で出力生成中...")
-        readable_content = generate_readable_output(api_fields)
+        previous = load_previous_run(output_file) if incremental else None
+        if previous is None:
+            print("📝 読みやすい形式で出力生成中...")
+            readable_content = generate_readable_output(api_fields)
+        else:
+            previous_fields, previous_content = previous
+            changes = diff_fields(previous_fields, api_fields)
+            print(f"🔄 前回との差分: 追加{len(changes['added'])}個, 変更{len(changes['changed'])}個, "
+                  f"削除{len(changes['removed'])}個, 変更なし{len(changes['reused'])}個")
+            reordered = any(index != previous_index for index, previous_index in changes['reused'].items())
+            if not (changes['added'] or changes['changed'] or changes['removed'] or reordered):
+                print(f"✅ 変更なし: {output_file}")
+                return
+            
+            print("📝 変更のあったフィールドのみ再生成中...")
+            readable_content = update_readable_output(previous_content, previous_fields, api_fields, changes)
+            changes_file = changes_path_for(output_file)
+            with open(changes_file, 'w', encoding='utf-8') as f:
+                f.write(generate_change_summary(changes, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            print(f"📋 変更サマリー: {changes_file}")
         
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(readable_content)
+        if incremental:
+            save_run_state(output_file, input_file, api_fields)
         
         print(f"✅ 完了: {output_file}")
         print("\n📋 検出されたフィールド:")
@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the converter tests
+テスト用の小さなワークブックを生成する
+"""
+
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def multi_sheet_workbook(tmp_path):
+    """Workbook with three small sheets, one of them empty"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '商品'
+    ws.append(['ID', '名前', '価格'])
+    ws.append([1, 'シャツ', 3900])
+    ws.append([2, 'パンツ', 5900.5])
+    ws = wb.create_sheet('在庫')
+    ws.append(['ID', '数量'])
+    ws.append([1, 10])
+    wb.create_sheet('空')
+    path = tmp_path / 'multi.xlsx'
+    wb.save(path)
+    return str(path)
@@ -0,0 +1,31 @@
+"""
+Tests for the conversion cache key
+実行方法の設定が変わってもキャッシュキーが変わらないことを確認する
+"""
+
+import copy
+
+from core.config import Config
+from core.cache import hash_config
+
+
+def test_executor_settings_do_not_change_the_key():
+    config = Config()
+    worker_config = copy.deepcopy(config)
+    worker_config.processing.parallel_processing = False
+    worker_config.processing.max_workers = 1
+    worker_config.processing.timeout_seconds = 10
+    worker_config.processing.conversion_engine = 'subprocess'
+
+    assert hash_config(worker_config) == hash_config(config)
+
+
+def test_output_settings_change_the_key():
+    config = Config()
+    changed = copy.deepcopy(config)
+    changed.cleaning.remove_nan = not config.cleaning.remove_nan
+    analysis = copy.deepcopy(config)
+    analysis.processing.analysis_mode = 'full'
+
+    assert hash_config(changed) != hash_config(config)
+    assert hash_config(analysis) != hash_config(config)
@@ -0,0 +1,37 @@
+"""
+Tests for ExcelConverter engine selection
+どのエンジン・並列設定でも同じMarkdownになることを確認する
+"""
+
+import pytest
+
+pytest.importorskip('markitdown')
+
+from core.config import Config
+from core.converter import ExcelConverter
+
+
+def convert(excel_path, engine, parallel=False, target_sheets=None):
+    config = Config()
+    config.processing.parallel_processing = parallel
+    config.processing.max_workers = 2
+    config.processing.chunk_size = 0
+    result = ExcelConverter(config, engine).convert_excel_to_markdown(excel_path, target_sheets=target_sheets)
+    assert result.success, result.error_message
+    return result.markdown_content
+
+
+def test_engines_produce_identical_output(multi_sheet_workbook):
+    inprocess = convert(multi_sheet_workbook, 'inprocess')
+
+    assert convert(multi_sheet_workbook, 'subprocess') == inprocess
+    assert convert(multi_sheet_workbook, 'inprocess', parallel=True) == inprocess
+    assert inprocess.count(Config().output.sheet_separator) == 2
+
+
+def test_engines_select_sheets_identically(multi_sheet_workbook):
+    target_sheets = ['在庫', '商品']
+    inprocess = convert(multi_sheet_workbook, 'inprocess', target_sheets=target_sheets)
+
+    assert convert(multi_sheet_workbook, 'subprocess', target_sheets=target_sheets) == inprocess
+    assert inprocess.index('## 在庫') < inprocess.index('## 商品')
@@ -0,0 +1,48 @@
+"""
+Tests for sheet-level incremental reconversion
+シート単位の再利用結果が一括変換・一括クリーニングと一致することを確認する
+"""
+
+import pytest
+
+pytest.importorskip('markitdown')
+
+from core.config import Config
+from core.converter import ExcelConverter
+from core.cleaner import MarkdownCleaner
+from core.session import WorkbookSession
+from core.incremental import IncrementalConverter
+
+
+def make_config(tmp_path, separator="\n\n---\n\n", parallel=True):
+    config = Config()
+    config.cache.directory = str(tmp_path / 'cache')
+    config.output.sheet_separator = separator
+    config.processing.parallel_processing = parallel
+    return config
+
+
+def run(config, excel_path):
+    with WorkbookSession(excel_path) as session:
+        return IncrementalConverter(config).convert(excel_path, session)
+
+
+@pytest.mark.parametrize('separator', ["\n\n---\n\n", "\n\n"])
+def test_incremental_matches_whole_document(tmp_path, multi_sheet_workbook, separator):
+    config = make_config(tmp_path, separator)
+    raw = ExcelConverter(config).convert_excel_to_markdown(multi_sheet_workbook).markdown_content
+    cleaned, _ = MarkdownCleaner(config).clean_markdown(raw)
+
+    first = run(config, multi_sheet_workbook)
+    second = run(config, multi_sheet_workbook)
+
+    assert first.raw_markdown == raw
+    assert first.cleaned_markdown == cleaned
+    assert second.cleaned_markdown == cleaned
+    assert second.reconverted_sheets == []
+
+
+def test_state_is_shared_between_batch_and_single_runs(tmp_path, multi_sheet_workbook):
+    run(make_config(tmp_path, parallel=True), multi_sheet_workbook)
+
+    assert run(make_config(tmp_path, parallel=False), multi_sheet_workbook).reconverted_sheets == []
@@ -0,0 +1,42 @@
+"""
+Tests for the structural sampler
+"## " 見出しだけをシートとして数えることを確認する
+"""
+
+from core.document import Document, HEADING, TEXT
+from core.sampler import StructuralSampler
+
+
+MARKDOWN = """# 商品データ
+
+## 商品
+|ID|名前|
+|---|---|
+|1|シャツ|
+
+### 補足
+|ID|備考|
+|---|---|
+|1|セール|
+
+## 在庫
+|ID|数量|
+|---|---|
+|1|10|
+"""
+
+
+def test_only_sheet_headings_are_headings():
+    kinds = {line: kind for kind, line, _, _ in Document.parse(MARKDOWN).iter_lines()}
+
+    assert kinds['## 商品'] == HEADING
+    assert kinds['### 補足'] == TEXT
+    assert kinds['# 商品データ'] == TEXT
+
+
+def test_subsection_headings_do_not_count_as_sheets():
+    result = StructuralSampler(max_tokens=4000).sample_document(Document.parse(MARKDOWN))
+
+    assert result.sheets_total == 2
+    assert result.sheet_names == ['商品', '在庫']
+    assert result.sheets_covered == 2